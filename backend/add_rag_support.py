@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """Migration script to add RAG support to existing database"""
 
+import base64
 import os
 import sys
 from sqlalchemy import create_engine, text, Column, Integer, String, DateTime, Text, Float, JSON, func
@@ -28,7 +29,9 @@ def migrate_rag_support():
 
             column_names = [row[1] for row in result.fetchall()]
             new_columns = ['embedding', 'embedding_model', 'embedding_dimensions',
-                          'embedding_updated_at', 'embedding_provider']
+                          'embedding_updated_at', 'embedding_provider',
+                          'embedding_blob', 'embedding_int8', 'embedding_scale',
+                          'embedding_normalized']
 
             # Add new columns if they don't exist
             for column in new_columns:
@@ -81,6 +84,18 @@ def migrate_rag_support():
                     );
                 """))
 
+            # Backfill raw embedding bytes for rows that only have the base64 text
+            rows = conn.execute(text("""
+                SELECT id, embedding FROM lore_entries
+                WHERE embedding IS NOT NULL AND embedding != '' AND embedding_blob IS NULL;
+            """)).fetchall()
+            if rows:
+                print(f"[RAG Migration] Backfilling embedding_blob for {len(rows)} lore entries")
+                conn.execute(
+                    text("UPDATE lore_entries SET embedding_blob = :blob WHERE id = :id"),
+                    [{"id": row[0], "blob": base64.b64decode(row[1])} for row in rows],
+                )
+
             conn.commit()
             print("[RAG Migration] Migration completed successfully")
 
@@ -99,7 +114,9 @@ def verify_migration():
             result = conn.execute(text("PRAGMA table_info(lore_entries);"))
             column_names = [row[1] for row in result.fetchall()]
             embedding_cols = ['embedding', 'embedding_model', 'embedding_dimensions',
-                             'embedding_updated_at', 'embedding_provider']
+                             'embedding_updated_at', 'embedding_provider',
+                             'embedding_blob', 'embedding_int8', 'embedding_scale',
+                             'embedding_normalized']
 
             for col in embedding_cols:
                 if col in column_names:
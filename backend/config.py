@@ -2,7 +2,7 @@
 """CoolChat Configuration - Database-backed with JSON backup support"""
 
 import os
-from typing import Dict, Optional
+from typing import Dict, Optional, Tuple
 from enum import Enum
 from pydantic import BaseModel, Field
 from dotenv import load_dotenv
@@ -100,7 +100,40 @@ def _ensure_config_path() -> Path:
     path = Path(__file__).parent.parent / "config.json"
     return path
 
+# Last loaded or saved config, keyed by config.json's mtime so edits made by
+# other processes (which also rewrite the backup file) are picked up.
+_config_cache: Optional[Tuple[int, AppConfig]] = None
+
+def _config_mtime() -> int:
+    try:
+        return _ensure_config_path().stat().st_mtime_ns
+    except OSError:
+        return 0
+
+def _cached_config() -> AppConfig:
+    global _config_cache
+    mtime = _config_mtime()
+    if _config_cache is None or _config_cache[0] != mtime:
+        _config_cache = (mtime, _load_config_uncached())
+    return _config_cache[1]
+
 def load_config() -> AppConfig:
+    """Return the current configuration, reloading only when it has changed.
+
+    Callers get their own copy, so mutating it before save_config() cannot
+    leak into the cache.
+    """
+    return _cached_config().model_copy(deep=True)
+
+def current_config() -> AppConfig:
+    """Return the shared cached configuration for read-only use.
+
+    Skips load_config()'s deep copy on hot paths such as chat turns; callers
+    must not mutate it (take load_config() before editing and saving).
+    """
+    return _cached_config()
+
+def _load_config_uncached() -> AppConfig:
     """Load configuration from database, with fallback to config.json"""
     # First try loading from database
     try:
@@ -167,6 +200,9 @@ def save_config(config: AppConfig) -> None:
     except Exception as e:
         print(f"Failed to save config.json backup: {e}")
 
+    global _config_cache
+    _config_cache = (_config_mtime(), AppConfig(**config_dict))
+
 def mask_secret(value: Optional[str]) -> Optional[str]:
     """Mask sensitive values"""
     if not value:
@@ -3,7 +3,7 @@
 
 import os
 import sys
-from sqlalchemy import create_engine, text
+from sqlalchemy import text
 
 # Set up basic Python path
 backend_dir = os.path.dirname(os.path.abspath(__file__))
@@ -13,10 +13,7 @@ def create_tables():
     """Create all database tables using SQLAlchemy"""
     # Import models after setting path
     from models import Base
-    from database import SQLALCHEMY_DATABASE_URL
-
-    # Create engine
-    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
+    from database import engine
 
     try:
         # Create all tables defined in models
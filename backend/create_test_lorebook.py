@@ -6,15 +6,26 @@ sys.path.append(os.path.dirname(__file__))
 sys.path.insert(0, os.path.dirname(__file__))  # For absolute imports
 
 from sqlalchemy.orm import Session
-from database import SessionLocal
-from models import Lorebook, LoreEntry
+from database import SessionLocal, engine
+from models import Lorebook, LoreEntry, lowercase_keyword_text
 import random
-import json
+import orjson
+import multiprocessing
+from collections import Counter
+from itertools import chain
+
+import numpy as np
 from faker import Faker
 
 # Initialize Faker for generating diverse content
 fake = Faker()
 
+def _init_worker():
+    """Give each pool worker its own RNG state and Faker instance."""
+    global fake
+    random.seed()
+    fake = Faker()
+
 def generate_lore_entry_data(index):
     """Generate diverse test data for a lore entry"""
 
@@ -213,75 +224,73 @@ def create_test_lorebook():
 
         print(f"Using lorebook ID: {test_lorebook.id}")
 
-        # Generate and insert 200+ entries in batches
-        batch_size = 50
+        # Generate entry data across all cores, then insert in one bulk pass
         total_entries = 250  # Slightly more than 200 for better testing
 
         print(f"Generating {total_entries} lore entries...")
 
-        created_entries = []
-
-        for batch_start in range(0, total_entries, batch_size):
-            batch_end = min(batch_start + batch_size, total_entries)
-            batch_entries = []
-
-            print(f"Processing batch {batch_start}-{batch_end}...")
-
-            for i in range(batch_start, batch_end):
-                entry_data = generate_lore_entry_data(i)
-
-                entry = LoreEntry(
-                    lorebook_id=test_lorebook.id,
-                    title=entry_data["title"],
-                    content=entry_data["content"],
-                    keywords=entry_data["keywords"],
-                    secondary_keywords=entry_data["secondary_keywords"],
-                    logic=entry_data["logic"],
-                    trigger=entry_data["trigger"],
-                    order=entry_data["order"]
-                )
-
-                batch_entries.append(entry)
-                created_entries.append(entry)
-
-            # Add batch to database
-            db.add_all(batch_entries)
-            db.commit()
+        with multiprocessing.Pool(initializer=_init_worker) as pool:
+            all_data = list(pool.imap_unordered(generate_lore_entry_data, range(total_entries), chunksize=25))
+
+        # Bypass the ORM: one prepared statement executed over every row
+        rows = [
+            (
+                test_lorebook.id,
+                d["title"],
+                d["content"],
+                orjson.dumps(d["keywords"]).decode(),
+                orjson.dumps(d["secondary_keywords"]).decode(),
+                d["logic"],
+                d["trigger"],
+                d["order"],
+                lowercase_keyword_text(d["keywords"]),
+                lowercase_keyword_text(d["secondary_keywords"]),
+                d["content"].lower(),
+            )
+            for d in all_data
+        ]
+        db.commit()  # release the session's write lock before the raw insert
+        conn = engine.raw_connection()
+        try:
+            cur = conn.cursor()
+            cur.executemany(
+                'INSERT INTO lore_entries (lorebook_id, title, content, keywords, secondary_keywords, logic, "trigger", "order", '
+                "keywords_lower, secondary_keywords_lower, content_lower) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            conn.commit()
+        finally:
+            conn.close()
 
-            print(f"Committed batch of {len(batch_entries)} entries")
+        print(f"Committed {len(all_data)} entries")
 
         print("\n" + "="*70)
         print("TEST LOREBOOK CREATED SUCCESSFULLY!")
         print("="*70)
-        print(f"Total entries created: {len(created_entries)}")
+        print(f"Total entries created: {len(all_data)}")
         print(f"Lorebook ID: {test_lorebook.id}")
         print(f"Lorebook Name: {test_lorebook.name}")
 
         # Statistics
-        keyword_counts = {}
-        logic_counts = {}
-        trigger_ranges = {"full": 0, "high": 0, "medium": 0, "low": 0}
-
-        for entry in created_entries:
-            for kw in entry.keywords:
-                if kw not in keyword_counts:
-                    keyword_counts[kw] = 0
-                keyword_counts[kw] += 1
-
-            logic_counts[entry.logic.upper()] = logic_counts.get(entry.logic.upper(), 0) + 1
-
-            if entry.trigger == 100.0:
-                trigger_ranges["full"] += 1
-            elif entry.trigger >= 70.0:
-                trigger_ranges["high"] += 1
-            elif entry.trigger >= 40.0:
-                trigger_ranges["medium"] += 1
-            else:
-                trigger_ranges["low"] += 1
+        keyword_counts = Counter(chain.from_iterable(entry["keywords"] for entry in all_data))
+        logic_counts = dict(Counter(entry["logic"].upper() for entry in all_data))
+
+        triggers = np.fromiter(
+            (entry["trigger"] for entry in all_data),
+            dtype=np.float32,
+            count=len(all_data),
+        )
+        trigger_ranges = {
+            "full": int((triggers == 100.0).sum()),
+            "high": int(((triggers >= 70.0) & (triggers < 100.0)).sum()),
+            "medium": int(((triggers >= 40.0) & (triggers < 70.0)).sum()),
+            "low": int((triggers < 40.0).sum()),
+        }
 
         print("\nDATA STATISTICS:")
         print(f"- Total unique keywords: {len(keyword_counts)}")
-        print(f"- Most common keywords: {sorted(keyword_counts.items(), key=lambda x: x[1], reverse=True)[:10]}")
+        print(f"- Most common keywords: {keyword_counts.most_common(10)}")
         print(f"- Logic distribution: {logic_counts}")
         print(f"- Trigger ranges: {trigger_ranges}")
         print(".0f")
@@ -1,20 +1,168 @@
+from functools import lru_cache
 from pathlib import Path
-from sqlalchemy import create_engine
+import orjson
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.exc import OperationalError
 from sqlalchemy.orm import sessionmaker
 
-DB_PATH = Path(__file__).resolve().parent / "app.db"
+
+@lru_cache(maxsize=None)
+def _db_path() -> Path:
+    """Resolve the SQLite file location once per process."""
+    return Path(__file__).resolve().parent / "app.db"
+
+
+DB_PATH = _db_path()
 SQLALCHEMY_DATABASE_URL = f"sqlite:///{DB_PATH}"
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets chat turns read while another request commits, and each commit
+    # appends to the log instead of rewriting pages; NORMAL sync is still
+    # crash-safe in WAL mode (only the last commits can be lost on power cut).
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.close()
+
+
+@lru_cache(maxsize=None)
+def get_engine():
+    """Return the process-wide engine, creating it on first use."""
+    engine = create_engine(
+        SQLALCHEMY_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        pool_pre_ping=False,
+    )
+    event.listen(engine, "connect", _set_sqlite_pragmas)
+    return engine
+
+
+@lru_cache(maxsize=None)
+def get_sessionmaker():
+    """Return the process-wide session factory bound to ``get_engine()``."""
+    return sessionmaker(autocommit=False, autoflush=False, bind=get_engine())
+
+
+engine = get_engine()
+SessionLocal = get_sessionmaker()
 
 # Import Base from models
 try:
-    from .models import Base
+    from .models import Base, lowercase_keyword_text
 except ImportError:
-    from models import Base
+    from models import Base, lowercase_keyword_text
+
+def _add_missing_columns(conn):
+    """Add nullable model columns that an existing SQLite table predates."""
+    for table in Base.metadata.sorted_tables:
+        existing = {row[1] for row in conn.execute(text(f"PRAGMA table_info({table.name})"))}
+        for column in table.columns:
+            if column.name in existing or not column.nullable:
+                continue
+            col_type = column.type.compile(dialect=conn.dialect)
+            print(f"[CoolChat] Adding column {column.name} to {table.name}")
+            conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {col_type}'))
+
+
+def _add_missing_indexes(conn):
+    """Create model indexes that an existing SQLite table predates."""
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def _ensure_memory_autoincrement(conn):
+    """Rebuild a memory_entries table created before its ids used AUTOINCREMENT."""
+    ddl = conn.execute(text(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'memory_entries'"
+    )).scalar()
+    if not ddl or "AUTOINCREMENT" in ddl.upper():
+        return
+
+    conn.execute(text("ALTER TABLE memory_entries RENAME TO memory_entries_old"))
+    conn.execute(text("DROP INDEX IF EXISTS ix_memory_entries_id"))
+    Base.metadata.tables["memory_entries"].create(conn)
+    conn.execute(text("INSERT INTO memory_entries (id, json) SELECT id, json FROM memory_entries_old"))
+    conn.execute(text("DROP TABLE memory_entries_old"))
+    print("[CoolChat] Rebuilt memory_entries with AUTOINCREMENT ids")
+
+
+def _ensure_lore_fts(conn):
+    """Create the trigram FTS5 index over lore_entries and its sync triggers."""
+    installed = conn.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'trigger' AND name = 'lore_entries_fts_ai'"
+    )).first()
+    if installed:
+        return
+
+    # A leftover index without triggers (e.g. lore_entries was recreated) is stale
+    conn.execute(text("DROP TABLE IF EXISTS lore_entries_fts"))
+    try:
+        conn.execute(text(
+            "CREATE VIRTUAL TABLE lore_entries_fts USING fts5("
+            "content, keywords, secondary_keywords, "
+            "content='lore_entries', content_rowid='id', tokenize='trigram')"
+        ))
+    except OperationalError as e:
+        print(f"[CoolChat] FTS5 trigram index unavailable, keyword search uses LIKE scans: {e}")
+        return
+
+    conn.execute(text("""
+        CREATE TRIGGER lore_entries_fts_ai AFTER INSERT ON lore_entries BEGIN
+            INSERT INTO lore_entries_fts(rowid, content, keywords, secondary_keywords)
+            VALUES (new.id, new.content, new.keywords, new.secondary_keywords);
+        END
+    """))
+    conn.execute(text("""
+        CREATE TRIGGER lore_entries_fts_ad AFTER DELETE ON lore_entries BEGIN
+            INSERT INTO lore_entries_fts(lore_entries_fts, rowid, content, keywords, secondary_keywords)
+            VALUES ('delete', old.id, old.content, old.keywords, old.secondary_keywords);
+        END
+    """))
+    conn.execute(text("""
+        CREATE TRIGGER lore_entries_fts_au AFTER UPDATE OF content, keywords, secondary_keywords ON lore_entries BEGIN
+            INSERT INTO lore_entries_fts(lore_entries_fts, rowid, content, keywords, secondary_keywords)
+            VALUES ('delete', old.id, old.content, old.keywords, old.secondary_keywords);
+            INSERT INTO lore_entries_fts(rowid, content, keywords, secondary_keywords)
+            VALUES (new.id, new.content, new.keywords, new.secondary_keywords);
+        END
+    """))
+    conn.execute(text("INSERT INTO lore_entries_fts(lore_entries_fts) VALUES ('rebuild')"))
+    print("[CoolChat] Built lore_entries_fts search index")
+
+
+def _backfill_lore_search_text(conn):
+    """Fill the lowercased search columns for lore entries written before they existed."""
+    rows = conn.execute(text(
+        "SELECT id, keywords, secondary_keywords, content FROM lore_entries WHERE content_lower IS NULL"
+    )).fetchall()
+    if not rows:
+        return
+
+    def _keyword_text(raw):
+        try:
+            return lowercase_keyword_text(orjson.loads(raw) if raw else [])
+        except (orjson.JSONDecodeError, TypeError, AttributeError):
+            return ""
+
+    conn.execute(
+        text(
+            "UPDATE lore_entries SET keywords_lower = :keywords, "
+            "secondary_keywords_lower = :secondary, content_lower = :content WHERE id = :id"
+        ),
+        [
+            {
+                "id": row[0],
+                "keywords": _keyword_text(row[1]),
+                "secondary": _keyword_text(row[2]),
+                "content": (row[3] or "").lower(),
+            }
+            for row in rows
+        ],
+    )
+    print(f"[CoolChat] Backfilled search text for {len(rows)} lore entries")
+
 
 def create_tables():
     """Create all database tables."""
@@ -27,6 +175,22 @@ def create_tables():
     print("[CoolChat] Models loaded for table creation")
 
     Base.metadata.create_all(bind=engine)
+
+    with engine.begin() as conn:
+        _ensure_memory_autoincrement(conn)
+        _add_missing_columns(conn)
+        _add_missing_indexes(conn)
+
+        # Partial index used by fix_database.clean_invalid_lore_entries; its WHERE
+        # must match that query's filter term for term or SQLite ignores it
+        conn.execute(text("DROP INDEX IF EXISTS ix_lore_entries_lorebook_content_empty"))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_lore_entries_lorebook_content_blank "
+            "ON lore_entries(lorebook_id) WHERE content IS NULL OR trim(content) = ''"
+        ))
+
+        _backfill_lore_search_text(conn)
+        _ensure_lore_fts(conn)
     print("[CoolChat] Tables created successfully")
 
 def get_db():
@@ -4,7 +4,7 @@
 import sys
 import os
 from pathlib import Path
-from sqlalchemy import create_engine, text
+from sqlalchemy import func, text
 
 # Add the backend directory to the path
 backend_dir = Path(__file__).parent
@@ -12,7 +12,7 @@ sys.path.insert(0, str(backend_dir))
 
 from models import Character, Lorebook, LoreEntry
 from database import SessionLocal, get_db
-import json
+import orjson
 
 def fix_character_json_fields(db):
     """Fix corrupted JSON fields in characters table"""
@@ -33,7 +33,7 @@ def fix_character_json_fields(db):
             try:
                 # Try to parse if it's a JSON string
                 if char.alternate_greetings.strip():
-                    parsed = json.loads(char.alternate_greetings)
+                    parsed = orjson.loads(char.alternate_greetings)
                     if isinstance(parsed, list):
                         char.alternate_greetings = parsed
                         needs_update = True
@@ -43,7 +43,7 @@ def fix_character_json_fields(db):
                 else:
                     char.alternate_greetings = []
                     needs_update = True
-            except (json.JSONDecodeError, TypeError):
+            except (orjson.JSONDecodeError, TypeError):
                 char.alternate_greetings = []
                 needs_update = True
 
@@ -54,7 +54,7 @@ def fix_character_json_fields(db):
         elif isinstance(char.tags, str):
             try:
                 if char.tags.strip():
-                    parsed = json.loads(char.tags)
+                    parsed = orjson.loads(char.tags)
                     if isinstance(parsed, list):
                         char.tags = parsed
                         needs_update = True
@@ -64,7 +64,7 @@ def fix_character_json_fields(db):
                 else:
                     char.tags = []
                     needs_update = True
-            except (json.JSONDecodeError, TypeError):
+            except (orjson.JSONDecodeError, TypeError):
                 char.tags = []
                 needs_update = True
 
@@ -75,7 +75,7 @@ def fix_character_json_fields(db):
         elif isinstance(char.extensions, str):
             try:
                 if char.extensions.strip():
-                    parsed = json.loads(char.extensions)
+                    parsed = orjson.loads(char.extensions)
                     if isinstance(parsed, dict):
                         char.extensions = parsed
                         needs_update = True
@@ -85,7 +85,7 @@ def fix_character_json_fields(db):
                 else:
                     char.extensions = {}
                     needs_update = True
-            except (json.JSONDecodeError, TypeError):
+            except (orjson.JSONDecodeError, TypeError):
                 char.extensions = {}
                 needs_update = True
 
@@ -117,7 +117,7 @@ def fix_lore_entry_json_fields(db):
         elif isinstance(entry.keywords, str):
             try:
                 if entry.keywords.strip():
-                    parsed = json.loads(entry.keywords)
+                    parsed = orjson.loads(entry.keywords)
                     if isinstance(parsed, list):
                         entry.keywords = parsed
                         needs_update = True
@@ -127,7 +127,7 @@ def fix_lore_entry_json_fields(db):
                 else:
                     entry.keywords = []
                     needs_update = True
-            except (json.JSONDecodeError, TypeError):
+            except (orjson.JSONDecodeError, TypeError):
                 entry.keywords = []
                 needs_update = True
 
@@ -138,7 +138,7 @@ def fix_lore_entry_json_fields(db):
         elif isinstance(entry.secondary_keywords, str):
             try:
                 if entry.secondary_keywords.strip():
-                    parsed = json.loads(entry.secondary_keywords)
+                    parsed = orjson.loads(entry.secondary_keywords)
                     if isinstance(parsed, list):
                         entry.secondary_keywords = parsed
                         needs_update = True
@@ -148,7 +148,7 @@ def fix_lore_entry_json_fields(db):
                 else:
                     entry.secondary_keywords = []
                     needs_update = True
-            except (json.JSONDecodeError, TypeError):
+            except (orjson.JSONDecodeError, TypeError):
                 entry.secondary_keywords = []
                 needs_update = True
 
@@ -166,8 +166,10 @@ def clean_invalid_lore_entries(db):
     """Remove lore entries with invalid data"""
     print("[FIX] Cleaning invalid lore entries...")
 
-    # Get all lore entries
-    entries = db.query(LoreEntry).all()
+    # Only fetch entries whose content is null/empty or whitespace-only
+    entries = db.query(LoreEntry).filter(
+        (LoreEntry.content.is_(None)) | (func.trim(LoreEntry.content) == "")
+    ).all()
     removed_count = 0
 
     for entry in entries:
@@ -4,13 +4,21 @@
 import asyncio
 import base64
 import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import List, Dict, Any, Optional
+from functools import lru_cache
+from typing import List, Dict, Any, Optional, Tuple, Union
 
+import anyio.to_thread
 import numpy as np
-from sqlalchemy.orm import Session
+from sqlalchemy import String, case, column, event, func, inspect, or_, table, text
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.orm import Session, joinedload, lazyload, load_only
+from sqlalchemy.orm.attributes import get_history
 
-from .models import LoreEntry
+from .models import LoreEntry, entry_search_text
 from .rag_service import EmbeddingService
 from .database import SessionLocal
 
@@ -18,7 +26,221 @@ from .database import SessionLocal
 logger = logging.getLogger(__name__)
 
 
-@dataclass
+def _unit_vector(embedding: Union[str, bytes], normalized: bool = False) -> np.ndarray:
+    """Decode a base64 or raw float32 embedding and scale it to unit length (zero stays zero).
+
+    ``normalized`` marks vectors stored unit-length at write time, which skip the rescale.
+    """
+    try:
+        if isinstance(embedding, str):
+            embedding = base64.b64decode(embedding)
+        vec = np.frombuffer(embedding, dtype=np.float32)
+    except Exception as e:
+        logger.error("Failed to decode embedding: %s", e)
+        vec = np.array([], dtype=np.float32)
+    if not normalized:
+        norm = np.linalg.norm(vec)
+        if norm > 0:
+            vec = vec / norm
+    vec = np.ascontiguousarray(vec, dtype=np.float32)
+    vec.flags.writeable = False
+    return vec
+
+
+def _decode_unit_matrix(embeddings: List[Union[str, bytes]], dims: int) -> Tuple[np.ndarray, List[bool]]:
+    """Decode many embeddings of one dimension into a row-normalized (N, dims) matrix.
+
+    All rows are joined into one buffer and viewed with a single
+    ``np.frombuffer``. Base64 rows are decoded in one call when every vector
+    encodes without padding (dims * 4 divisible by 3). Rows that are the wrong
+    size or fail to decode are dropped and reported as False in the mask.
+    """
+    n_bytes = dims * 4
+    b64_len = 4 * -(-n_bytes // 3)
+    keep = [len(e) == (b64_len if isinstance(e, str) else n_bytes) for e in embeddings]
+    rows = [e for e, ok in zip(embeddings, keep) if ok]
+
+    try:
+        if rows and n_bytes % 3 == 0 and all(isinstance(e, str) for e in rows):
+            raw = base64.b64decode("".join(rows), validate=True)
+        else:
+            raw = b"".join(base64.b64decode(e, validate=True) if isinstance(e, str) else bytes(e) for e in rows)
+    except ValueError:
+        # A corrupt row poisons the joined decode; fall back to row by row
+        parts = []
+        for i, e in enumerate(embeddings):
+            if not keep[i]:
+                continue
+            try:
+                parts.append(base64.b64decode(e, validate=True) if isinstance(e, str) else bytes(e))
+            except ValueError:
+                logger.error("Failed to decode embedding at row %d", i)
+                keep[i] = False
+        raw = b"".join(parts)
+
+    matrix = np.frombuffer(raw, dtype=np.float32).reshape(-1, dims)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    matrix = (matrix / np.where(norms > 0, norms, 1.0)).astype(np.float32, copy=False)
+    return matrix, keep
+
+
+@lru_cache(maxsize=16384)
+def _decode_and_normalize(entry_id: int, version: Any, embedding: Union[str, bytes],
+                          normalized: bool = False) -> np.ndarray:
+    """Normalized stored embedding, cached per entry and embedding version."""
+    return _unit_vector(embedding, normalized)
+
+
+@lru_cache(maxsize=256)
+def _normalized_query(query_embedding: str) -> np.ndarray:
+    """Normalized query embedding, cached so repeated queries skip the decode."""
+    return _unit_vector(query_embedding)
+
+
+@lru_cache(maxsize=256)
+def _quantized_query(query_embedding: str) -> Tuple[np.ndarray, float]:
+    """Int8-quantized query embedding (widened to int32 for accumulation) and its scale."""
+    raw, scale = EmbeddingService.quantize_embedding(_normalized_query(query_embedding))
+    q8 = np.frombuffer(raw, dtype=np.int8).astype(np.int32)
+    q8.flags.writeable = False
+    return q8, scale
+
+
+# Trigram FTS5 index over lore_entries, maintained by database._ensure_lore_fts
+_lore_fts = table("lore_entries_fts", column("rowid"), column("rank"))
+
+# Columns needed to rank a candidate; content and the lorebook join are fetched
+# only for the rows that make the final cut.
+_CANDIDATE_COLUMNS = (
+    LoreEntry.id,
+    LoreEntry.trigger,
+    LoreEntry.embedding,
+    LoreEntry.embedding_blob,
+    LoreEntry.embedding_int8,
+    LoreEntry.embedding_scale,
+    LoreEntry.embedding_normalized,
+    LoreEntry.embedding_dimensions,
+    LoreEntry.embedding_updated_at,
+)
+
+
+def _keyword_score_expr(query_terms: List[str]):
+    """Keyword relevance score as a SQL expression over the lowercased columns.
+
+    Each term scores 20 for a primary keyword hit, else 10 for a secondary
+    keyword hit, else 5 for a content hit; the sum is scaled by the trigger.
+    """
+    # lower() on the raw columns only covers rows create_tables has not backfilled yet
+    primary = func.coalesce(LoreEntry.keywords_lower, func.lower(LoreEntry.keywords), "")
+    secondary = func.coalesce(LoreEntry.secondary_keywords_lower, func.lower(LoreEntry.secondary_keywords), "")
+    content = func.coalesce(LoreEntry.content_lower, func.lower(LoreEntry.content), "")
+
+    points = None
+    for term in query_terms:
+        term_points = case(
+            (func.instr(primary, term) > 0, 20),
+            (func.instr(secondary, term) > 0, 10),
+            (func.instr(content, term) > 0, 5),
+            else_=0,
+        )
+        points = term_points if points is None else points + term_points
+
+    multiplier = case((func.coalesce(LoreEntry.trigger, 0) != 0, LoreEntry.trigger / 100.0), else_=1.0)
+    return points * multiplier
+
+
+try:
+    import hnswlib
+except ImportError:  # optional; without it search ranks the keyword candidates only
+    hnswlib = None
+
+
+class AnnIndex:
+    """In-process HNSW index over stored lore entry embeddings.
+
+    Built lazily per database and embedding dimension, and marked stale by
+    the ``LoreEntry`` mapper events below whenever an embedding is written or
+    an entry is removed, so queries never poll the table. Only used when
+    ``hnswlib`` is installed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key: Optional[Tuple[str, int]] = None
+        self._stale = True
+        self._ids = np.empty(0, dtype=np.int64)
+        self._hnsw = None
+
+    def invalidate(self) -> None:
+        """Rebuild from the database on the next query"""
+        self._stale = True
+
+    def query(self, db: Session, query_vector: np.ndarray, k: int) -> List[Tuple[int, float]]:
+        """Return up to ``k`` (entry_id, cosine similarity) pairs, best first"""
+        dims = len(query_vector)
+        if hnswlib is None or not dims or k <= 0:
+            return []
+        with self._lock:
+            self._ensure_current(db, dims)
+            n = len(self._ids)
+            if n == 0:
+                return []
+            k = min(k, n)
+            self._hnsw.set_ef(max(k * 2, 50))
+            labels, distances = self._hnsw.knn_query(query_vector, k=k)
+            return [(int(i), float(1.0 - d)) for i, d in zip(labels[0], distances[0])]
+
+    def _ensure_current(self, db: Session, dims: int) -> None:
+        key = (str(db.get_bind().url), dims)
+        if key == self._key and not self._stale:
+            return
+
+        # Cleared before reading so a write that lands mid-build marks it stale again
+        self._stale = False
+        rows = db.query(
+            LoreEntry.id, LoreEntry.embedding_blob, LoreEntry.embedding
+        ).filter(LoreEntry.embedding.isnot(None), LoreEntry.embedding_dimensions == dims).all()
+        matrix, keep = _decode_unit_matrix([blob or embedding for _, blob, embedding in rows], dims)
+        ids = [row[0] for row, ok in zip(rows, keep) if ok]
+
+        self._ids = np.asarray(ids, dtype=np.int64)
+        self._hnsw = None
+        if ids:
+            index = hnswlib.Index(space="cosine", dim=dims)
+            index.init_index(max_elements=len(ids), ef_construction=200, M=16)
+            index.add_items(matrix, self._ids)
+            self._hnsw = index
+        self._key = key
+        logger.debug("🧭 Built ANN index over %d embeddings (dims=%d)", len(ids), dims)
+
+
+_ann_index = AnnIndex()
+
+
+@event.listens_for(LoreEntry, "after_insert")
+def _drop_ann_index_for_new_entry(mapper, connection, target) -> None:
+    if target.embedding is not None:
+        _ann_index.invalidate()
+
+
+@event.listens_for(LoreEntry, "after_delete")
+def _drop_ann_index_for_entry(mapper, connection, target) -> None:
+    _ann_index.invalidate()
+
+
+@event.listens_for(LoreEntry, "after_update")
+def _drop_ann_index_for_updated_entry(mapper, connection, target) -> None:
+    if (get_history(target, "embedding").has_changes()
+            or get_history(target, "embedding_dimensions").has_changes()):
+        _ann_index.invalidate()
+
+
+# Recent query embeddings keyed by (provider, model, normalized query)
+_QUERY_EMBEDDING_CACHE_SIZE = 2048
+_query_embedding_cache: "OrderedDict[Tuple[Any, Any, str], str]" = OrderedDict()
+
+
+@dataclass(slots=True)
 class SearchResult:
     """Structure for search results"""
     entry: LoreEntry
@@ -52,50 +274,69 @@ class HybridSearch:
             config.top_k_candidates,
         )
 
+        keyword_candidates: Optional[List[LoreEntry]] = None
         try:
-            # Step 2: Generate query embedding
-            logger.debug("🔄 Generating query embedding...")
-            query_embedding = await self.embedding_service.generate_embedding(query)
-            logger.debug("✅ Query embedding generated successfully")
-
-            # Step 3: Get keyword candidates
+            # Steps 2-3: Embed the query and fetch keyword candidates concurrently
             logger.debug(
-                "🔍 Getting keyword candidates (top %s)...",
+                "🔄 Generating query embedding and getting keyword candidates (top %s)...",
                 config.top_k_candidates,
             )
-            keyword_candidates = await self._get_keyword_candidates(
-                query, db_session, config.top_k_candidates
+            emb_task = asyncio.create_task(self._cached_query_embedding(query))
+            kw_task = asyncio.create_task(
+                self._get_keyword_candidates(query, db_session, config.top_k_candidates)
             )
+            query_embedding, keyword_candidates = await asyncio.gather(
+                emb_task, kw_task, return_exceptions=True
+            )
+            if isinstance(keyword_candidates, BaseException):
+                raise keyword_candidates
+            if isinstance(query_embedding, BaseException):
+                logger.error("❌ Error generating query embedding: %s", query_embedding)
+                logger.warning("⏭️  Falling back to keyword-only search")
+                return self._keyword_results(query, keyword_candidates, limit, db_session)
+            logger.debug("✅ Query embedding generated successfully")
             logger.debug("✅ Found %d keyword candidates", len(keyword_candidates))
 
-            if not keyword_candidates:
-                logger.debug("⏭️  No keyword candidates found, returning empty results")
+            # Step 3b: Semantic recall from the ANN index, unioned with keyword recall
+            semantic_hits = await self._semantic_candidates(query_embedding, db_session, config)
+            known_scores = dict(semantic_hits)
+            keyword_ids = {candidate.id for candidate in keyword_candidates}
+            candidates = keyword_candidates + self._load_candidates(
+                [entry_id for entry_id in known_scores if entry_id not in keyword_ids], db_session
+            )
+            logger.debug("✅ ANN index returned %d semantic candidates", len(semantic_hits))
+
+            if not candidates:
+                logger.debug("⏭️  No keyword or semantic candidates found, returning empty results")
                 return []
 
             # Step 4: Calculate hybrid scores
             logger.debug("🧮 Calculating hybrid scores...")
             search_results = await self._calculate_hybrid_scores(
-                keyword_candidates, query_embedding, config
+                candidates, query_embedding, config, known_scores
             )
 
-            # Step 5: Sort and prepare final results
-            search_results.sort(key=lambda x: x.hybrid_score, reverse=True)
-            top_results = search_results[:limit]
+            # Step 5: Sort, then load full rows only for the final results
+            top_results = self._top_results(search_results, limit)
+            for result, entry in zip(top_results, self._load_full_entries([r.entry for r in top_results], db_session)):
+                result.entry = entry
+                result.matched_terms = self._matched_terms(entry, query)
 
             # Log results
-            logger.debug("🏆 TOP %d RESULTS:", len(top_results))
-            for i, result in enumerate(top_results, 1):
-                entry = result.entry
-                logger.debug(
-                    "   #%d - ID:%s | KW:%.3f | SEM:%.3f | HYBRID:%.3f",
-                    i,
-                    entry.id,
-                    result.keyword_score,
-                    result.semantic_score,
-                    result.hybrid_score,
-                )
-                logger.debug("       Title: '%s'", entry.title or "Untitled")
-                logger.debug("       Content: '%s'", f"{entry.content[:100]}...")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("🏆 TOP %d RESULTS:", len(top_results))
+                for i, result in enumerate(top_results, 1):
+                    entry = result.entry
+                    logger.debug(
+                        "   #%d - ID:%s | KW:%.3f | SEM:%.3f | HYBRID:%.3f",
+                        i,
+                        entry.id,
+                        result.keyword_score,
+                        result.semantic_score,
+                        result.hybrid_score,
+                    )
+                    logger.debug("       Title: '%s'", entry.title or "Untitled")
+                    logger.debug("       Content: '%.100s...'", entry.content)
 
             # Convert to API format
             final_results = []
@@ -127,123 +368,261 @@ class HybridSearch:
         except Exception as e:
             logger.error("❌ Error in hybrid search: %s", e)
             logger.warning("⏭️  Falling back to keyword-only search")
+            if isinstance(keyword_candidates, list):
+                # Keyword retrieval already succeeded; don't query the database again
+                return self._keyword_results(query, keyword_candidates, limit, db_session)
             return await self._keyword_search_fallback(query, db_session, limit)
 
-    async def _get_keyword_candidates(self, query: str, db_session: Optional[Session], limit: int) -> List[LoreEntry]:
-        """Get initial candidates using keyword search"""
-        from sqlalchemy import or_
-        from sqlalchemy.orm import joinedload
+    @staticmethod
+    def _top_results(search_results: List[SearchResult], limit: int) -> List[SearchResult]:
+        """Best ``limit`` results by hybrid score, selected with a partial sort"""
+        if limit <= 0 or not search_results:
+            return []
+        hybrid_scores = np.fromiter(
+            (result.hybrid_score for result in search_results), dtype=np.float64, count=len(search_results)
+        )
+        if len(hybrid_scores) > limit:
+            top_idx = np.argpartition(-hybrid_scores, limit - 1)[:limit]
+            top_idx = top_idx[np.argsort(-hybrid_scores[top_idx], kind="stable")]
+        else:
+            top_idx = np.argsort(-hybrid_scores, kind="stable")
+        return [search_results[i] for i in top_idx]
 
-        if db_session:
-            db = db_session
-            close = False
-        elif self.embedding_service._db:
-            db = self.embedding_service._db
-            close = False
+    async def _cached_query_embedding(self, query: str) -> str:
+        """Embed the whitespace/case-normalized query, reusing recent results"""
+        config = self.embedding_service.config
+        q_norm = " ".join(query.lower().split())
+        key = (getattr(config, "provider", None), getattr(config, "model", None), q_norm)
+
+        embedding = _query_embedding_cache.get(key)
+        if embedding is not None:
+            _query_embedding_cache.move_to_end(key)
+            logger.debug("✅ Query embedding cache hit")
+            return embedding
+
+        batcher = getattr(self.embedding_service, "batched", None)
+        if batcher is not None:
+            embedding = await batcher.embed(q_norm)
         else:
-            db = SessionLocal()
-            close = True
-        try:
-            query_terms = [term.strip().lower() for term in query.split() if term.strip()]
+            embedding = await self.embedding_service.generate_embedding(q_norm)
+        _query_embedding_cache[key] = embedding
+        if len(_query_embedding_cache) > _QUERY_EMBEDDING_CACHE_SIZE:
+            _query_embedding_cache.popitem(last=False)
+        return embedding
 
-            if not query_terms:
-                return []
+    async def _semantic_candidates(self, query_embedding: str, db_session: Optional[Session],
+                                   config) -> List[Tuple[int, float]]:
+        """Nearest stored embeddings to the query that clear the similarity threshold.
 
-            # Build keyword filters
-            content_filters = [LoreEntry.content.ilike(f"%{term}%") for term in query_terms]
-            keyword_filters = [LoreEntry.keywords.cast(str).ilike(f"%{term}%") for term in query_terms]
-            secondary_keyword_filters = [LoreEntry.secondary_keywords.cast(str).ilike(f"%{term}%") for term in query_terms]
+        Empty without ``hnswlib``; the search then ranks keyword candidates only.
+        """
+        if hnswlib is None:
+            return []
+        threshold = getattr(config, "similarity_threshold", 0.0)
+        query_vector = _normalized_query(query_embedding)
+        with self._session(db_session) as db:
+            # Index rebuilds and HNSW queries block, so keep them off the event loop
+            hits = await anyio.to_thread.run_sync(_ann_index.query, db, query_vector, config.top_k_candidates)
+        return [(entry_id, similarity) for entry_id, similarity in hits if similarity >= threshold]
+
+    def _load_candidates(self, entry_ids: List[int], db_session: Optional[Session]) -> List[LoreEntry]:
+        """Ranking columns for semantic-only candidates (no keyword match, so a zero keyword score)"""
+        if not entry_ids:
+            return []
+        with self._session(db_session) as db:
+            entries = db.query(LoreEntry).options(
+                load_only(*_CANDIDATE_COLUMNS), lazyload(LoreEntry.lorebook)
+            ).filter(LoreEntry.id.in_(entry_ids)).all()
+        for entry in entries:
+            entry.keyword_score = 0.0
+        return entries
+
+    @contextmanager
+    def _session(self, db_session: Optional[Session]):
+        """Yield the caller's session, the service's session, or a short-lived one"""
+        service_db = getattr(self.embedding_service, "_db", None)
+        if db_session:
+            yield db_session
+        elif service_db:
+            yield service_db
+        else:
+            db = SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
 
-            combined_filters = content_filters + keyword_filters + secondary_keyword_filters
+    async def _get_keyword_candidates(self, query: str, db_session: Optional[Session], limit: int) -> List[LoreEntry]:
+        """Get initial candidates, scored in SQL, loading only the columns ranking needs"""
+        query_terms = [term.strip().lower() for term in query.split() if term.strip()]
 
-            entries = db.query(LoreEntry).options(joinedload(LoreEntry.lorebook)).filter(
-                or_(*combined_filters)
-            ).limit(limit).all()
+        if not query_terms:
+            return []
 
-            # Add keyword scores to entries
-            for entry in entries:
-                entry.keyword_score = self._calculate_keyword_score(entry, query_terms)
+        with self._session(db_session) as db:
+            keyword_score = _keyword_score_expr(query_terms).label("keyword_score")
+            base = db.query(LoreEntry, keyword_score).options(
+                load_only(*_CANDIDATE_COLUMNS), lazyload(LoreEntry.lorebook)
+            )
 
+            rows = None
+            # Trigram matching needs at least three characters per term
+            if all(len(term) >= 3 for term in query_terms):
+                match = " OR ".join('"' + term.replace('"', '""') + '"' for term in query_terms)
+                try:
+                    rows = base.join(_lore_fts, _lore_fts.c.rowid == LoreEntry.id).filter(
+                        text("lore_entries_fts MATCH :match").bindparams(match=match)
+                    ).order_by(_lore_fts.c.rank).limit(limit).all()
+                except OperationalError as e:
+                    logger.debug("FTS candidate lookup unavailable, using LIKE scan: %s", e)
+
+            if rows is None:
+                # Build keyword filters
+                content_filters = [LoreEntry.content.ilike(f"%{term}%") for term in query_terms]
+                keyword_filters = [LoreEntry.keywords.cast(String).ilike(f"%{term}%") for term in query_terms]
+                secondary_keyword_filters = [LoreEntry.secondary_keywords.cast(String).ilike(f"%{term}%") for term in query_terms]
+
+                combined_filters = content_filters + keyword_filters + secondary_keyword_filters
+                rows = base.filter(or_(*combined_filters)).limit(limit).all()
+
+        entries = []
+        for entry, score in rows:
+            entry.keyword_score = float(score)
+            entries.append(entry)
+        return entries
+
+    def _load_full_entries(self, entries: List[LoreEntry], db_session: Optional[Session]) -> List[LoreEntry]:
+        """Return ``entries`` with content and lorebook loaded, in the same order"""
+        missing = [entry.id for entry in entries if "content" in inspect(entry).unloaded]
+        if not missing:
             return entries
 
-        finally:
-            if close:
-                db.close()
-
-    def _calculate_keyword_score(self, entry: LoreEntry, query_terms: List[str]) -> float:
-        """Calculate keyword relevance score for an entry"""
-        score = 0
-        primary_keywords = [kw.lower() for kw in (entry.keywords or [])]
-        secondary_keywords = [kw.lower() for kw in (entry.secondary_keywords or [])]
-        content_lower = entry.content.lower()
-
-        for term in query_terms:
-            # Primary keyword matches
-            if any(term in kw for kw in primary_keywords):
-                score += 20
-            # Secondary keyword matches
-            elif any(term in kw for kw in secondary_keywords):
-                score += 10
-            # Content matches
-            elif term in content_lower:
-                score += 5
-
-        # Apply trigger multiplier
-        trigger_multiplier = entry.trigger / 100.0 if entry.trigger else 1.0
-        return score * trigger_multiplier
+        with self._session(db_session) as db:
+            by_id = {
+                entry.id: entry
+                for entry in db.query(LoreEntry).options(joinedload(LoreEntry.lorebook)).filter(
+                    LoreEntry.id.in_(missing)
+                ).all()
+            }
+        loaded = []
+        for entry in entries:
+            full = by_id.get(entry.id, entry)
+            full.keyword_score = entry.keyword_score
+            loaded.append(full)
+        return loaded
+
+    @staticmethod
+    def _matched_terms(entry: LoreEntry, query: str) -> List[str]:
+        """Distinct query terms found in the entry's keywords, secondary keywords or content"""
+        primary_text, secondary_text, content_text = entry_search_text(entry)
+        return [
+            term for term in dict.fromkeys(query.lower().split())
+            if term in primary_text or term in secondary_text or term in content_text
+        ]
 
     async def _calculate_hybrid_scores(self, candidates: List[LoreEntry],
-                                      query_embedding: str, config) -> List[SearchResult]:
-        """Calculate hybrid keyword + semantic scores"""
-        query_vector = self.embedding_service.decode_embedding(query_embedding)
-        semantic_scores = {}
-        entries_with_embeddings = 0
+                                      query_embedding: str, config,
+                                      known_scores: Optional[Dict[int, float]] = None) -> List[SearchResult]:
+        """Calculate hybrid keyword + semantic scores
 
+        ``known_scores`` holds similarities already computed by the ANN index;
+        those candidates skip the matrix scoring below.
+        """
+        known_scores = known_scores or {}
+        query_vector = _normalized_query(query_embedding)
+        query_dims = len(query_vector)
+        config_dims = config.dimensions
+        keyword_weight = config.keyword_weight
+        semantic_weight = config.semantic_weight
+        semantic_scores = {candidate.id: 0.0 for candidate in candidates}
+
+        valid = []
         for candidate in candidates:
-            # Calculate semantic score with dimension validation
-            if candidate.embedding:
-                if candidate.embedding_dimensions == config.dimensions:
-                    entries_with_embeddings += 1
-                    entry_vector = self.embedding_service.decode_embedding(candidate.embedding)
-                    similarity = self.embedding_service.cosine_similarity(query_vector, entry_vector)
-                    semantic_score = max(0, similarity)  # Ensure non-negative
-                elif candidate.embedding_dimensions == len(query_vector):
-                    # Allow backward compatibility: use the candidate's dimension if it matches query
-                    logger.info(
-                        "ℹ️  Using backward-compatible embedding for entry %s: stored_dimensions=%s (config expects %s)",
-                        candidate.id,
-                        candidate.embedding_dimensions,
-                        config.dimensions,
-                    )
-                    entries_with_embeddings += 1
-                    entry_vector = self.embedding_service.decode_embedding(candidate.embedding)
-                    similarity = self.embedding_service.cosine_similarity(query_vector, entry_vector)
-                    semantic_score = max(0, similarity)  # Ensure non-negative
+            if candidate.id in known_scores:
+                semantic_scores[candidate.id] = max(0.0, known_scores[candidate.id])
+                continue
+            if not (candidate.embedding_blob or candidate.embedding):
+                continue
+            if candidate.embedding_dimensions == config_dims:
+                valid.append(candidate)
+            elif candidate.embedding_dimensions == query_dims:
+                # Allow backward compatibility: use the candidate's dimension if it matches query
+                logger.info(
+                    "ℹ️  Using backward-compatible embedding for entry %s: stored_dimensions=%s (config expects %s)",
+                    candidate.id,
+                    candidate.embedding_dimensions,
+                    config_dims,
+                )
+                valid.append(candidate)
+            else:
+                # Complete dimension mismatch - skip this entry
+                logger.warning(
+                    "⚠️  Skipping entry %s due to dimension mismatch: stored=%s, query=%s, config=%s",
+                    candidate.id,
+                    candidate.embedding_dimensions,
+                    query_dims,
+                    config_dims,
+                )
+        entries_with_embeddings = len(valid) + sum(1 for candidate in candidates if candidate.id in known_scores)
+
+        if valid and query_dims:
+            sims = np.zeros(len(valid), dtype=np.float32)
+            quantized, dense = [], []
+            for i, candidate in enumerate(valid):
+                if (candidate.embedding_int8 is not None and candidate.embedding_scale is not None
+                        and len(candidate.embedding_int8) == query_dims):
+                    quantized.append(i)
                 else:
-                    # Complete dimension mismatch - skip this entry
-                    logger.warning(
-                        "⚠️  Skipping entry %s due to dimension mismatch: stored=%s, query=%s, config=%s",
+                    dense.append(i)
+
+            if quantized:
+                # int8 rows: one integer GEMV, then rescale to cosine similarity
+                q8, query_scale = _quantized_query(query_embedding)
+                m8 = np.empty((len(quantized), query_dims), dtype=np.int8)
+                scales = np.empty(len(quantized), dtype=np.float32)
+                for row, i in enumerate(quantized):
+                    m8[row] = np.frombuffer(valid[i].embedding_int8, dtype=np.int8)
+                    scales[row] = valid[i].embedding_scale
+                sims[quantized] = (m8.astype(np.int32) @ q8) * scales * query_scale
+
+            if dense:
+                # Entries not yet quantized: stack cached float32 unit vectors into one GEMV
+                matrix = np.zeros((len(dense), query_dims), dtype=np.float32)
+                ragged = []
+                for row, i in enumerate(dense):
+                    candidate = valid[i]
+                    vec = _decode_and_normalize(
                         candidate.id,
-                        candidate.embedding_dimensions,
-                        len(query_vector),
-                        config.dimensions,
+                        candidate.embedding_updated_at,
+                        candidate.embedding_blob or candidate.embedding,
+                        bool(candidate.embedding_normalized),
                     )
-                    semantic_score = 0.0
-            else:
-                semantic_score = 0.0
-
-            semantic_scores[candidate.id] = semantic_score
-
-        logger.debug("📈 Semantic analysis complete:")
-        logger.debug(
-            "   - Entries with embeddings: %d/%d",
-            entries_with_embeddings,
-            len(candidates),
-        )
-        logger.debug(
-            "   - Average semantic score: %.3f",
-            sum(semantic_scores.values()) / len(semantic_scores) if semantic_scores else 0.0,
-        )
+                    if vec.shape[0] == query_dims:
+                        matrix[row] = vec
+                    else:
+                        ragged.append((i, vec))
+                sims[dense] = matrix @ query_vector
+
+                # Stored vectors of a different length keep the truncating pairwise path
+                cosine_similarity = self.embedding_service.cosine_similarity
+                for i, vec in ragged:
+                    sims[i] = cosine_similarity(query_vector, vec)
+
+            sims = np.maximum(sims, 0.0)  # Ensure non-negative
+            for candidate, similarity in zip(valid, sims.tolist()):
+                semantic_scores[candidate.id] = similarity
+
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("📈 Semantic analysis complete:")
+            logger.debug(
+                "   - Entries with embeddings: %d/%d",
+                entries_with_embeddings,
+                len(candidates),
+            )
+            logger.debug(
+                "   - Average semantic score: %.3f",
+                sum(semantic_scores.values()) / len(semantic_scores) if semantic_scores else 0.0,
+            )
 
         # Calculate hybrid scores
         search_results = []
@@ -252,15 +631,14 @@ class HybridSearch:
             semantic_score = semantic_scores[candidate.id]
 
             # Apply weights
-            hybrid_score = (config.keyword_weight * keyword_score +
-                          config.semantic_weight * semantic_score)
+            hybrid_score = keyword_weight * keyword_score + semantic_weight * semantic_score
 
             search_results.append(SearchResult(
                 entry=candidate,
                 keyword_score=keyword_score,
                 semantic_score=semantic_score,
                 hybrid_score=hybrid_score,
-                matched_terms=candidate.content.lower().split()[:5]  # Approximate
+                matched_terms=[]  # Filled in once the final rows are loaded
             ))
 
         return search_results
@@ -269,9 +647,13 @@ class HybridSearch:
         """Fallback keyword-only search when embeddings fail"""
         logger.debug("🔍 Performing keyword-only search fallback")
         candidates = await self._get_keyword_candidates(query, db_session, limit * 2)
+        return self._keyword_results(query, candidates, limit, db_session)
 
+    def _keyword_results(self, query: str, candidates: List[LoreEntry], limit: int,
+                         db_session: Optional[Session] = None) -> List[Dict[str, Any]]:
+        """Format keyword-scored candidates as API results without semantic scores"""
         results = []
-        for candidate in candidates[:limit]:
+        for candidate in self._load_full_entries(candidates[:limit], db_session):
             results.append({
                 "id": candidate.id,
                 "title": candidate.title,
@@ -286,7 +668,7 @@ class HybridSearch:
                 "score": candidate.keyword_score,
                 "keyword_score": candidate.keyword_score,
                 "semantic_score": 0.0,
-                "matched_terms": query.split()
+                "matched_terms": self._matched_terms(candidate, query)
             })
 
         logger.debug("✅ Keyword fallback search returned %d results", len(results))
@@ -6,27 +6,41 @@ subset of SillyTavern's functionality so the front-end can store and retrieve
 character definitions.
 """
 
-from fastapi import FastAPI, HTTPException, Request, Depends
+from fastapi import FastAPI, File, Form, HTTPException, Request, Depends, UploadFile
+from fastapi.datastructures import Default
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from pydantic import BaseModel
-from typing import Dict, List, Optional, Union, Any
+from typing import AsyncIterator, Dict, List, NamedTuple, Optional, Set, Tuple, Union, Any
+import anyio.to_thread
 import asyncio
+import base64
+import hashlib
 import httpx
+import itertools
 import json
+import orjson
+import re
+import struct
 import time
 from datetime import datetime, timedelta
-from fastapi.responses import StreamingResponse
-from .config import AppConfig, ProviderConfig, load_config, save_config, mask_secret, Provider, ImagesConfig, ImageProvider
-from .models import Lorebook, LoreEntry, Character as CharacterModel, Circuit
+from fastapi.responses import Response, StreamingResponse
+from .config import AppConfig, ProviderConfig, current_config, load_config, save_config, mask_secret, Provider, ImagesConfig, ImageProvider
+from .models import Lorebook, LoreEntry, Character as CharacterModel, Circuit, MemoryRecord, character_lorebook_association
 from .storage import load_json, save_json, public_dir
+from .responses import ORJSONResponse
+from .profiling import ProfilerMiddleware, metrics_csv
 from .database import SessionLocal, get_db
+from sqlalchemy import event, func, select, text
 from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import get_history
 from .routers import lore, circuits
 from .circuit_executor import execute_circuit
 import os
 
-app = FastAPI(title="CoolChat")
+# Wrapped in Default() so routes with a response_model keep FastAPI's
+# Pydantic-to-bytes fast path; everything else is rendered by orjson.
+app = FastAPI(title="CoolChat", default_response_class=Default(ORJSONResponse))
 
 # Allow CORS for frontend development
 app.add_middleware(
@@ -37,6 +51,53 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Opt-in per-request timings, exported at /debug/metrics.csv
+if os.getenv("COOLCHAT_PROFILE") == "1":
+    app.add_middleware(ProfilerMiddleware)
+
+    @app.get("/debug/metrics.csv", include_in_schema=False)
+    async def debug_metrics_csv() -> StreamingResponse:
+        return StreamingResponse(metrics_csv(), media_type="text/csv")
+
+
+# Shared outbound HTTP client so provider calls reuse pooled keep-alive
+# connections instead of paying a fresh TLS handshake per request. Bound to
+# the event loop that created it; per-call timeouts are passed on each request.
+_http: tuple[asyncio.AbstractEventLoop, httpx.AsyncClient] | None = None
+
+try:
+    import h2  # noqa: F401  httpx's optional HTTP/2 support
+    _HTTP2 = True
+except ImportError:  # optional; providers are reached over pooled HTTP/1.1
+    _HTTP2 = False
+
+
+def _http_client() -> httpx.AsyncClient:
+    global _http
+    loop = asyncio.get_running_loop()
+    if _http is None or _http[0] is not loop or _http[1].is_closed:
+        _http = (loop, httpx.AsyncClient(
+            timeout=httpx.Timeout(connect=10.0, read=60.0, write=10.0, pool=10.0),
+            limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+            http2=_HTTP2,
+        ))
+    return _http[1]
+
+
+@app.on_event("startup")
+async def _raise_threadpool_limit():
+    # Sync handlers (the circuits router) and the get_db generator dependency
+    # run in anyio worker threads; the default 40 tokens queues them under load.
+    anyio.to_thread.current_default_thread_limiter().total_tokens = 100
+
+
+@app.on_event("shutdown")
+async def _close_http_client():
+    global _http
+    if _http is not None:
+        await _http[1].aclose()
+        _http = None
+
 # Development bypass endpoint for testing
 @app.get("/test", summary="Development testing endpoint", include_in_schema=False)
 async def test_endpoint():
@@ -272,15 +333,20 @@ class LoreEntryCreate(BaseModel):
 
 
 
+# Liveness bodies never change, so they are encoded once at import
+_ROOT_BYTES = orjson.dumps({"message": "CoolChat backend running"})
+_HEALTH_BYTES = orjson.dumps({"status": "ok"})
+
+
 @app.get("/")
-async def root():
+async def root() -> Response:
     """Basic sanity check endpoint for the API root."""
-    return {"message": "CoolChat backend running"}
+    return Response(_ROOT_BYTES, media_type="application/json")
 
 @app.get("/health")
-async def health_check():
+async def health_check() -> Response:
     """Simple endpoint to confirm the service is running."""
-    return {"status": "ok"}
+    return Response(_HEALTH_BYTES, media_type="application/json")
 
 
 # ---------------------------------------------------------------------------
@@ -288,11 +354,69 @@ async def health_check():
 # ---------------------------------------------------------------------------
 
 
-@app.get("/characters", response_model=List[Character])
-async def list_characters(db: Session = Depends(get_db)) -> List[Character]:
+# Character fields stored as plain columns, and the values used in place of NULL
+_CHARACTER_COLUMNS = [name for name in Character.model_fields if name != "lorebook_ids"]
+_CHARACTER_NULL_DEFAULTS = {"description": "", "alternate_greetings": [], "tags": []}
+
+
+def _character_payloads(db: Session, char_id: int | None = None) -> List[Dict[str, Any]]:
+    """Project character cards straight into JSON-ready dicts.
+
+    Reads only the card columns plus the lorebook links, skipping ORM
+    hydration and response-model validation.
+    """
+
+    query = db.query(*(getattr(CharacterModel, name) for name in _CHARACTER_COLUMNS))
+    assoc = character_lorebook_association.c
+    links_query = select(assoc.character_id, assoc.lorebook_id)
+    if char_id is not None:
+        query = query.filter(CharacterModel.id == char_id)
+        links_query = links_query.where(assoc.character_id == char_id)
+    rows = query.all()
+    links: Dict[int, List[int]] = {}
+    for owner_id, lorebook_id in db.execute(links_query):
+        links.setdefault(owner_id, []).append(lorebook_id)
+
+    items = []
+    for row in rows:
+        item = row._asdict()
+        for key, default in _CHARACTER_NULL_DEFAULTS.items():
+            if item[key] is None:
+                item[key] = default
+        item["lorebook_ids"] = links.get(item["id"], [])
+        items.append(item)
+    return items
+
+
+# Encoded character cards by id and the GET /characters body built from them,
+# both dropped by any flush that touches a character or lorebook (lorebook
+# deletes drop association rows).
+_character_json: Dict[int, bytes] = {}
+_character_list_json: bytes | None = None
+
+
+@event.listens_for(Session, "after_flush")
+def _drop_character_list(session, flush_context) -> None:
+    global _character_list_json
+    if _character_list_json is None and not _character_json:
+        return
+    for obj in itertools.chain(session.new, session.dirty, session.deleted):
+        if isinstance(obj, (CharacterModel, Lorebook)):
+            _character_json.clear()
+            _character_list_json = None
+            return
+
+
+@app.get("/characters", responses={200: {"model": List[Character]}})
+async def list_characters(db: Session = Depends(get_db)) -> Response:
     """Return all stored character cards."""
 
-    return db.query(CharacterModel).all()
+    global _character_list_json
+    if _character_list_json is None:
+        encoded = {item["id"]: orjson.dumps(item) for item in _character_payloads(db)}
+        _character_json.update(encoded)
+        _character_list_json = b"[" + b",".join(encoded.values()) + b"]"
+    return Response(_character_list_json, media_type="application/json")
 
 
 @app.post("/characters", response_model=Character, status_code=201)
@@ -314,14 +438,17 @@ async def create_character(payload: CharacterCreate, db: Session = Depends(get_d
     return char
 
 
-@app.get("/characters/{char_id}", response_model=Character)
-async def get_character(char_id: int, db: Session = Depends(get_db)) -> Character:
+@app.get("/characters/{char_id}", responses={200: {"model": Character}})
+async def get_character(char_id: int, db: Session = Depends(get_db)) -> Response:
     """Fetch a single character by its identifier."""
 
-    char = db.get(CharacterModel, char_id)
-    if char is None:
-        raise HTTPException(status_code=404, detail="Character not found")
-    return char
+    cached = _character_json.get(char_id)
+    if cached is None:
+        items = _character_payloads(db, char_id)
+        if not items:
+            raise HTTPException(status_code=404, detail="Character not found")
+        cached = _character_json[char_id] = orjson.dumps(items[0])
+    return Response(cached, media_type="application/json")
 
 
 @app.delete("/characters/{char_id}", status_code=204)
@@ -336,20 +463,19 @@ async def delete_character(char_id: int, db: Session = Depends(get_db)) -> None:
     return None
 
 
-@app.put("/characters/{char_id}", response_model=Character)
-async def update_character(char_id: int, payload: CharacterUpdate, db: Session = Depends(get_db)) -> Character:
+@app.put("/characters/{char_id}", responses={200: {"model": Character}})
+async def update_character(char_id: int, payload: CharacterUpdate, db: Session = Depends(get_db)) -> ORJSONResponse:
     char = db.get(CharacterModel, char_id)
     if char is None:
         raise HTTPException(status_code=404, detail="Character not found")
-    data = payload.model_dump(exclude_unset=True)
-    lorebook_ids = data.pop("lorebook_ids", None)
-    for key, value in data.items():
-        setattr(char, key, value)
-    if lorebook_ids is not None:
-        char.lorebooks = db.query(Lorebook).filter(Lorebook.id.in_(lorebook_ids)).all()
+    # Copy only the fields the client sent straight off the validated payload;
+    # the mapper listener drops this character's cached prompt sections.
+    for key in payload.model_fields_set - {"lorebook_ids"}:
+        setattr(char, key, getattr(payload, key))
+    if payload.lorebook_ids is not None:
+        char.lorebooks = db.query(Lorebook).filter(Lorebook.id.in_(payload.lorebook_ids)).all()
     db.commit()
-    db.refresh(char)
-    return char
+    return ORJSONResponse(_character_payloads(db, char_id)[0])
 
 
 # ---------------------------------------------------------------------------
@@ -389,12 +515,40 @@ class MemoryCreate(BaseModel):
     content: str
 
 
-_memory: Dict[int, MemoryEntry] = {}
-_next_memory_id: int = 1
+# Memory entries live in the memory_entries table as encoded JSON bodies; this
+# mirrors them for reads, and the joined list body is built lazily from it
+# (None after any write).
+_memory_json: Dict[int, bytes] = {}
+_memory_list_json: bytes | None = None
+
+
+def _load_memory() -> None:
+    """Fill the memory cache from SQLite, importing a legacy memory.json once."""
+    global _memory_list_json
+    data = load_json("memory.json", {"next_id": 1, "items": []})
+    db = SessionLocal()
+    try:
+        rows = db.execute(select(MemoryRecord.id, MemoryRecord.json)).all()
+        if not rows and data.get("items"):
+            # Written by our own _save_memory; no need to revalidate
+            rows = [(m["id"], orjson.dumps(MemoryEntry.model_construct(**m).model_dump())) for m in data["items"]]
+            db.add_all(MemoryRecord(id=mid, json=body) for mid, body in rows)
+            db.flush()
+            # Legacy ids below next_id may have been deleted; never reissue them
+            db.execute(
+                text("UPDATE sqlite_sequence SET seq = max(seq, :seq) WHERE name = 'memory_entries'"),
+                {"seq": int(data.get("next_id", 1)) - 1},
+            )
+            db.commit()
+    finally:
+        db.close()
+    _memory_json.clear()
+    _memory_json.update(rows)
+    _memory_list_json = None
 
 
 def _load_state() -> None:
-    global _lore, _next_lore_id, _lorebooks, _next_lorebook_id, _memory, _next_memory_id, _chat_histories
+    global _lore, _next_lore_id, _lorebooks, _next_lorebook_id, _chat_histories
 
     # Characters are stored in the database; no need to load from JSON
 
@@ -427,9 +581,7 @@ def _load_state() -> None:
             print(f"[CoolChat] Skipping invalid lorebook {lb.get('id', 'unknown')}: {inner_e}")
             continue
 
-    data = load_json("memory.json", {"next_id": 1, "items": []})
-    _next_memory_id = int(data.get("next_id", 1))
-    _memory = {m["id"]: MemoryEntry(**m) for m in data.get("items", [])}
+    _load_memory()
 
     globals_dict = load_json("histories.json", {})
     _chat_histories.clear(); _chat_histories.update(globals_dict)
@@ -470,10 +622,6 @@ def _save_lorebooks() -> None:
     save_json("lorebooks.json", {"next_id": _next_lorebook_id, "items": [lb.model_dump() for lb in _lorebooks.values()]})
 
 
-def _save_memory() -> None:
-    save_json("memory.json", {"next_id": _next_memory_id, "items": [m.model_dump() for m in _memory.values()]})
-
-
 def _save_histories() -> None:
     save_json("histories.json", _chat_histories)
 
@@ -488,54 +636,82 @@ def _get_character(char_id: int) -> CharacterModel | None:
 
 
 def _summarize(text: str, width: int = 60) -> str:
-    """Create a short summary for the supplied text."""
+    """Create a short summary for the supplied text.
 
-    import textwrap
+    Matches ``textwrap.shorten(text, width, placeholder="...")`` (collapsed
+    whitespace, cut at a word boundary) without its regex word splitting;
+    a first word longer than the cap is cut mid-word instead of dropped.
+    """
 
-    return textwrap.shorten(text, width=width, placeholder="...")
+    text = " ".join(text.split())
+    if len(text) <= width:
+        return text
+    cut = text.rfind(" ", 0, width - 2)
+    return (text[:cut] if cut > 0 else text[:width - 3]) + "..."
 
 
-@app.get("/memory", response_model=List[MemoryEntry])
-async def list_memory() -> List[MemoryEntry]:
+@app.get("/memory", responses={200: {"model": List[MemoryEntry]}})
+async def list_memory() -> Response:
     """Return all stored memory entries."""
 
-    return list(_memory.values())
+    global _memory_list_json
+    if _memory_list_json is None:
+        _memory_list_json = b"[" + b",".join(_memory_json.values()) + b"]"
+    return Response(_memory_list_json, media_type="application/json")
 
 
-@app.post("/memory", response_model=MemoryEntry, status_code=201)
-async def create_memory(payload: MemoryCreate) -> MemoryEntry:
+@app.post("/memory", responses={201: {"model": MemoryEntry}}, status_code=201)
+async def create_memory(payload: MemoryCreate) -> Response:
     """Store a new memory entry with an auto-generated summary."""
 
-    global _next_memory_id
-    entry = MemoryEntry(
-        id=_next_memory_id,
-        content=payload.content,
-        summary=_summarize(payload.content),
-    )
-    _memory[_next_memory_id] = entry
-    _next_memory_id += 1
-    _save_memory()
-    return entry
+    global _memory_list_json
+    db = SessionLocal()
+    try:
+        # SQLite assigns the id (AUTOINCREMENT, so never a deleted entry's);
+        # the body embedding it is written in the same transaction
+        record = MemoryRecord(json=b"")
+        db.add(record)
+        db.flush()
+        # The payload is already validated; skip a second validation pass
+        entry = MemoryEntry.model_construct(
+            id=record.id,
+            content=payload.content,
+            summary=_summarize(payload.content),
+        )
+        record.json = body = orjson.dumps(entry.model_dump())
+        db.commit()
+    finally:
+        db.close()
+    _memory_json[entry.id] = body
+    _memory_list_json = None
+    return Response(body, status_code=201, media_type="application/json")
 
 
-@app.get("/memory/{entry_id}", response_model=MemoryEntry)
-async def get_memory(entry_id: int) -> MemoryEntry:
+@app.get("/memory/{entry_id}", responses={200: {"model": MemoryEntry}})
+async def get_memory(entry_id: int) -> Response:
     """Retrieve a memory entry by identifier."""
 
-    entry = _memory.get(entry_id)
-    if entry is None:
+    cached = _memory_json.get(entry_id)
+    if cached is None:
         raise HTTPException(status_code=404, detail="Memory entry not found")
-    return entry
+    return Response(cached, media_type="application/json")
 
 
 @app.delete("/memory/{entry_id}", status_code=204)
 async def delete_memory(entry_id: int) -> None:
     """Remove a memory entry from the store."""
 
-    if entry_id not in _memory:
+    global _memory_list_json
+    if entry_id not in _memory_json:
         raise HTTPException(status_code=404, detail="Memory entry not found")
-    del _memory[entry_id]
-    _save_memory()
+    db = SessionLocal()
+    try:
+        db.query(MemoryRecord).filter(MemoryRecord.id == entry_id).delete()
+        db.commit()
+    finally:
+        db.close()
+    del _memory_json[entry_id]
+    _memory_list_json = None
     return None
 
 
@@ -568,14 +744,94 @@ def _active_provider_cfg(cfg: AppConfig) -> tuple[str, ProviderConfig]:
     return p, pc
 
 
-async def _llm_reply(
+def _provider_json(resp: httpx.Response) -> Any:
+    """Decode a provider response body with orjson; a malformed body becomes a 502."""
+    try:
+        return orjson.loads(resp.content)
+    except orjson.JSONDecodeError:
+        raise HTTPException(status_code=502, detail={"provider_error": resp.text})
+
+
+class ProviderSpec(NamedTuple):
+    """How to reach a provider's OpenAI-compatible chat completions endpoint."""
+
+    label: str
+    default_base: str
+    path: str = "/chat/completions"
+    default_model: str | None = None
+    key_required: bool = True
+    # Ignore ``api_base`` from config and always use ``default_base``
+    fixed_base: bool = False
+    # (header, environment variable) pairs sent when the variable is set
+    env_headers: tuple[tuple[str, str], ...] = ()
+    # Whether the endpoint honours ``"stream": true`` with SSE deltas
+    streams: bool = True
+
+
+PROVIDER_SPEC: Dict[str, ProviderSpec] = {
+    Provider.OPENAI: ProviderSpec("OpenAI", "https://api.openai.com/v1"),
+    Provider.OPENROUTER: ProviderSpec(
+        "OpenRouter",
+        "https://openrouter.ai/api/v1",
+        fixed_base=True,
+        env_headers=(("HTTP-Referer", "COOLCHAT_HTTP_REFERER"), ("X-Title", "COOLCHAT_X_TITLE")),
+    ),
+    Provider.GEMINI: ProviderSpec(
+        "Gemini",
+        "https://generativelanguage.googleapis.com/v1beta/openai",
+        default_model="gemini-1.5-flash",
+    ),
+    # text.pollinations.ai provides OpenAI-compatible chat completions under /openai
+    Provider.POLLINATIONS: ProviderSpec(
+        "Pollinations",
+        "https://text.pollinations.ai",
+        path="/openai/chat/completions",
+        default_model="openai-large",
+        key_required=False,
+        streams=False,
+    ),
+}
+
+_CHAT_TIMEOUT = httpx.Timeout(connect=10.0, read=60.0, write=10.0, pool=10.0)
+
+
+def _raise_provider(resp: httpx.Response) -> None:
+    """Turn a provider error status into a 502, passing through its details where possible."""
+    if resp.status_code >= 400:
+        try:
+            detail = orjson.loads(resp.content)
+        except Exception:
+            detail = resp.text
+        raise HTTPException(status_code=502, detail={"provider_error": detail})
+
+
+# {{name}} placeholders substituted into prompts in a single pass
+_TOKEN_RE = re.compile(r"\{\{([^{}]+)\}\}")
+
+
+def _fill_tokens(text: str, mapping: Dict[str, str]) -> str:
+    """Replace each {{name}} found in ``mapping``; unknown placeholders are kept."""
+    return _TOKEN_RE.sub(lambda m: mapping.get(m.group(1), m.group(0)), text)
+
+
+class _ChatCall(NamedTuple):
+    """A fully built chat completions request for one provider."""
+
+    spec: ProviderSpec
+    url: str
+    headers: Dict[str, str]
+    body: Dict[str, Any]
+
+
+async def _prepare_chat_call(
     message: str,
     cfg: AppConfig,
     recent_text: str | None = None,
     system_override: str | None = None,
     disable_system: bool = False,
     recent_history: List[Dict[str, str]] | None = None,
-) -> str:
+) -> _ChatCall | str:
+    """Build the provider request for ``message``, or return the reply directly (echo)."""
     # In test environments, avoid external calls unless explicitly allowed.
     def _external_enabled() -> bool:
         if os.getenv("COOLCHAT_ALLOW_EXTERNAL") == "1":
@@ -622,194 +878,132 @@ async def _llm_reply(
     finally:
         db.close()
 
-    # Replace tokens in messages
+    # Replace tokens in messages: custom variables from prompts.json, with
+    # {{char}} and {{user}} taking precedence over same-named variables
+    mapping: Dict[str, str] = {}
+    try:
+        from .storage import load_json as _lj
+        pdata = _lj("prompts.json", {})
+        vars = pdata.get("variables", {}) if isinstance(pdata, dict) else {}
+        if isinstance(vars, dict):
+            mapping.update((k, v) for k, v in vars.items() if isinstance(k, str) and isinstance(v, str))
+    except Exception:
+        pass
+    persona = getattr(cfg, 'user_persona', None)
+    mapping["char"] = (char.name if char else None) or "Character"
+    mapping["user"] = persona.name if persona else "User"
+
     def _replace(text: str) -> str:
-        char_name = char.name if char else None
-        user_name = getattr(cfg, 'user_persona', None).name if getattr(cfg, 'user_persona', None) else "User"
         if not text:
             return text
-        t = text.replace("{{char}}", char_name or "Character")
-        t = t.replace("{{user}}", user_name)
-        # Custom variables from prompts.json
-        try:
-            from .storage import load_json as _lj
-            pdata = _lj("prompts.json", {})
-            vars = pdata.get("variables", {}) if isinstance(pdata, dict) else {}
-            if isinstance(vars, dict):
-                for k, v in vars.items():
-                    if isinstance(k, str) and isinstance(v, str):
-                        t = t.replace("{{"+k+"}}", v)
-        except Exception:
-            pass
-        return t
+        return _fill_tokens(text, mapping)
     if system_msg:
         system_msg = _replace(system_msg)
     message = _replace(message)
 
-    if provider == Provider.OPENAI:
-        if not pcfg.api_key:
-            raise HTTPException(status_code=400, detail="Missing API key for provider 'openai'")
+    spec = PROVIDER_SPEC.get(provider)
+    if spec is None:
+        raise HTTPException(status_code=400, detail=f"Unsupported provider: {provider}")
+    if spec.key_required and not pcfg.api_key:
+        raise HTTPException(status_code=400, detail=f"Missing API key for provider '{Provider(provider).value}'")
+
+    base = spec.default_base if spec.fixed_base else (pcfg.api_base or spec.default_base).rstrip("/")
+    url = base + spec.path
+    headers = {"Content-Type": "application/json"}
+    if pcfg.api_key:
+        headers["Authorization"] = f"Bearer {pcfg.api_key}"
+    for header, env_var in spec.env_headers:
+        value = os.getenv(env_var)
+        if value:
+            headers[header] = value
+
+    messages = []
+    if system_msg:
+        messages.append({"role": "system", "content": system_msg})
+    messages.append({"role": "user", "content": message})
+    body = {"model": pcfg.model or spec.default_model, "messages": messages, "temperature": pcfg.temperature}
+    debug = getattr(cfg, 'debug', None)
+    if debug and getattr(debug, 'log_prompts', False):
+        from .debug import get_debug_logger
+        get_debug_logger().debug_llm_requests(f"{spec.label} request: {url}, body: {body}")
+    return _ChatCall(spec, url, headers, body)
 
-        base = (pcfg.api_base or "https://api.openai.com/v1").rstrip("/")
-        url = base + "/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {pcfg.api_key}",
-            "Content-Type": "application/json",
-        }
-        messages = []
-        if system_msg:
-            messages.append({"role": "system", "content": system_msg})
-        messages.append({"role": "user", "content": message})
-        body = {"model": pcfg.model, "messages": messages, "temperature": pcfg.temperature}
-        timeout = httpx.Timeout(connect=10.0, read=60.0, write=10.0, pool=10.0)
-        if getattr(cfg, 'debug', None) and getattr(cfg.debug, 'log_prompts', False):
-            from .debug import get_debug_logger
-            logger = get_debug_logger()
-            logger.debug_llm_requests(f"OpenAI request: {url}, body: {body}")
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            resp = await client.post(url, headers=headers, json=body)
-            if resp.status_code >= 400:
-                # Pass through error details where possible
-                try:
-                    detail = resp.json()
-                except Exception:
-                    detail = resp.text
-                raise HTTPException(status_code=502, detail={"provider_error": detail})
-            if getattr(cfg, 'debug', None) and getattr(cfg.debug, 'log_responses', False):
-                try:
-                    from .debug import get_debug_logger
-                    logger = get_debug_logger()
-                    logger.debug_llm_responses(f"OpenAI response: {resp.json()}")
-                except Exception:
-                    logger.debug_llm_responses(f"OpenAI response text: {resp.text}")
-            data = resp.json()
-            # Standard OpenAI response shape
-            try:
-                return data["choices"][0]["message"]["content"].strip()
-            except Exception:
-                raise HTTPException(status_code=502, detail={"provider_error": "Unexpected response schema"})
 
-    # Provider: openrouter (OpenAI-compatible)
-    if provider == Provider.OPENROUTER:
-        if not pcfg.api_key:
-            raise HTTPException(status_code=400, detail="Missing API key for provider 'openrouter'")
+async def _llm_reply(
+    message: str,
+    cfg: AppConfig,
+    recent_text: str | None = None,
+    system_override: str | None = None,
+    disable_system: bool = False,
+    recent_history: List[Dict[str, str]] | None = None,
+) -> str:
+    call = await _prepare_chat_call(
+        message, cfg, recent_text, system_override, disable_system, recent_history
+    )
+    if isinstance(call, str):
+        return call
+    return await _post_chat_call(call, cfg)
+
+
+async def _post_chat_call(call: _ChatCall, cfg: AppConfig) -> str:
+    spec = call.spec
+    client = _http_client()
+    resp = await client.post(call.url, headers=call.headers, json=call.body, timeout=_CHAT_TIMEOUT)
+    _raise_provider(resp)
+    debug = getattr(cfg, 'debug', None)
+    if debug and getattr(debug, 'log_responses', False):
+        from .debug import get_debug_logger
+        get_debug_logger().debug_llm_responses(f"{spec.label} response text: {resp.text}")
+    data = _provider_json(resp)
+    # Standard OpenAI response shape
+    try:
+        return data["choices"][0]["message"]["content"].strip()
+    except Exception:
+        raise HTTPException(status_code=502, detail={"provider_error": "Unexpected response schema"})
 
-        url = "https://openrouter.ai/api/v1/chat/completions"
-        headers = {
-            "Authorization": f"Bearer {pcfg.api_key}",
-            "Content-Type": "application/json",
-        }
-        # Optional: pass through referer/title if set as env (not required)
-        referer = os.getenv("COOLCHAT_HTTP_REFERER")
-        title = os.getenv("COOLCHAT_X_TITLE")
-        if referer:
-            headers["HTTP-Referer"] = referer
-        if title:
-            headers["X-Title"] = title
-
-        messages = []
-        if system_msg:
-            messages.append({"role": "system", "content": system_msg})
-        messages.append({"role": "user", "content": message})
-        body = {"model": pcfg.model, "messages": messages, "temperature": pcfg.temperature}
-        timeout = httpx.Timeout(connect=10.0, read=60.0, write=10.0, pool=10.0)
-        if getattr(cfg, 'debug', None) and getattr(cfg.debug, 'log_prompts', False):
-            print("[CoolChat] OpenRouter request:", {"url": url, "body": body})
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            resp = await client.post(url, headers=headers, json=body)
-            if resp.status_code >= 400:
-                try:
-                    detail = resp.json()
-                except Exception:
-                    detail = resp.text
-                raise HTTPException(status_code=502, detail={"provider_error": detail})
-            if getattr(cfg, 'debug', None) and getattr(cfg.debug, 'log_responses', False):
-                try:
-                    print("[CoolChat] OpenRouter response:", resp.json())
-                except Exception:
-                    print("[CoolChat] OpenRouter response text:", resp.text)
-            data = resp.json()
-            try:
-                return data["choices"][0]["message"]["content"].strip()
-            except Exception:
-                raise HTTPException(status_code=502, detail={"provider_error": "Unexpected response schema"})
-
-    # Provider: gemini
-    if provider == Provider.GEMINI:
-        if not pcfg.api_key:
-            raise HTTPException(status_code=400, detail="Missing API key for provider 'gemini'")
-
-        # Use OpenAI-compatible endpoint with Authorization header
-        base = (pcfg.api_base or "https://generativelanguage.googleapis.com/v1beta/openai").rstrip("/")
-        path = "/chat/completions"
-        headers = {
-            "Content-Type": "application/json",
-            "Authorization": f"Bearer {pcfg.api_key}",
-        }
-        messages = []
-        if system_msg:
-            messages.append({"role": "system", "content": system_msg})
-        messages.append({"role": "user", "content": message})
-        body = {"model": pcfg.model or "gemini-1.5-flash", "messages": messages, "temperature": pcfg.temperature}
-        timeout = httpx.Timeout(connect=10.0, read=60.0, write=10.0, pool=10.0)
-        if getattr(cfg, 'debug', None) and getattr(cfg.debug, 'log_prompts', False):
-            print("[CoolChat] Gemini request:", {"base": base, "path": path, "body": body})
-        async with httpx.AsyncClient(base_url=base, timeout=timeout) as client:
-            resp = await client.post(path, headers=headers, json=body)
-            if resp.status_code >= 400:
-                try:
-                    detail = resp.json()
-                except Exception:
-                    detail = resp.text
-                raise HTTPException(status_code=502, detail={"provider_error": detail})
-            if getattr(cfg, 'debug', None) and getattr(cfg.debug, 'log_responses', False):
-                try:
-                    print("[CoolChat] Gemini response:", resp.json())
-                except Exception:
-                    print("[CoolChat] Gemini response text:", resp.text)
-            data = resp.json()
-            try:
-                return data["choices"][0]["message"]["content"].strip()
-            except Exception:
-                raise HTTPException(status_code=502, detail={"provider_error": "Unexpected response schema"})
-
-    if provider == Provider.POLLINATIONS:
-        # text.pollinations.ai provides OpenAI-compatible chat completions under /openai
-        base = (pcfg.api_base or "https://text.pollinations.ai").rstrip("/")
-        url = base + "/openai/chat/completions"
-        headers = {"Content-Type": "application/json"}
-        if pcfg.api_key:
-            headers["Authorization"] = f"Bearer {pcfg.api_key}"
-        messages = []
-        if system_msg:
-            messages.append({"role": "system", "content": system_msg})
-        messages.append({"role": "user", "content": message})
-        body = {"model": pcfg.model or "openai-large", "messages": messages, "temperature": pcfg.temperature}
-        timeout = httpx.Timeout(connect=10.0, read=60.0, write=10.0, pool=10.0)
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            resp = await client.post(url, headers=headers, json=body)
-            if resp.status_code >= 400:
-                try:
-                    detail = resp.json()
-                except Exception:
-                    detail = resp.text
-                raise HTTPException(status_code=502, detail={"provider_error": detail})
-            data = resp.json()
+
+async def _open_chat_stream(call: _ChatCall) -> httpx.Response:
+    """Send ``call`` with ``"stream": true`` and return the response once headers arrive.
+
+    Error statuses are raised here, before any bytes reach the client.
+    """
+    client = _http_client()
+    request = client.build_request(
+        "POST", call.url, headers=call.headers, json={**call.body, "stream": True}, timeout=_CHAT_TIMEOUT
+    )
+    resp = await client.send(request, stream=True)
+    if resp.status_code >= 400:
+        await resp.aread()
+        await resp.aclose()
+        _raise_provider(resp)
+    return resp
+
+
+async def _stream_deltas(resp: httpx.Response) -> AsyncIterator[str]:
+    """Yield the content deltas of an OpenAI-style SSE completion stream."""
+    try:
+        async for line in resp.aiter_lines():
+            if not line.startswith("data:"):
+                continue
+            data = line[5:].strip()
+            if data == "[DONE]":
+                break
             try:
-                return data["choices"][0]["message"]["content"].strip()
-            except Exception:
-                raise HTTPException(status_code=502, detail={"provider_error": "Unexpected response schema"})
+                delta = orjson.loads(data)["choices"][0]["delta"].get("content")
+            except (orjson.JSONDecodeError, KeyError, IndexError, TypeError, AttributeError):
+                continue
+            if delta:
+                yield delta
+    finally:
+        await resp.aclose()
 
-    # Unknown provider
-    raise HTTPException(status_code=400, detail=f"Unsupported provider: {provider}")
 
+async def _single_delta(text: str) -> AsyncIterator[str]:
+    yield text
 
-@app.post("/chat", response_model=ChatResponse)
-async def chat_endpoint(payload: ChatRequest) -> ChatResponse:
-    """Return a chat reply using configured provider (echo by default)."""
 
-    cfg = load_config()
-    # Chat history per session
+def _begin_chat(payload: ChatRequest) -> tuple[str, List[Dict[str, str]], str]:
+    """Reset the session if asked and return its id, history and lore trigger window."""
     session_id = payload.session_id or "default"
     if payload.reset:
         # Clear chat history from SQLite
@@ -827,15 +1021,13 @@ async def chat_endpoint(payload: ChatRequest) -> ChatResponse:
     history = _load_chat_session(session_id)
     # Build recent text window for lore triggers
     recent_text = "\n".join([m.get("content", "") for m in history[-6:]] + [payload.message])
-    try:
-        reply = await _llm_reply(payload.message, cfg, recent_text=recent_text, recent_history=history)
-    except HTTPException:
-        raise
-    except Exception as exc:  # pragma: no cover - safety net
-        raise HTTPException(status_code=500, detail=str(exc))
+    return session_id, history, recent_text
+
 
+def _finish_chat(session_id: str, message: str, reply: str, cfg: AppConfig) -> None:
+    """Record the exchange, trim the session and log the reply."""
     # Record history and trim by rough token budget using SQLite
-    _save_chat_message(session_id, "user", payload.message)
+    _save_chat_message(session_id, "user", message)
     _save_chat_message(session_id, "assistant", reply)
     _trim_history(session_id, cfg)
 
@@ -848,9 +1040,68 @@ async def chat_endpoint(payload: ChatRequest) -> ChatResponse:
     else:
         logger.debug_tool_calls("Reply contains no tool calls")
 
+
+@app.post("/chat", response_model=ChatResponse)
+async def chat_endpoint(payload: ChatRequest) -> ChatResponse:
+    """Return a chat reply using configured provider (echo by default)."""
+
+    cfg = current_config()
+    session_id, history, recent_text = _begin_chat(payload)
+    try:
+        reply = await _llm_reply(payload.message, cfg, recent_text=recent_text, recent_history=history)
+    except HTTPException:
+        raise
+    except Exception as exc:  # pragma: no cover - safety net
+        raise HTTPException(status_code=500, detail=str(exc))
+
+    _finish_chat(session_id, payload.message, reply, cfg)
     return ChatResponse(reply=reply)
 
 
+@app.post("/chat/stream", response_class=StreamingResponse)
+async def chat_stream_endpoint(payload: ChatRequest) -> StreamingResponse:
+    """Stream the chat reply as server-sent events.
+
+    Each event carries ``{"delta": ...}``; a final ``done`` event carries the
+    full ``{"reply": ...}`` once the exchange has been recorded. Providers
+    without streaming support send their whole reply as one delta. Errors
+    before the first byte are HTTP errors as with ``/chat``; a provider
+    failure mid-stream ends it with an ``error`` event carrying
+    ``{"detail": ...}`` and records nothing.
+    """
+
+    cfg = current_config()
+    session_id, history, recent_text = _begin_chat(payload)
+    try:
+        call = await _prepare_chat_call(payload.message, cfg, recent_text=recent_text, recent_history=history)
+        if isinstance(call, str):
+            deltas = _single_delta(call)
+        elif call.spec.streams:
+            deltas = _stream_deltas(await _open_chat_stream(call))
+        else:
+            deltas = _single_delta(await _post_chat_call(call, cfg))
+    except HTTPException:
+        raise
+    except Exception as exc:
+        raise HTTPException(status_code=500, detail=str(exc))
+
+    async def events():
+        parts = []
+        try:
+            async for delta in deltas:
+                parts.append(delta)
+                yield b"data: " + orjson.dumps({"delta": delta}) + b"\n\n"
+        except Exception as exc:
+            detail = exc.detail if isinstance(exc, HTTPException) else str(exc)
+            yield b"event: error\ndata: " + orjson.dumps({"detail": detail}) + b"\n\n"
+            return
+        reply = "".join(parts).strip()
+        _finish_chat(session_id, payload.message, reply, cfg)
+        yield b"event: done\ndata: " + orjson.dumps({"reply": reply}) + b"\n\n"
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
+
 def _estimate_tokens(text: str) -> int:
     return max(1, len(text) // 4)
 
@@ -862,6 +1113,135 @@ def _truncate_to_tokens(text: str, max_tokens: int) -> str:
     return text[:target_chars] + "\n..."
 
 
+# Character prompt sections (system prompt, personality, scenario, description),
+# built once per character and dropped whenever that character row is written.
+_character_prompt_cache: Dict[int, List[str]] = {}
+
+
+@event.listens_for(CharacterModel, "after_update")
+@event.listens_for(CharacterModel, "after_delete")
+def _drop_character_prompt(mapper, connection, target) -> None:
+    _character_prompt_cache.pop(target.id, None)
+
+
+def _character_prompt_parts(char) -> List[str]:
+    parts = _character_prompt_cache.get(char.id)
+    if parts is None:
+        parts = []
+        if char.system_prompt: parts.append(char.system_prompt)
+        if char.personality: parts.append(f"Personality: {char.personality}")
+        if char.scenario: parts.append(f"Scenario: {char.scenario}")
+        if char.description: parts.append(f"Description: {char.description}")
+        _character_prompt_cache[char.id] = parts
+    return parts
+
+
+class _PromptLoreEntry(NamedTuple):
+    primaries: List[str]  # lowercased, non-empty primary keywords
+    secondaries: List[str]  # lowercased, non-empty secondary keywords
+    logic: str  # upper-cased trigger logic
+    text: str  # "[keyword] content", ready to join into the prompt
+
+
+try:
+    import ahocorasick
+except ImportError:  # optional; each distinct keyword is then found with its own substring scan
+    ahocorasick = None
+
+
+def _keyword_matcher(keywords: Set[str]) -> Any:
+    """Build a one-pass Aho-Corasick automaton over the keywords when available."""
+    if ahocorasick is None or not keywords:
+        return frozenset(keywords)
+    automaton = ahocorasick.Automaton()
+    for keyword in keywords:
+        automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+
+def _keyword_hits(hay: str, matcher: Any) -> Set[str]:
+    """Keywords of a ``_keyword_matcher`` that occur as substrings of ``hay``."""
+    if isinstance(matcher, frozenset):
+        return {k for k in matcher if k in hay}
+    return {k for _, k in matcher.iter(hay)}
+
+
+# Prompt-ready lore entries per lorebook id, so chat turns skip the per-lorebook
+# queries and row loads. Any ORM write to an entry or lorebook drops its book.
+_lorebook_prompt_cache: Dict[int, List[_PromptLoreEntry]] = {}
+
+
+class _LinkedLore(NamedTuple):
+    entries: List[_PromptLoreEntry]  # flattened across the linked lorebooks
+    matcher: Any  # every entry keyword, see _keyword_matcher
+
+
+# Character-linked lore per distinct tuple of lorebook ids, so a chat turn walks
+# one flat entry list with a single keyword pass. Cleared with any lorebook drop;
+# a character relinked to other books simply looks up a different key.
+_linked_lore_cache: Dict[Tuple[int, ...], _LinkedLore] = {}
+
+
+@event.listens_for(LoreEntry, "after_insert")
+@event.listens_for(LoreEntry, "after_delete")
+def _drop_lorebook_prompt_for_entry(mapper, connection, target) -> None:
+    _lorebook_prompt_cache.pop(target.lorebook_id, None)
+    _linked_lore_cache.clear()
+
+
+@event.listens_for(LoreEntry, "after_update")
+def _drop_lorebook_prompt_for_updated_entry(mapper, connection, target) -> None:
+    _lorebook_prompt_cache.pop(target.lorebook_id, None)
+    _linked_lore_cache.clear()
+    # An entry moved between lorebooks must also leave its old book; if the
+    # old id was never loaded we cannot tell which book that was
+    moved = get_history(target, "lorebook_id")
+    if moved.added and not moved.deleted:
+        _lorebook_prompt_cache.clear()
+    for old_id in moved.deleted:
+        _lorebook_prompt_cache.pop(old_id, None)
+
+
+@event.listens_for(Lorebook, "after_update")
+@event.listens_for(Lorebook, "after_delete")
+def _drop_lorebook_prompt(mapper, connection, target) -> None:
+    _lorebook_prompt_cache.pop(target.id, None)
+    _linked_lore_cache.clear()
+
+
+def _lorebook_prompt_entries(db: Session, lorebook_ids: List[int]) -> List[_PromptLoreEntry]:
+    """Prompt-ready entries for the given lorebooks, in lorebook then entry order."""
+    missing = [lb_id for lb_id in dict.fromkeys(lorebook_ids) if lb_id not in _lorebook_prompt_cache]
+    if missing:
+        loaded: Dict[int, List[_PromptLoreEntry]] = {lb_id: [] for lb_id in missing}
+        rows = db.query(
+            LoreEntry.lorebook_id, LoreEntry.keywords, LoreEntry.secondary_keywords,
+            LoreEntry.logic, LoreEntry.title, LoreEntry.content,
+        ).filter(LoreEntry.lorebook_id.in_(missing)).order_by(LoreEntry.id)
+        for lb_id, keywords, secondary, logic, title, content in rows:
+            keyword = keywords[0] if keywords else title
+            loaded[lb_id].append(_PromptLoreEntry(
+                [x.lower() for x in (keywords or []) if x],
+                [x.lower() for x in (secondary or []) if x],
+                (logic or "AND ANY").upper(),
+                f"[{keyword}] {content}",
+            ))
+        _lorebook_prompt_cache.update(loaded)
+    return [entry for lb_id in lorebook_ids for entry in _lorebook_prompt_cache.get(lb_id, [])]
+
+
+def _linked_lore(db: Session, lorebook_ids: List[int]) -> _LinkedLore:
+    """Flattened entries and keyword matcher for a character's linked lorebooks."""
+    key = tuple(lorebook_ids)
+    linked = _linked_lore_cache.get(key)
+    if linked is None:
+        entries = _lorebook_prompt_entries(db, lorebook_ids)
+        keywords = {k for entry in entries for k in (*entry.primaries, *entry.secondaries)}
+        linked = _linked_lore_cache[key] = _LinkedLore(entries, _keyword_matcher(keywords))
+    return linked
+
+
 async def _build_system_from_character(
     db: Session,
     char: Optional[Character],
@@ -917,11 +1297,7 @@ async def _build_system_from_character(
         persona_text = (f"User Persona: {user_persona.name}\n{getattr(user_persona, 'description', '')}").strip()
     char_text = None
     if char:
-        ch_parts = []
-        if char.system_prompt: ch_parts.append(char.system_prompt)
-        if char.personality: ch_parts.append(f"Personality: {char.personality}")
-        if char.scenario: ch_parts.append(f"Scenario: {char.scenario}")
-        if char.description: ch_parts.append(f"Description: {char.description}")
+        ch_parts = _character_prompt_parts(char)
         char_text = "\n".join(ch_parts) if ch_parts else None
 
     # Tools list and tool_call prompt
@@ -943,7 +1319,7 @@ async def _build_system_from_character(
         tool_call_prompt = str(resolved_tool_call)
     else:
         try:
-            if getattr(load_config(), 'structured_output', False):
+            if getattr(current_config(), 'structured_output', False):
                 tool_call_prompt = (
                     "When invoking tools, return JSON with key 'toolCalls' as an array of {type, payload}. "
                     "Types: 'image_request' (payload: {prompt:string}), 'phone_url' (payload:{url:string}), 'lore_suggestions' (payload:{items:[{keyword:string, content:string}]}). "
@@ -1005,87 +1381,60 @@ Include optional caption text before the JSON when appropriate.'''
         if up:
             segments.append(up)
     if char:
-        if char.system_prompt:
-            segments.append(char.system_prompt)
-        if char.personality:
-            segments.append(f"Personality: {char.personality}")
-        if char.scenario:
-            segments.append(f"Scenario: {char.scenario}")
-        if char.description:
-            segments.append(f"Description: {char.description}")
+        segments.extend(_character_prompt_parts(char))
         # Append linked lorebook contents; prefer triggered entries if any
-        if char.lorebook_ids:
+        linked_ids = getattr(char, "lorebook_ids", None) or [lb.id for lb in getattr(char, "lorebooks", None) or []]
+        if linked_ids:
             lore_texts = []
             triggered_any = False
-            db = SessionLocal()
-            try:
-                for lb_id in char.lorebook_ids:
-                    lb = db.query(Lorebook).filter(Lorebook.id == lb_id).first()
-                    if not lb:
-                        continue
-                    for entry in lb.entries:
-                        include = False
-                        if recent_text:
-                            hay = recent_text.lower()
-                            primaries = [x.lower() for x in (entry.keywords or []) if x]
-                            seconds = [x.lower() for x in (entry.secondary_keywords or []) if x]
-                            found_primary = [k for k in primaries if k in hay]
-                            found_secondary = [k for k in seconds if k in hay]
-                            logic = (entry.logic or "AND ANY").upper()
-                            if logic == "AND ALL":
-                                include = len(found_primary) == len(primaries) and (
-                                    not seconds or len(found_secondary) == len(seconds)
-                                )
-                            elif logic == "NOT ANY":
-                                include = len(found_primary) == 0 and len(found_secondary) == 0
-                            elif logic == "NOT ALL":
-                                include = not (len(found_primary) == len(primaries))
-                            else:  # AND ANY default
-                                include = bool(found_primary) or bool(found_secondary)
-                        else:
-                            include = True
-                        if include:
-                            keyword = entry.keywords[0] if entry.keywords else entry.title
-                            lore_texts.append(f"[{keyword}] {entry.content}")
-                            triggered_any = True
-            finally:
-                db.close()
+            linked = _linked_lore(db, linked_ids)
+            # One pass over the conversation finds every keyword hit
+            hits = _keyword_hits(recent_text.lower(), linked.matcher) if recent_text else set()
+            for entry in linked.entries:
+                include = False
+                if recent_text:
+                    primaries, seconds = entry.primaries, entry.secondaries
+                    found_primary = [k for k in primaries if k in hits]
+                    found_secondary = [k for k in seconds if k in hits]
+                    logic = entry.logic
+                    if logic == "AND ALL":
+                        include = len(found_primary) == len(primaries) and (
+                            not seconds or len(found_secondary) == len(seconds)
+                        )
+                    elif logic == "NOT ANY":
+                        include = len(found_primary) == 0 and len(found_secondary) == 0
+                    elif logic == "NOT ALL":
+                        include = not (len(found_primary) == len(primaries))
+                    else:  # AND ANY default
+                        include = bool(found_primary) or bool(found_secondary)
+                else:
+                    include = True
+                if include:
+                    lore_texts.append(entry.text)
+                    triggered_any = True
             if lore_texts:
                 title = "Triggered World Info" if triggered_any else "World Info"
                 segments.append(f"{title}:\n" + "\n".join(lore_texts))
     # Include globally active lorebooks regardless of character linkage
     try:
-        from .config import load_config as _lc
-
-        _cfg = _lc()
+        _cfg = current_config()
         actives = getattr(_cfg, "active_lorebook_ids", []) or []
         if actives:
             lore_texts = []
-            db = SessionLocal()
-            try:
-                for lb_id in actives:
-                    lb = db.query(Lorebook).filter(Lorebook.id == lb_id).first()
-                    if not lb:
-                        continue
-                    for entry in lb.entries:
-                        trigger_found = False
-                        if recent_text:
-                            hay = recent_text.lower()
-                            primaries = [x.lower() for x in (entry.keywords or []) if x]
-                            logic = (entry.logic or "AND ANY").upper()
-                            for term in hay.split():
-                                if any(term in kw for kw in primaries):
-                                    trigger_found = True
-                                    break
-                        else:
+            terms = recent_text.lower().split() if recent_text else []
+            for entry in _lorebook_prompt_entries(db, actives):
+                trigger_found = False
+                if recent_text:
+                    for term in terms:
+                        if any(term in kw for kw in entry.primaries):
                             trigger_found = True
-                        if trigger_found:
-                            keyword = entry.keywords[0] if entry.keywords else entry.title
-                            lore_texts.append(f"[{keyword}] {entry.content}")
-                if lore_texts:
-                    segments.append("Active Lorebooks:\n" + "\n".join(lore_texts))
-            finally:
-                db.close()
+                            break
+                else:
+                    trigger_found = True
+                if trigger_found:
+                    lore_texts.append(entry.text)
+            if lore_texts:
+                segments.append("Active Lorebooks:\n" + "\n".join(lore_texts))
     except Exception:
         pass
 
@@ -1167,13 +1516,16 @@ def _load_chat_session(session_id: str) -> List[Dict[str, str]]:
 
     db = SessionLocal()
     try:
-        messages = db.query(ChatMessage).filter(ChatMessage.chat_id == session_id).order_by(ChatMessage.created_at).all()
+        # Plain column rows; the ORM objects were only ever copied into dicts
+        messages = db.query(ChatMessage.role, ChatMessage.content, ChatMessage.image_url).filter(
+            ChatMessage.chat_id == session_id
+        ).order_by(ChatMessage.created_at)
         return [
             {
-                "role": msg.role,
-                "content": msg.content,
-                "image_url": msg.image_url
-            } for msg in messages
+                "role": role,
+                "content": content,
+                "image_url": image_url
+            } for role, content, image_url in messages
         ]
     except Exception as e:
         print(f"[CoolChat] Error loading chat session: {e}")
@@ -1347,24 +1699,30 @@ def _trim_history(session_id: str, cfg: AppConfig) -> None:
 
     db = SessionLocal()
     try:
-        # Get all messages for this session
-        messages = db.query(ChatMessage).filter(ChatMessage.chat_id == session_id).order_by(ChatMessage.created_at).all()
+        # Only ids and text lengths are needed to pick the messages to drop
+        rows = db.query(ChatMessage.id, func.coalesce(func.length(ChatMessage.content), 0)).filter(
+            ChatMessage.chat_id == session_id
+        ).order_by(ChatMessage.created_at).all()
 
-        if len(messages) <= 20:  # Keep at least last 20 messages
+        if len(rows) <= 20:  # Keep at least last 20 messages
             return
 
-        # Calculate token usage from recent messages
-        total = sum(_estimate_tokens(m.content or "") for m in messages[len(messages)-20:])
-        k = len(messages)
+        # Same estimate as _estimate_tokens, from SQLite's character count
+        tokens = [max(1, length // 4) for _, length in rows]
+        total = sum(tokens[-20:])
+        k = len(rows)
 
         # Remove oldest messages if over budget
-        while messages and total > budget * 2 and k > 20:
-            removed = messages.pop(0)
-            total -= _estimate_tokens(removed.content or "")
-            db.delete(removed)
+        dropped = 0
+        while total > budget * 2 and k > 20:
+            total -= tokens[dropped]
+            dropped += 1
             k -= 1
 
-        if messages:
+        if dropped:
+            db.query(ChatMessage).filter(ChatMessage.id.in_([row[0] for row in rows[:dropped]])).delete(
+                synchronize_session=False
+            )
             db.commit()
             print(f"[CoolChat] Trimmed chat {session_id} to {k} messages")
 
@@ -1429,9 +1787,8 @@ class ConfigUpdate(BaseModel):
     structured_output: bool | None = None
 
 
-@app.get("/config", response_model=ConfigResponse)
-async def get_config() -> ConfigResponse:
-    cfg = load_config()
+def _config_response(cfg: AppConfig) -> ConfigResponse:
+    """The client view of ``cfg``, with every API key masked."""
     masked: Dict[str, ProviderConfigMasked] = {}
     for key, pc in cfg.providers.items():
         masked[key] = ProviderConfigMasked(
@@ -1481,8 +1838,23 @@ async def get_config() -> ConfigResponse:
     )
 
 
-@app.put("/config", response_model=ConfigResponse)
-async def update_config(payload: ConfigUpdate) -> ConfigResponse:
+# Encoded GET /config body and the shared config it was built from; config.py
+# swaps that instance whenever the config is saved or changes on disk.
+_config_json: tuple[AppConfig, bytes] | None = None
+
+
+@app.get("/config", responses={200: {"model": ConfigResponse}})
+async def get_config() -> Response:
+    global _config_json
+    cfg = current_config()
+    if _config_json is None or _config_json[0] is not cfg:
+        # Validated once on construction; no second pass against response_model
+        _config_json = (cfg, orjson.dumps(_config_response(cfg).model_dump(mode="json")))
+    return Response(_config_json[1], media_type="application/json")
+
+
+@app.put("/config", responses={200: {"model": ConfigResponse}})
+async def update_config(payload: ConfigUpdate) -> ORJSONResponse:
     cfg = load_config()
 
     # Merge provider-specific overrides
@@ -1641,51 +2013,7 @@ async def update_config(payload: ConfigUpdate) -> ConfigResponse:
     except Exception:
         pass
 
-    # Return masked config
-    masked: Dict[str, ProviderConfigMasked] = {}
-    for key, pc in cfg.providers.items():
-        masked[key] = ProviderConfigMasked(
-            api_key_masked=mask_secret(pc.api_key),
-            api_base=pc.api_base,
-            model=pc.model,
-            temperature=pc.temperature,
-        )
-    return ConfigResponse(
-        active_provider=cfg.active_provider,
-        active_character_id=cfg.active_character_id,
-        providers=masked,
-        debug={"log_prompts": getattr(cfg.debug, 'log_prompts', False), "log_responses": getattr(cfg.debug, 'log_responses', False)},
-        user_persona={
-            "name": getattr(cfg.user_persona, 'name', 'User'),
-            "description": getattr(cfg.user_persona, 'description', ''),
-            "personality": getattr(cfg.user_persona, 'personality', ''),
-            "motivations": getattr(cfg.user_persona, 'motivations', ''),
-            "tracking": getattr(cfg.user_persona, 'tracking', ''),
-        },
-        max_context_tokens=getattr(cfg, 'max_context_tokens', 2048),
-        structured_output=getattr(cfg, 'structured_output', False),
-        images=ConfigResponse.ImagesOut(
-            active=getattr(cfg.images, 'active', ImageProvider.POLLINATIONS),
-            pollinations={"api_key": None, "model": getattr(cfg.images.pollinations, 'model', None)},
-            dezgo={
-                "api_key": None,
-                "model": getattr(cfg.images.dezgo, 'model', None),
-                "lora_flux_1": getattr(cfg.images.dezgo, 'lora_flux_1', None),
-                "lora_flux_2": getattr(cfg.images.dezgo, 'lora_flux_2', None),
-                "lora_sd1_1": getattr(cfg.images.dezgo, 'lora_sd1_1', None),
-                "lora_sd1_2": getattr(cfg.images.dezgo, 'lora_sd1_2', None),
-                "lora1_strength": getattr(cfg.images.dezgo, 'lora1_strength', None),
-                "lora2_strength": getattr(cfg.images.dezgo, 'lora2_strength', None),
-                "transparent": str(getattr(cfg.images.dezgo, 'transparent', False)),
-                "width": str(getattr(cfg.images.dezgo, 'width', '')),
-                "height": str(getattr(cfg.images.dezgo, 'height', '')),
-                "steps": str(getattr(cfg.images.dezgo, 'steps', '')),
-                "upscale": str(getattr(cfg.images.dezgo, 'upscale', '')),
-            },
-        ),
-        theme=getattr(cfg, 'theme', None).model_dump() if getattr(cfg, 'theme', None) else None,
-        active_lorebook_ids=getattr(cfg, 'active_lorebook_ids', []) or [],
-    )
+    return ORJSONResponse(_config_response(cfg).model_dump(mode="json"))
 
 
 class ThemeSuggestRequest(BaseModel):
@@ -1696,6 +2024,10 @@ class ThemeSuggestResponse(BaseModel):
     colors: List[str]
 
 
+# CSS hex colors (#rgb, #rgba, #rrggbb, #rrggbbaa) in a model reply
+_HEX_COLOR_RE = re.compile(r"#(?:[0-9a-fA-F]{8}|[0-9a-fA-F]{6}|[0-9a-fA-F]{3,4})(?![0-9a-fA-F])")
+
+
 @app.post("/theme/suggest", response_model=ThemeSuggestResponse)
 async def theme_suggest(payload: ThemeSuggestRequest) -> ThemeSuggestResponse:
     cfg = load_config()
@@ -1704,11 +2036,8 @@ async def theme_suggest(payload: ThemeSuggestRequest) -> ThemeSuggestResponse:
         print("[CoolChat] theme_suggest provider=", cfg.active_provider)
         reply = await _llm_reply(prompt, cfg)
         print("[CoolChat] theme_suggest reply=", reply)
-        text = reply.strip().strip('`')
-        if text.lower().startswith('json'):
-            text = text[4:].strip()
-        parts = [p.strip() for p in text.split(',') if p.strip()]
-        parts = parts[:5]
+        # Picks the codes out of fences, JSON or prose in one pass
+        parts = _HEX_COLOR_RE.findall(reply)[:5]
         if len(parts) < 5:
             raise ValueError("insufficient colors")
         return ThemeSuggestResponse(colors=parts)
@@ -1778,107 +2107,128 @@ class ModelsResponse(BaseModel):
     models: List[str]
 
 
+_MODELS_TIMEOUT = httpx.Timeout(connect=10.0, read=30.0, write=10.0, pool=10.0)
+
+
+def _raise_models_error(resp: httpx.Response) -> None:
+    if resp.status_code >= 400:
+        try:
+            detail = orjson.loads(resp.content)
+        except Exception:
+            detail = resp.text
+        raise HTTPException(status_code=502, detail=detail)
+
+
+def _model_ids(items: List[dict]) -> List[str]:
+    ids = []
+    for item in items:
+        mid = item.get("id") or item.get("name")
+        if mid:
+            ids.append(mid)
+    return ids
+
+
+async def _fetch_openai_models(client: httpx.AsyncClient, pc: ProviderConfig) -> List[str]:
+    if not pc.api_key:
+        raise HTTPException(status_code=400, detail="Missing API key for openai")
+    base = (pc.api_base or "https://api.openai.com/v1").rstrip("/")
+    headers = {"Authorization": f"Bearer {pc.api_key}"}
+    resp = await client.get(base + "/models", headers=headers, timeout=_MODELS_TIMEOUT)
+    _raise_models_error(resp)
+    return _model_ids(_provider_json(resp).get("data", []))
+
+
+async def _fetch_openrouter_models(client: httpx.AsyncClient, pc: ProviderConfig) -> List[str]:
+    headers = {}
+    if pc.api_key:
+        headers["Authorization"] = f"Bearer {pc.api_key}"
+    resp = await client.get("https://openrouter.ai/api/v1/models", headers=headers, timeout=_MODELS_TIMEOUT)
+    _raise_models_error(resp)
+    items = _provider_json(resp).get("data", [])
+    def is_free(it):
+        pricing = it.get("pricing") or {}
+        # Heuristic: free if prompt/completion cost is 0
+        for k in ("prompt", "completion"):
+            v = pricing.get(k)
+            if v in (None, "0", 0, "0.0", 0.0):
+                continue
+            return False
+        return True
+    # sort: free first, then name
+    items.sort(key=lambda it: (0 if is_free(it) else 1, (it.get("id") or it.get("name") or "z")))
+    return _model_ids(items)
+
+
+async def _fetch_gemini_models(client: httpx.AsyncClient, pc: ProviderConfig) -> List[str]:
+    if not pc.api_key:
+        raise HTTPException(status_code=400, detail="Missing API key for gemini")
+    base = (pc.api_base or "https://generativelanguage.googleapis.com/v1beta/openai").rstrip("/")
+    headers = {"Authorization": f"Bearer {pc.api_key}"}
+    resp = await client.get(base + "/models", headers=headers, timeout=_MODELS_TIMEOUT)
+    _raise_models_error(resp)
+    return _model_ids(_provider_json(resp).get("data", []))
+
+
+_MODEL_FETCHERS = {
+    Provider.OPENAI: _fetch_openai_models,
+    Provider.OPENROUTER: _fetch_openrouter_models,
+    Provider.GEMINI: _fetch_gemini_models,
+}
+
+# Upstream model catalogs change rarely; keep each successful listing for an
+# hour, keyed by provider, endpoint and a hash of the API key (never the key).
+_MODELS_CACHE_TTL = 3600.0
+_models_cache: Dict[tuple, tuple[float, List[str]]] = {}
+
+
+async def _cached_models(provider: str, client: httpx.AsyncClient, pc: ProviderConfig) -> List[str]:
+    key_hash = hashlib.blake2b((pc.api_key or "").encode(), digest_size=8).hexdigest()
+    key = (Provider(provider).value, pc.api_base, key_hash)
+    hit = _models_cache.get(key)
+    if hit is not None and time.monotonic() - hit[0] < _MODELS_CACHE_TTL:
+        return list(hit[1])
+    models = await _MODEL_FETCHERS[provider](client, pc)
+    _models_cache[key] = (time.monotonic(), models)
+    return list(models)
+
+
 @app.get("/models", response_model=ModelsResponse)
 async def list_models(provider: str | None = None) -> ModelsResponse:
+    """List models for one provider, or for every provider with ``provider=all``.
+
+    The ``all`` lookups run concurrently; providers that fail are skipped.
+    """
     cfg = load_config()
     p = provider or cfg.active_provider
+    client = _http_client()
 
-    async def _err(detail):
-        raise HTTPException(status_code=400, detail=detail)
-
-    timeout = httpx.Timeout(connect=10.0, read=30.0, write=10.0, pool=10.0)
+    if p == "all":
+        results = await asyncio.gather(
+            *(_cached_models(key, client, cfg.providers.get(key, ProviderConfig())) for key in _MODEL_FETCHERS),
+            return_exceptions=True,
+        )
+        models: List[str] = []
+        for result in results:
+            if not isinstance(result, BaseException):
+                models.extend(result)
+        return ModelsResponse(models=list(dict.fromkeys(models)))
 
     if p == Provider.ECHO:
         return ModelsResponse(models=[])
 
-    if p == Provider.OPENAI:
-        pc = cfg.providers.get(p, ProviderConfig())
-        if not pc.api_key:
-            await _err("Missing API key for openai")
-        base = (pc.api_base or "https://api.openai.com/v1").rstrip("/")
-        url = base + "/models"
-        headers = {"Authorization": f"Bearer {pc.api_key}"}
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            resp = await client.get(url, headers=headers)
-        if resp.status_code >= 400:
-            try:
-                detail = resp.json()
-            except Exception:
-                detail = resp.text
-            raise HTTPException(status_code=502, detail=detail)
-        data = resp.json()
-        ids = []
-        for item in data.get("data", []):
-            mid = item.get("id") or item.get("name")
-            if mid:
-                ids.append(mid)
-        return ModelsResponse(models=ids)
-
-    if p == Provider.OPENROUTER:
-        url = "https://openrouter.ai/api/v1/models"
-        headers = {}
-        pc = cfg.providers.get(p, ProviderConfig())
-        if pc.api_key:
-            headers["Authorization"] = f"Bearer {pc.api_key}"
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            resp = await client.get(url, headers=headers)
-        if resp.status_code >= 400:
-            try:
-                detail = resp.json()
-            except Exception:
-                detail = resp.text
-            raise HTTPException(status_code=502, detail=detail)
-        data = resp.json()
-        items = data.get("data", [])
-        def is_free(it):
-            pricing = it.get("pricing") or {}
-            # Heuristic: free if prompt/completion cost is 0
-            for k in ("prompt", "completion"):
-                v = pricing.get(k)
-                if v in (None, "0", 0, "0.0", 0.0):
-                    continue
-                return False
-            return True
-        # sort: free first, then name
-        items.sort(key=lambda it: (0 if is_free(it) else 1, (it.get("id") or it.get("name") or "z")))
-        ids = []
-        for item in items:
-            mid = item.get("id") or item.get("name")
-            if mid:
-                ids.append(mid)
-        return ModelsResponse(models=ids)
-
-    if p == Provider.GEMINI:
-        pc = cfg.providers.get(p, ProviderConfig())
-        if not pc.api_key:
-            await _err("Missing API key for gemini")
-        base = (pc.api_base or "https://generativelanguage.googleapis.com/v1beta/openai").rstrip("/")
-        url = base + "/models"
-        headers = {"Authorization": f"Bearer {pc.api_key}"}
-        async with httpx.AsyncClient(timeout=timeout) as client:
-            resp = await client.get(url, headers=headers)
-        if resp.status_code >= 400:
-            try:
-                detail = resp.json()
-            except Exception:
-                detail = resp.text
-            raise HTTPException(status_code=502, detail=detail)
-        data = resp.json()
-        ids = []
-        for item in data.get("data", []):
-            mid = item.get("id") or item.get("name")
-            if mid:
-                ids.append(mid)
-        return ModelsResponse(models=ids)
-
-    raise HTTPException(status_code=400, detail=f"Unsupported provider: {p}")
+    if p not in _MODEL_FETCHERS:
+        raise HTTPException(status_code=400, detail=f"Unsupported provider: {p}")
+    return ModelsResponse(models=await _cached_models(p, client, cfg.providers.get(p, ProviderConfig())))
 
 
 # ---------------------------------------------------------------------------
 # Character import (JSON via multipart or direct JSON)
 # ---------------------------------------------------------------------------
 
-from fastapi import UploadFile, File, Form
+
+# Card keys copied into CharacterCreate, and the list fields that default to []
+_CHARACTER_CREATE_FIELDS = frozenset(CharacterCreate.model_fields)
+_CHARACTER_LIST_FIELDS = ("alternate_greetings", "tags", "lorebook_ids")
 
 
 @app.post("/characters/import", response_model=Character, status_code=201)
@@ -1892,28 +2242,14 @@ async def import_character(
     # If a file was provided, detect PNG or JSON
     data = None
     if file is not None:
-        raw = await file.read()
-        if raw[:8] == b"\x89PNG\r\n\x1a\n":
-            try:
-                data = _parse_png_card(raw)
-            except Exception as e:
-                raise HTTPException(status_code=400, detail=f"Invalid PNG card: {e}")
-            # Save the PNG to public folder and set avatar_url
-            try:
-                import os as _os
-                static_chars = _os.path.join(_os.path.dirname(__file__), "..", "public", "characters")
-                _os.makedirs(static_chars, exist_ok=True)
-                fname = f"{int(time.time()*1000)}.png"
-                fpath = _os.path.join(static_chars, fname)
-                with open(fpath, "wb") as fh:
-                    fh.write(raw)
-                data["avatar_url"] = f"/public/characters/{fname}"
-            except Exception:
-                pass
+        head = await file.read(_UPLOAD_CHUNK)
+        if head.startswith(_PNG_SIGNATURE):
+            data = await _import_png_card(file, head)
         else:
+            # JSON cards are parsed whole; they are small next to PNG avatars
+            raw = head + await file.read()
             try:
-                import json as _json
-                data = _json.loads(raw.decode("utf-8"))
+                data = orjson.loads(raw)
             except Exception as e:
                 raise HTTPException(status_code=400, detail=f"Invalid import file: {e}")
     else:
@@ -1922,77 +2258,196 @@ async def import_character(
     if not data or not data.get("name"):
         raise HTTPException(status_code=400, detail="Missing required field 'name'")
 
-    payload = CharacterCreate(
-        name=data.get("name"),
-        description=data.get("description", ""),
-        avatar_url=data.get("avatar_url"),
-        first_message=data.get("first_message") or data.get("first_mes"),
-        alternate_greetings=data.get("alternate_greetings") or [],
-        scenario=data.get("scenario"),
-        system_prompt=data.get("system_prompt"),
-        personality=data.get("personality"),
-        mes_example=data.get("mes_example"),
-        creator_notes=data.get("creator_notes"),
-        tags=data.get("tags") or [],
-        post_history_instructions=data.get("post_history_instructions"),
-        extensions=data.get("extensions"),
-        lorebook_ids=data.get("lorebook_ids") or [],
-    )
+    fields = {key: data[key] for key in _CHARACTER_CREATE_FIELDS & data.keys()}
+    # SillyTavern cards name the greeting first_mes
+    if not fields.get("first_message"):
+        fields["first_message"] = data.get("first_mes")
+    for key in _CHARACTER_LIST_FIELDS:
+        if not fields.get(key):
+            fields[key] = []
+    payload = CharacterCreate.model_validate(fields)
     # Reuse create_character logic
     return await create_character(payload, db)
 
 
-def _parse_png_card(raw: bytes) -> Dict[str, object]:
-    import struct, json, base64
-    pos = 8  # after signature
-    found = {}
-    while pos + 8 <= len(raw):
-        length = struct.unpack(">I", raw[pos:pos+4])[0]; pos += 4
-        ctype = raw[pos:pos+4]; pos += 4
-        data = raw[pos:pos+length]; pos += length
-        crc = raw[pos:pos+4]; pos += 4  # noqa
-        if ctype == b"tEXt":
-            # keyword\x00text
+try:
+    from isal.isal_zlib import decompress as _inflate
+except ImportError:  # optional; stdlib zlib inflates compressed iTXt card text instead
+    from zlib import decompress as _inflate
+
+# PNG chunk header: big-endian uint32 length and 4-byte type
+_CHUNK_HEADER = struct.Struct(">I4s")
+_PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+# Text chunk keywords that carry character card JSON
+_CHARA_KEYS = frozenset((b"chara_card_v2", b"chara"))
+# Upload read size for streamed imports
+_UPLOAD_CHUNK = 1 << 20
+
+
+def _read_text_chunk(data: bytes) -> tuple[bytes, str] | None:
+    # keyword\x00text
+    nul = data.find(b"\x00")
+    raw_key = data[:nul]
+    # Other text chunks (Software, tIME, ...) are dropped before decoding
+    if nul < 0 or raw_key not in _CHARA_KEYS:
+        return None
+    return raw_key, data[nul+1:].decode("utf-8", errors="ignore")
+
+
+def _read_itxt_chunk(data: bytes) -> tuple[bytes, str] | None:
+    # keyword\x00 comp_flag comp_method lang\x00 translated\x00 text
+    raw_key, _, rest = data.partition(b"\x00")
+    if raw_key not in _CHARA_KEYS:
+        return None
+    try:
+        comp_flag = rest[:1]
+        _lang, _translated, text = rest[2:].split(b"\x00", 2)
+        if comp_flag == b"\x01":
+            text = _inflate(text)
+        return raw_key, text.decode("utf-8", errors="ignore")
+    except Exception:
+        return None
+
+
+# Chunk types that may carry card text, mapped to their (keyword, text) readers
+_TEXT_CHUNK_READERS = {b"tEXt": _read_text_chunk, b"iTXt": _read_itxt_chunk}
+
+
+class _PngCardReader:
+    """Incremental reader for the character card text chunks of a PNG.
+
+    ``feed`` takes the bytes after the signature in pieces of any size. Only
+    tEXt/iTXt payloads are buffered; other chunks are skipped by length, so
+    a streamed upload never has to be held in memory whole.
+    """
+
+    def __init__(self) -> None:
+        self.found: Dict[str, str] = {}
+        self.done = False
+        self._pending = b""  # unconsumed tail: a partial chunk header or text chunk
+        self._skip = 0  # bytes still to drop from a skipped chunk
+
+    def feed(self, data) -> None:
+        if self.done:
+            return
+        view = memoryview(data)
+        if self._skip:
+            n = min(self._skip, len(view))
+            self._skip -= n
+            view = view[n:]
+        if self._pending:
+            view = memoryview(self._pending + view)
+        pos = self._consume(view)
+        self._pending = bytes(view[pos:])
+
+    def _consume(self, view: memoryview) -> int:
+        pos, end = 0, len(view)
+        while pos + 8 <= end:
+            length, ctype = _CHUNK_HEADER.unpack_from(view, pos)
+            chunk_end = pos + 12 + length  # header, payload and CRC
+            read_text = _TEXT_CHUNK_READERS.get(ctype)
+            if read_text is not None:
+                if chunk_end > end:
+                    break  # wait for the rest of the text chunk
+                # Only text chunks are copied out of the buffer
+                entry = read_text(bytes(view[pos+8:pos+8+length]))
+                if entry is not None:
+                    self.found[entry[0].decode("latin1")] = entry[1]
+            elif chunk_end > end:
+                self._skip = chunk_end - end
+                return end
+            pos = chunk_end
+            # SillyTavern writes its text chunks just before IEND, after the
+            # image data, so the walk cannot stop at IDAT; it can stop once
+            # the preferred v2 card is in hand.
+            if ctype == b"IEND" or "chara_card_v2" in self.found:
+                self.done = True
+                break
+        return pos
+
+    def card(self) -> Dict[str, object]:
+        """Decode the card from the chunks seen so far, preferring v2 JSON."""
+        found = self.found
+        if "chara_card_v2" in found:
             try:
-                nul = data.index(b"\x00")
-                key = data[:nul].decode("latin1")
-                text = data[nul+1:].decode("utf-8", errors="ignore")
-            except Exception:
-                continue
-            if key in ("chara_card_v2", "chara"):
-                found[key] = text
-        elif ctype == b"iTXt":
-            # keyword\x00comp_flag\x00comp_method\x00lang\x00translated\x00text
+                return orjson.loads(found["chara_card_v2"])  # type: ignore
+            except Exception as e:
+                raise ValueError(f"bad chara_card_v2 JSON: {e}")
+        if "chara" in found:
+            # Usually base64 JSON
             try:
-                parts = data.split(b"\x00", 5)
-                key = parts[0].decode("latin1")
-                comp_flag = parts[1][:1] if len(parts) > 1 else b"\x00"
-                # parts[2]=comp_method, parts[3]=lang, parts[4]=translated
-                text = parts[5] if len(parts) > 5 else b""
-                if comp_flag == b"\x01":
-                    import zlib
-                    text = zlib.decompress(text)
-                text = text.decode("utf-8", errors="ignore")
-            except Exception:
-                continue
-            if key in ("chara_card_v2", "chara"):
-                found[key] = text
-        if ctype == b"IEND":
-            break
-    # Prefer v2 JSON
-    if "chara_card_v2" in found:
-        try:
-            return json.loads(found["chara_card_v2"])  # type: ignore
-        except Exception as e:
-            raise ValueError(f"bad chara_card_v2 JSON: {e}")
-    if "chara" in found:
-        # Usually base64 JSON
+                decoded = base64.b64decode(found["chara"])  # type: ignore
+                return orjson.loads(decoded)
+            except Exception as e:
+                raise ValueError(f"bad chara base64: {e}")
+        raise ValueError("No character JSON found in PNG")
+
+
+def _parse_png_card(raw: bytes) -> Dict[str, object]:
+    if not raw.startswith(_PNG_SIGNATURE):
+        raise ValueError("not a PNG file")
+    reader = _PngCardReader()
+    reader.feed(memoryview(raw)[len(_PNG_SIGNATURE):])
+    return reader.card()
+
+
+def _open_upload_target(fpath: str, size: int | None) -> int:
+    """Open ``fpath`` for an unbuffered upload copy, preallocating ``size`` bytes where supported."""
+    fd = os.open(fpath, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o644)
+    if size and hasattr(os, "posix_fallocate"):
         try:
-            decoded = base64.b64decode(found["chara"])  # type: ignore
-            return json.loads(decoded)
-        except Exception as e:
-            raise ValueError(f"bad chara base64: {e}")
-    raise ValueError("No character JSON found in PNG")
+            os.posix_fallocate(fd, 0, size)
+        except OSError:
+            pass  # e.g. filesystems without fallocate; the writes still extend the file
+    return fd
+
+
+def _write_all(fd: int, data) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view):]
+
+
+def _copy_png_card(src, head: bytes, fd: int | None) -> Dict[str, object]:
+    """Feed ``head`` and the rest of ``src`` through ``_PngCardReader``,
+    copying every piece to ``fd`` when given. Blocking; run in a worker thread.
+    """
+    reader = _PngCardReader()
+    chunk, body = head, memoryview(head)[len(_PNG_SIGNATURE):]
+    while chunk:
+        if fd is not None:
+            _write_all(fd, chunk)
+        reader.feed(body)
+        chunk = body = src.read(_UPLOAD_CHUNK)
+    return reader.card()
+
+
+async def _import_png_card(file: UploadFile, head: bytes) -> Dict[str, object]:
+    """Parse a PNG card upload while copying it into public/characters.
+
+    Reading, parsing (including zlib and JSON decoding) and disk writes all
+    happen in one worker thread, so a large upload never blocks the event
+    loop; a PNG without a valid card is removed.
+    """
+    static_chars = os.path.join(os.path.dirname(__file__), "..", "public", "characters")
+    fname = f"{int(time.time()*1000)}.png"
+    fpath = os.path.join(static_chars, fname)
+    try:
+        os.makedirs(static_chars, exist_ok=True)
+        fd = _open_upload_target(fpath, file.size)
+    except OSError:
+        fd = None  # still import the card, just without an avatar
+    try:
+        data = await anyio.to_thread.run_sync(_copy_png_card, file.file, head, fd)
+    except Exception as e:
+        if fd is not None:
+            os.close(fd)
+            os.remove(fpath)
+        raise HTTPException(status_code=400, detail=f"Invalid PNG card: {e}")
+    if fd is not None:
+        os.close(fd)
+        data["avatar_url"] = f"/public/characters/{fname}"
+    return data
 
 
 class SuggestRequest(BaseModel):
@@ -2004,6 +2459,15 @@ class SuggestResponse(BaseModel):
     value: str
 
 
+# suggest_field instructions; the slots are the character name and the field
+_SUGGEST_PROMPT = (
+    "You are an AI Character Card creator helper. We are creating a new character named %s. "
+    "You need to fill in the %s field. The following fields have been filled out already; use them for context if helpful. "
+    "Reply with a single JSON string with your content, no additional text.\n\n"
+    "Filled fields:\n"
+)
+
+
 @app.post("/characters/suggest_field", response_model=SuggestResponse)
 async def suggest_field(payload: SuggestRequest) -> SuggestResponse:
     cfg = load_config()
@@ -2011,27 +2475,12 @@ async def suggest_field(payload: SuggestRequest) -> SuggestResponse:
     name = str(char.get("name")) if char.get("name") else "Character"
     field = payload.field
     # Build context: include filled fields except the one being suggested
-    ctx_lines = []
-    for k, v in char.items():
-        if k == field:
-            continue
-        if v is None:
-            continue
-        ctx_lines.append(f"- {k}: {v}")
-    ctx = "\n".join(ctx_lines)
-    prompt = (
-        f"You are an AI Character Card creator helper. We are creating a new character named {name}. "
-        f"You need to fill in the {field} field. The following fields have been filled out already; use them for context if helpful. "
-        f"Reply with a single JSON string with your content, no additional text.\n\n"
-        f"Filled fields:\n{ctx}\n\n"
-    )
+    ctx = "\n".join(f"- {k}: {v}" for k, v in char.items() if k != field and v is not None)
+    prompt = "".join((_SUGGEST_PROMPT % (name, field), ctx, "\n\n"))
     # Replace tokens
-    if hasattr(cfg, 'user_persona') and cfg.user_persona:
-        uname = cfg.user_persona.name or "User"
-    else:
-        uname = "User"
-    cname = name
-    prompt = prompt.replace("{{char}}", cname).replace("{{user}}", uname)
+    persona = getattr(cfg, 'user_persona', None)
+    uname = (persona.name if persona else None) or "User"
+    prompt = _fill_tokens(prompt, {"char": name, "user": uname})
 
     # Call LLM
     reply = await _llm_reply(prompt, cfg)
@@ -2045,8 +2494,7 @@ async def suggest_field(payload: SuggestRequest) -> SuggestResponse:
             value = value[5:]
     # Try parse JSON
     try:
-        import json as _json
-        j = _json.loads(value)
+        j = orjson.loads(value)
         if isinstance(j, str):
             value = j
         elif isinstance(j, dict) and 'text' in j and isinstance(j['text'], str):
@@ -2060,19 +2508,27 @@ async def suggest_field(payload: SuggestRequest) -> SuggestResponse:
 
 @app.post("/characters/upload_avatar")
 async def upload_avatar(file: UploadFile = File(...)) -> Dict[str, str]:
-    data = await file.read()
-    import os as _os, time as _time
     ext = ".png"
     if file.filename and "." in file.filename:
         ext = "." + file.filename.rsplit(".", 1)[-1].lower()
         if ext not in (".png", ".jpg", ".jpeg", ".webp"):
             ext = ".png"
-    characters_dir = _os.path.join(_os.path.dirname(__file__), "..", "public", "characters")
-    _os.makedirs(characters_dir, exist_ok=True)
-    fname = f"gen_{int(_time.time()*1000)}{ext}"
-    fpath = _os.path.join(characters_dir, fname)
-    with open(fpath, "wb") as fh:
-        fh.write(data)
+    characters_dir = os.path.join(os.path.dirname(__file__), "..", "public", "characters")
+    os.makedirs(characters_dir, exist_ok=True)
+    fname = f"gen_{int(time.time()*1000)}{ext}"
+    fpath = os.path.join(characters_dir, fname)
+
+    def _copy() -> None:
+        fd = _open_upload_target(fpath, file.size)
+        try:
+            while chunk := file.file.read(_UPLOAD_CHUNK):
+                _write_all(fd, chunk)
+        finally:
+            os.close(fd)
+
+    # Copy the spooled upload to disk in a worker thread, off the event loop
+    await file.seek(0)
+    await anyio.to_thread.run_sync(_copy)
     return {"avatar_url": f"/public/characters/{fname}"}
 
 
@@ -2113,17 +2569,25 @@ async def generate_avatar(payload: GenerateAvatarRequest) -> Dict[str, str]:
     if getattr(cfg, 'debug', None) and getattr(cfg.debug, 'log_prompts', False):
         print("[CoolChat] Pollinations URL:", url)
     timeout = _httpx.Timeout(connect=10.0, read=60.0, write=10.0, pool=10.0)
-    async with _httpx.AsyncClient(timeout=timeout) as client:
-        r = await client.get(url)
-        if r.status_code >= 400:
-            raise HTTPException(status_code=502, detail="Pollinations image fetch failed")
-        img = r.content
+    client = _http_client()
     characters_dir = _os.path.join(_os.path.dirname(__file__), "..", "public", "characters")
     _os.makedirs(characters_dir, exist_ok=True)
     fname = f"gen_{int(_time.time()*1000)}.png"
     fpath = _os.path.join(characters_dir, fname)
-    with open(fpath, "wb") as fh:
-        fh.write(img)
+    # Stream the image to disk in worker-thread writes instead of holding it whole
+    async with client.stream("GET", url, timeout=timeout) as r:
+        if r.status_code >= 400:
+            raise HTTPException(status_code=502, detail="Pollinations image fetch failed")
+        size = r.headers.get("content-length")
+        fd = _open_upload_target(fpath, int(size) if size and size.isdigit() else None)
+        try:
+            async for chunk in r.aiter_bytes(_UPLOAD_CHUNK):
+                await anyio.to_thread.run_sync(_write_all, fd, chunk)
+        except BaseException:
+            _os.close(fd)
+            _os.remove(fpath)
+            raise
+    _os.close(fd)
     return {"avatar_url": f"/public/characters/{fname}", "prompt": desc}
 
 
@@ -2141,46 +2605,46 @@ async def image_models(provider: str | None = None) -> ImageModelsResponse:
     p = (provider or ImageProvider.POLLINATIONS).lower()
     if p == ImageProvider.POLLINATIONS:
         try:
-            async with httpx.AsyncClient(timeout=httpx.Timeout(10.0, read=30.0)) as client:
-                r = await client.get("https://image.pollinations.ai/models")
-                if r.status_code == 200:
-                    data = r.json()
-                    if isinstance(data, list):
-                        models = []
-                        for it in data:
-                            mid = it.get("id") or it.get("name") if isinstance(it, dict) else it
-                            if mid:
-                                models.append(mid)
-                        if models:
-                            return ImageModelsResponse(models=models)
+            client = _http_client()
+            r = await client.get("https://image.pollinations.ai/models", timeout=httpx.Timeout(10.0, read=30.0))
+            if r.status_code == 200:
+                data = r.json()
+                if isinstance(data, list):
+                    models = []
+                    for it in data:
+                        mid = it.get("id") or it.get("name") if isinstance(it, dict) else it
+                        if mid:
+                            models.append(mid)
+                    if models:
+                        return ImageModelsResponse(models=models)
         except Exception as e:
             print("[CoolChat] pollinations models fetch failed:", e)
         # fallback
         return ImageModelsResponse(models=["flux/dev", "sdxl", "stable-diffusion-2-1", "playground-v2.5"])
     if p == ImageProvider.DEZGO:
         try:
-            async with httpx.AsyncClient(timeout=httpx.Timeout(10.0, read=30.0)) as client:
-                r = await client.get("https://api.dezgo.com/info")
-                if r.status_code == 200:
-                    info = r.json()
-                    items = info.get("models") if isinstance(info, dict) else None
-                    models = []
-                    if isinstance(items, list):
-                        for it in items:
-                            if not isinstance(it, dict):
-                                continue
-                            # Only include models that support any text2image family
-                            funcs = [f.lower() for f in (it.get("functions") or []) if isinstance(f, str)]
-                            if not any("text2image" in f for f in funcs):
-                                continue
-                            mid = it.get("id")
-                            family = (it.get("family") or "zzz").lower()
-                            if mid:
-                                models.append((family, mid))
-                    if models:
-                        # Sort by family then id for stable order
-                        models.sort(key=lambda x: (x[0], x[1]))
-                        return ImageModelsResponse(models=[m[1] for m in models])
+            client = _http_client()
+            r = await client.get("https://api.dezgo.com/info", timeout=httpx.Timeout(10.0, read=30.0))
+            if r.status_code == 200:
+                info = r.json()
+                items = info.get("models") if isinstance(info, dict) else None
+                models = []
+                if isinstance(items, list):
+                    for it in items:
+                        if not isinstance(it, dict):
+                            continue
+                        # Only include models that support any text2image family
+                        funcs = [f.lower() for f in (it.get("functions") or []) if isinstance(f, str)]
+                        if not any("text2image" in f for f in funcs):
+                            continue
+                        mid = it.get("id")
+                        family = (it.get("family") or "zzz").lower()
+                        if mid:
+                            models.append((family, mid))
+                if models:
+                    # Sort by family then id for stable order
+                    models.sort(key=lambda x: (x[0], x[1]))
+                    return ImageModelsResponse(models=[m[1] for m in models])
         except Exception as e:
             print("[CoolChat] dezgo models fetch failed:", e)
         # fallback minimal list (ids) by family order
@@ -2197,20 +2661,19 @@ class ChatListResponse(BaseModel):
     sessions: List[str]
 
 
-@app.get("/chats", response_model=ChatListResponse)
-async def list_chats() -> ChatListResponse:
+@app.get("/chats", responses={200: {"model": ChatListResponse}})
+async def list_chats() -> ORJSONResponse:
     """List all chat sessions from SQLite."""
     from .database import SessionLocal
     from .models import ChatSession
 
     db = SessionLocal()
     try:
-        sessions = db.query(ChatSession).all()
-        session_ids = [s.id for s in sessions]
-        return ChatListResponse(sessions=session_ids)
+        session_ids = [session_id for (session_id,) in db.query(ChatSession.id)]
+        return ORJSONResponse({"sessions": session_ids})
     except Exception as e:
         print(f"[CoolChat] Error listing chats: {e}")
-        return ChatListResponse(sessions=[])
+        return ORJSONResponse({"sessions": []})
     finally:
         db.close()
 
@@ -2219,11 +2682,11 @@ class ChatHistoryResponse(BaseModel):
     messages: List[Dict[str, Union[str, None]]]
 
 
-@app.get("/chats/{session_id}", response_model=ChatHistoryResponse)
-async def get_chat(session_id: str) -> ChatHistoryResponse:
+@app.get("/chats/{session_id}", responses={200: {"model": ChatHistoryResponse}})
+async def get_chat(session_id: str) -> ORJSONResponse:
     """Return all messages for a chat session from SQLite."""
-    messages = _load_chat_session(session_id)
-    return ChatHistoryResponse(messages=messages)
+    # Rows are already str/None dicts; skip validating every message twice
+    return ORJSONResponse({"messages": _load_chat_session(session_id)})
 
 
 @app.post("/chats/{session_id}/reset")
@@ -2385,11 +2848,11 @@ async def list_mcp_awesome():
     import re
     url = "https://raw.githubusercontent.com/punkpeye/awesome-mcp-servers/refs/heads/main/README.md"
     try:
-        async with httpx.AsyncClient(timeout=httpx.Timeout(10.0, read=30.0)) as client:
-            r = await client.get(url)
-            if r.status_code != 200:
-                raise HTTPException(status_code=502, detail="Failed to fetch awesome list")
-            md = r.text
+        client = _http_client()
+        r = await client.get(url, timeout=httpx.Timeout(10.0, read=30.0))
+        if r.status_code != 200:
+            raise HTTPException(status_code=502, detail="Failed to fetch awesome list")
+        md = r.text
     except Exception as e:
         raise HTTPException(status_code=502, detail=str(e))
     items = []
@@ -2580,12 +3043,12 @@ async def generate_from_chat(payload: GenerateFromChatRequest) -> GenerateFromCh
             poll_url += f"?model={_urlp.quote(model)}"
         print("[CoolChat] Pollinations URL:", poll_url)
         timeout = _httpx.Timeout(connect=10.0, read=60.0, write=10.0, pool=10.0)
-        async with _httpx.AsyncClient(timeout=timeout) as client:
-            r = await client.get(poll_url)
-            print("[CoolChat] Pollinations status=", r.status_code)
-            if r.status_code >= 400:
-                raise HTTPException(status_code=502, detail="Pollinations image fetch failed")
-            img = r.content
+        client = _http_client()
+        r = await client.get(poll_url, timeout=timeout)
+        print("[CoolChat] Pollinations status=", r.status_code)
+        if r.status_code >= 400:
+            raise HTTPException(status_code=502, detail="Pollinations image fetch failed")
+        img = r.content
         images_root = _os.path.join(_os.path.dirname(__file__), "..", "public", "images")
         _os.makedirs(images_root, exist_ok=True)
         # Save under character folder
@@ -2692,19 +3155,19 @@ async def generate_from_chat(payload: GenerateFromChatRequest) -> GenerateFromCh
             pass
         # Force multipart/form-data per Dezgo examples
         multipart = {k: (None, v) for k, v in form.items()}
-        async with _httpx.AsyncClient(timeout=_httpx.Timeout(10.0, read=60.0)) as client:
-            # Build request to inspect headers too
-            req = client.build_request("POST", f"https://api.dezgo.com/{endpoint}", files=multipart, headers=headers)
-            # Log content-type with boundary for debugging
-            try:
-                print("[CoolChat] Dezgo Content-Type:", req.headers.get("Content-Type"))
-            except Exception:
-                pass
-            r = await client.send(req)
-            print("[CoolChat] Dezgo status=", r.status_code)
-            if r.status_code >= 400:
-                raise HTTPException(status_code=502, detail=f"Dezgo error: {r.text}")
-            img = r.content
+        client = _http_client()
+        # Build request to inspect headers too
+        req = client.build_request("POST", f"https://api.dezgo.com/{endpoint}", files=multipart, headers=headers, timeout=_httpx.Timeout(10.0, read=60.0))
+        # Log content-type with boundary for debugging
+        try:
+            print("[CoolChat] Dezgo Content-Type:", req.headers.get("Content-Type"))
+        except Exception:
+            pass
+        r = await client.send(req)
+        print("[CoolChat] Dezgo status=", r.status_code)
+        if r.status_code >= 400:
+            raise HTTPException(status_code=502, detail=f"Dezgo error: {r.text}")
+        img = r.content
         images_root = _os.path.join(_os.path.dirname(__file__), "..", "public", "images")
         _os.makedirs(images_root, exist_ok=True)
         try:
@@ -2755,11 +3218,11 @@ async def generate_image(payload: GenerateImageRequest) -> GenerateFromChatRespo
         import httpx as _httpx, urllib.parse as _urlp, os as _os, time as _time
         poll_url = f"https://image.pollinations.ai/prompt/{_urlp.quote(final_prompt)}"
         timeout = _httpx.Timeout(connect=10.0, read=60.0, write=10.0, pool=10.0)
-        async with _httpx.AsyncClient(timeout=timeout) as client:
-            r = await client.get(poll_url)
-            if r.status_code >= 400:
-                raise HTTPException(status_code=502, detail="Pollinations image fetch failed")
-            img = r.content
+        client = _http_client()
+        r = await client.get(poll_url, timeout=timeout)
+        if r.status_code >= 400:
+            raise HTTPException(status_code=502, detail="Pollinations image fetch failed")
+        img = r.content
         images_root = _os.path.join(_os.path.dirname(__file__), "..", "public", "images")
         _os.makedirs(images_root, exist_ok=True)
         try:
@@ -2828,11 +3291,11 @@ async def generate_image(payload: GenerateImageRequest) -> GenerateFromChatRespo
                 form["upscale"] = "true"
         headers = {"X-Dezgo-Key": key}
         multipart = {k: (None, v) for k, v in form.items()}
-        async with _httpx.AsyncClient(timeout=_httpx.Timeout(10.0, read=60.0)) as client:
-            r = await client.post(f"https://api.dezgo.com/{endpoint}", files=multipart, headers=headers)
-            if r.status_code >= 400:
-                raise HTTPException(status_code=502, detail=f"Dezgo error: {r.text}")
-            img = r.content
+        client = _http_client()
+        r = await client.post(f"https://api.dezgo.com/{endpoint}", files=multipart, headers=headers, timeout=_httpx.Timeout(10.0, read=60.0))
+        if r.status_code >= 400:
+            raise HTTPException(status_code=502, detail=f"Dezgo error: {r.text}")
+        img = r.content
         images_root = _os.path.join(_os.path.dirname(__file__), "..", "public", "images")
         _os.makedirs(images_root, exist_ok=True)
         try:
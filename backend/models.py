@@ -1,10 +1,28 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, func, Float, JSON, Table
+import orjson
+from sqlalchemy import event, Column, Index, Integer, String, DateTime, Text, ForeignKey, func, Float, JSON, Table, LargeBinary, Boolean
 from sqlalchemy.orm import relationship, declarative_base
+from sqlalchemy.types import TypeDecorator
 
 # Define Base here to avoid circular imports
 Base = declarative_base()
 
 
+class ORJSON(TypeDecorator):
+    """JSON column stored as TEXT and (de)serialized with orjson."""
+    impl = Text
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return None
+        return orjson.dumps(value).decode()
+
+    def process_result_value(self, value, dialect):
+        if value is None:
+            return None
+        return orjson.loads(value)
+
+
 class CharacterCard(Base):
     __tablename__ = "character_cards"
 
@@ -35,6 +53,9 @@ class ChatMessage(Base):
 
     chat = relationship("ChatSession", back_populates="messages")
 
+    # Every chat turn loads, trims or resets one session's messages in order
+    __table_args__ = (Index("ix_chat_messages_chat_id_created_at", "chat_id", "created_at"),)
+
 
 # Add messages relationship to ChatSession
 ChatSession.messages = relationship("ChatMessage", back_populates="chat", cascade="all, delete-orphan")
@@ -59,15 +80,15 @@ class Character(Base):
 
     # Extended character fields for compatibility
     first_message = Column(Text, nullable=True)
-    alternate_greetings = Column(JSON, nullable=True, default=list)
+    alternate_greetings = Column(ORJSON, nullable=True, default=list)
     scenario = Column(Text, nullable=True)
     system_prompt = Column(Text, nullable=True)
     personality = Column(Text, nullable=True)
     mes_example = Column(Text, nullable=True)
     creator_notes = Column(Text, nullable=True)
-    tags = Column(JSON, nullable=True, default=list)
+    tags = Column(ORJSON, nullable=True, default=list)
     post_history_instructions = Column(Text, nullable=True)
-    extensions = Column(JSON, nullable=True)
+    extensions = Column(ORJSON, nullable=True)
 
     # Image generation settings
     image_prompt_prefix = Column(Text, nullable=True)
@@ -113,8 +134,8 @@ class LoreEntry(Base):
     content = Column(Text, nullable=False)
 
     # Keywords for search and matching
-    keywords = Column(JSON, nullable=False, default=list)  # List of primary keywords
-    secondary_keywords = Column(JSON, nullable=False, default=list)  # Less important keywords
+    keywords = Column(ORJSON, nullable=False, default=list)  # List of primary keywords
+    secondary_keywords = Column(ORJSON, nullable=False, default=list)  # Less important keywords
 
     # Search and context settings
     logic = Column(String(50), nullable=False, default="AND ANY")  # AND ANY, AND ALL, NOT ANY, NOT ALL
@@ -126,16 +147,53 @@ class LoreEntry(Base):
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
     # Vector embeddings for RAG
+    # Lowercased search copies maintained on write (keywords newline-joined)
+    keywords_lower = Column(Text, nullable=True)
+    secondary_keywords_lower = Column(Text, nullable=True)
+    content_lower = Column(Text, nullable=True)
+
     embedding = Column(Text, nullable=True)  # Base64 encoded embedding vector
+    embedding_blob = Column(LargeBinary, nullable=True)  # Raw float32 bytes of the same vector
     embedding_model = Column(String(100), nullable=True)  # Model identifier (e.g., "nomic-embed-text:latest")
     embedding_dimensions = Column(Integer, nullable=True)  # Vector dimensions for validation
     embedding_updated_at = Column(DateTime, nullable=True)  # Timestamp for embedding regeneration tracking
     embedding_provider = Column(String(50), nullable=True)  # Provider type ("ollama", "gemini", "openai")
+    embedding_int8 = Column(LargeBinary, nullable=True)  # Unit-normalized embedding quantized to int8
+    embedding_scale = Column(Float, nullable=True)  # Dequantization scale for embedding_int8
+    embedding_normalized = Column(Boolean, nullable=True)  # True once the stored vector is unit-length
 
     # Relationships
     lorebook = relationship("Lorebook", back_populates="entries", lazy="joined")
 
 
+def lowercase_keyword_text(keywords) -> str:
+    """Newline-joined lowercase keywords, as stored in the ``*_keywords_lower`` columns.
+
+    Keyword lists are stored as given, so nulls are skipped and other
+    non-string items are matched by their text.
+    """
+    return "\n".join(str(kw).lower() for kw in (keywords or []) if kw is not None)
+
+
+@event.listens_for(LoreEntry, "before_insert")
+@event.listens_for(LoreEntry, "before_update")
+def _set_lore_search_text(mapper, connection, target):
+    target.keywords_lower = lowercase_keyword_text(target.keywords)
+    target.secondary_keywords_lower = lowercase_keyword_text(target.secondary_keywords)
+    target.content_lower = (target.content or "").lower()
+
+
+def entry_search_text(entry: LoreEntry):
+    """Lowercased (keywords, secondary keywords, content) text for matching.
+
+    Uses the stored copies when present and computes them for rows written
+    before those columns existed or without going through the ORM.
+    """
+    if entry.content_lower is not None:
+        return entry.keywords_lower or "", entry.secondary_keywords_lower or "", entry.content_lower
+    return lowercase_keyword_text(entry.keywords), lowercase_keyword_text(entry.secondary_keywords), (entry.content or "").lower()
+
+
 class Circuit(Base):
     """Stored prompt circuit definitions."""
     __tablename__ = "circuits"
@@ -175,6 +233,18 @@ class RAGConfig(Base):
     # Metadata
     created_at = Column(DateTime, server_default=func.now())
     updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
+
+
+class MemoryRecord(Base):
+    """Memory entry stored as its already-encoded JSON response body"""
+    __tablename__ = "memory_entries"
+    # AUTOINCREMENT so ids of deleted entries are never handed out again
+    __table_args__ = {"sqlite_autoincrement": True}
+
+    id = Column(Integer, primary_key=True, index=True)
+    json = Column(LargeBinary, nullable=False)  # orjson-encoded MemoryEntry
+
+
 class AppSettings(Base):
     """Main application settings storage"""
     __tablename__ = "app_settings"
@@ -0,0 +1,67 @@
+"""Per-request latency sampling, enabled with ``COOLCHAT_PROFILE=1``."""
+
+from __future__ import annotations
+
+import time
+from collections import deque
+from typing import Deque, Iterator, NamedTuple
+
+
+class RequestSample(NamedTuple):
+    method: str
+    route: str
+    wall_ns: int
+    cpu_ns: int
+    status: int
+
+
+# Most recent samples, oldest dropped first
+SAMPLES: Deque[RequestSample] = deque(maxlen=2000)
+
+
+class ProfilerMiddleware:
+    """ASGI middleware recording wall and process CPU time per request.
+
+    Timing stops when the last body chunk has been sent, so streamed
+    responses are measured end to end. CPU time is process-wide, so it also
+    counts work done for requests that overlap this one.
+    """
+
+    def __init__(self, app, samples: Deque[RequestSample] = SAMPLES):
+        self.app = app
+        self.samples = samples
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        wall = time.perf_counter_ns()
+        cpu = time.process_time_ns()
+        status = 500
+
+        async def _send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            # Group by route template (e.g. /characters/{char_id}) when matched
+            route = getattr(scope.get("route"), "path", None) or scope["path"]
+            self.samples.append(RequestSample(
+                scope["method"],
+                route,
+                time.perf_counter_ns() - wall,
+                time.process_time_ns() - cpu,
+                status,
+            ))
+
+
+def metrics_csv(samples: Deque[RequestSample] = SAMPLES) -> Iterator[str]:
+    """Yield the recorded samples as CSV lines, header first."""
+    yield "method,route,wall_ns,cpu_ns,status\n"
+    for sample in list(samples):
+        yield f"{sample.method},{sample.route},{sample.wall_ns},{sample.cpu_ns},{sample.status}\n"
@@ -5,7 +5,7 @@ import asyncio
 import base64
 import logging
 from datetime import datetime
-from typing import List, Optional, Any, Union
+from typing import Dict, List, Optional, Any, Tuple, Union
 from dataclasses import dataclass
 
 import numpy as np
@@ -46,6 +46,69 @@ class EmbeddingConfig:
         )
 
 
+class EmbeddingBatcher:
+    """Coalesce concurrent single-text embedding requests into batched provider calls
+
+    Requests arriving within ``max_wait_ms`` of each other (or until
+    ``max_batch`` are pending) share one ``generate_embeddings_batch`` call;
+    identical texts in a batch are embedded once.
+    """
+
+    def __init__(self, service: 'EmbeddingService', max_batch: int = 32, max_wait_ms: float = 20.0):
+        self._service = service
+        self.max_batch = max_batch
+        self.max_wait = max_wait_ms / 1000.0
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._timer: Optional[asyncio.Task] = None
+
+    async def embed(self, text: str) -> str:
+        """Queue ``text`` for the next batch and wait for its base64 embedding"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future))
+        if len(self._pending) >= self.max_batch:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            loop.create_task(self._flush())
+        elif self._timer is None:
+            self._timer = loop.create_task(self._flush_after(self.max_wait))
+        return await future
+
+    async def _flush_after(self, delay: float):
+        await asyncio.sleep(delay)
+        self._timer = None
+        await self._flush()
+
+    async def _flush(self):
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        texts = list(dict.fromkeys(text for text, _ in batch))
+        try:
+            if len(texts) == 1:
+                embeddings = [await self._service.generate_embedding(texts[0])]
+            else:
+                embeddings = await self._service.generate_embeddings_batch(texts)
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        logger.debug("Embedded %d queued texts in one batch (%d unique)", len(batch), len(texts))
+        by_text = dict(zip(texts, embeddings))
+        for text, future in batch:
+            if not future.done():
+                future.set_result(by_text[text])
+
+
+# One batcher per (provider, model), shared by every EmbeddingService instance;
+# get_rag_service builds a new service per request session
+_batchers: Dict[Tuple[str, str], EmbeddingBatcher] = {}
+
+
 class EmbeddingService:
     """Service for managing vector embeddings"""
 
@@ -121,7 +184,7 @@ class EmbeddingService:
             entry = db.query(LoreEntry).filter(LoreEntry.id == lore_entry.id).first()
             if entry:
                 await self._load_config()
-                entry.embedding = embedding_b64
+                self._apply_embedding(entry, embedding_b64)
                 entry.embedding_model = self._config.model
                 entry.embedding_dimensions = self._config.dimensions
                 entry.embedding_updated_at = datetime.now()
@@ -133,7 +196,7 @@ class EmbeddingService:
                 entry = db.query(LoreEntry).filter(LoreEntry.id == lore_entry.id).first()
                 if entry:
                     await self._load_config()
-                    entry.embedding = embedding_b64
+                    self._apply_embedding(entry, embedding_b64)
                     entry.embedding_model = self._config.model
                     entry.embedding_dimensions = self._config.dimensions
                     entry.embedding_updated_at = datetime.now()
@@ -143,13 +206,26 @@ class EmbeddingService:
 
         return embedding_b64
 
-    def decode_embedding(self, embedding_b64: str) -> np.ndarray:
-        """Decode base64 embedding back to numpy array"""
-        if not embedding_b64:
+    def _apply_embedding(self, entry: LoreEntry, embedding_b64: str) -> None:
+        """Write the unit-normalized base64, raw-bytes and int8 forms of an embedding onto a lore entry"""
+        vector = np.frombuffer(base64.b64decode(embedding_b64), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if norm > 0:
+            vector = (vector / norm).astype(np.float32)
+        entry.embedding = self.encode_embedding(vector)
+        entry.embedding_blob = vector.tobytes()
+        entry.embedding_normalized = True
+        entry.embedding_int8, entry.embedding_scale = self.quantize_embedding(vector)
+
+    def decode_embedding(self, embedding: Union[str, bytes]) -> np.ndarray:
+        """Decode a base64 string or raw float32 bytes back to numpy array"""
+        if not embedding:
             return np.array([])
 
         try:
-            embedding_bytes = base64.b64decode(embedding_b64)
+            if isinstance(embedding, (bytes, bytearray, memoryview)):
+                return np.frombuffer(embedding, dtype=np.float32)
+            embedding_bytes = base64.b64decode(embedding)
             return np.frombuffer(embedding_bytes, dtype=np.float32)
         except Exception as e:
             logger.error(f"Failed to decode embedding: {e}")
@@ -160,11 +236,30 @@ class EmbeddingService:
         return base64.b64encode(embedding_array.tobytes()).decode('utf-8')
 
     @staticmethod
-    def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
-        """Calculate cosine similarity between two vectors"""
+    def quantize_embedding(embedding_array: np.ndarray) -> Tuple[bytes, float]:
+        """Quantize the L2-normalized vector to symmetric int8, returning (bytes, scale)"""
+        vec = np.asarray(embedding_array, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        if vec.size == 0 or norm == 0:
+            return np.zeros(vec.size, dtype=np.int8).tobytes(), 0.0
+        vec = vec / norm
+        scale = float(np.abs(vec).max()) / 127.0
+        quantized = np.clip(np.rint(vec / scale), -127, 127).astype(np.int8)
+        return quantized.tobytes(), scale
+
+    @staticmethod
+    def cosine_similarity(a: np.ndarray, b: np.ndarray, normalized: bool = False) -> float:
+        """Calculate cosine similarity between two vectors
+
+        Pass normalized=True when both vectors are already unit-length; the
+        similarity is then just their dot product.
+        """
         if a.size == 0 or b.size == 0:
             return 0.0
 
+        if normalized and len(a) == len(b):
+            return float(np.dot(a, b))
+
         # Ensure same dimensions
         min_dim = min(len(a), len(b))
         a_norm = a[:min_dim]
@@ -193,7 +288,7 @@ class EmbeddingService:
             for entry, embedding_b64 in zip(entries, embedding_strings):
                 entry_db = db.query(LoreEntry).filter(LoreEntry.id == entry.id).first()
                 if entry_db:
-                    entry_db.embedding = embedding_b64
+                    self._apply_embedding(entry_db, embedding_b64)
                     entry_db.embedding_model = self._config.model
                     entry_db.embedding_dimensions = self._config.dimensions
                     entry_db.embedding_updated_at = datetime.now()
@@ -205,7 +300,7 @@ class EmbeddingService:
                 for entry, embedding_b64 in zip(entries, embedding_strings):
                     entry_db = db.query(LoreEntry).filter(LoreEntry.id == entry.id).first()
                     if entry_db:
-                        entry_db.embedding = embedding_b64
+                        self._apply_embedding(entry_db, embedding_b64)
                         entry_db.embedding_model = self._config.model
                         entry_db.embedding_dimensions = self._config.dimensions
                         entry_db.embedding_updated_at = datetime.now()
@@ -219,6 +314,9 @@ class EmbeddingService:
 
         query_vector = self.decode_embedding(query_embedding)
         query_dims = len(query_vector)
+        query_norm = np.linalg.norm(query_vector) if query_dims else 0.0
+        if query_norm > 0:
+            query_vector = query_vector / query_norm
 
         # Get all entries with embeddings
         if self._db:
@@ -256,7 +354,9 @@ class EmbeddingService:
         for entry in all_entries:
             try:
                 entry_vector = self.decode_embedding(entry.embedding)
-                similarity = self.cosine_similarity(query_vector, entry_vector)
+                similarity = self.cosine_similarity(
+                    query_vector, entry_vector, normalized=bool(entry.embedding_normalized) and query_norm > 0
+                )
                 if similarity >= self._config.similarity_threshold:
                     similarities.append((entry, similarity))
             except Exception as e:
@@ -279,6 +379,21 @@ class EmbeddingService:
     def config(self) -> EmbeddingConfig:
         return self._config
 
+    @property
+    def batched(self) -> Optional[EmbeddingBatcher]:
+        """Process-wide batcher for this service's provider and model, once initialized"""
+        if self._config is None or self._provider is None:
+            return None
+        key = (self._config.provider, self._config.model)
+        batcher = _batchers.get(key)
+        if batcher is None:
+            batcher = _batchers[key] = EmbeddingBatcher(self)
+        else:
+            # Any initialized service for the key embeds the same way; take the
+            # newest so a batcher never outlives its service's provider
+            batcher._service = self
+        return batcher
+
     @property
     def provider(self) -> EmbeddingProvider:
         return self._provider
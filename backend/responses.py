@@ -0,0 +1,23 @@
+"""Response classes shared by the CoolChat API."""
+
+from __future__ import annotations
+
+from typing import Any
+
+import orjson
+from fastapi.responses import JSONResponse
+
+
+class ORJSONResponse(JSONResponse):
+    """JSON response rendered with orjson.
+
+    ``default=str`` covers values orjson has no native encoder for (e.g.
+    ``Decimal`` or custom objects stored in character ``extensions``).
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(
+            content,
+            default=str,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY,
+        )
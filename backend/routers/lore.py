@@ -2,7 +2,9 @@ from fastapi import APIRouter, HTTPException, Depends, Query, File, UploadFile,
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import or_, and_, func, String
 from typing import List, Optional, Any
+from pydantic import AliasChoices, BaseModel, ConfigDict, Field, TypeAdapter, ValidationError, field_validator
 import json
+import orjson
 from pathlib import Path
 import os
 import time
@@ -17,6 +19,7 @@ from ..database import get_db
 from ..models import Lorebook, LoreEntry, Character
 from ..hybrid_search import HybridSearch
 from ..rag_service import get_rag_service
+from ..responses import ORJSONResponse
 
 # Sliding-window rate limiter with LRU expiration
 class RateLimiter:
@@ -75,13 +78,14 @@ def get_public_dir() -> Path:
 # Lorebooks CRUD endpoints
 
 @router.get("/")
-async def list_lorebooks(db: Session = Depends(get_db)) -> dict:
+async def list_lorebooks(db: Session = Depends(get_db)) -> ORJSONResponse:
     """List all lorebooks with their entry counts"""
     lorebooks = db.query(Lorebook).options(
         joinedload(Lorebook.entries)
     ).all()
 
-    return {
+    # Already plain JSON types; skip jsonable_encoder
+    return ORJSONResponse({
         "lorebooks": [
             {
                 "id": lb.id,
@@ -93,7 +97,7 @@ async def list_lorebooks(db: Session = Depends(get_db)) -> dict:
             }
             for lb in lorebooks
         ]
-    }
+    })
 
 @router.post("/")
 async def create_lorebook(lorebook_data: dict, db: Session = Depends(get_db)):
@@ -372,7 +376,7 @@ async def generate_embeddings(db: Session = Depends(get_db)):
         raise HTTPException(status_code=500, detail=f"Embedding generation failed: {str(e)}")
 
 @router.get("/{lorebook_id}")
-async def get_lorebook(lorebook_id: int, db: Session = Depends(get_db)):
+async def get_lorebook(lorebook_id: int, db: Session = Depends(get_db)) -> ORJSONResponse:
     """Get a specific lorebook with all its entries"""
     lorebook = db.query(Lorebook).options(
         joinedload(Lorebook.entries)
@@ -381,7 +385,7 @@ async def get_lorebook(lorebook_id: int, db: Session = Depends(get_db)):
     if not lorebook:
         raise HTTPException(status_code=404, detail="Lorebook not found")
 
-    return {
+    return ORJSONResponse({
         "id": lorebook.id,
         "name": lorebook.name,
         "description": lorebook.description,
@@ -402,7 +406,7 @@ async def get_lorebook(lorebook_id: int, db: Session = Depends(get_db)):
             }
             for entry in lorebook.entries
         ]
-    }
+    })
 
 @router.put("/{lorebook_id}")
 async def update_lorebook(lorebook_id: int, updates: dict, db: Session = Depends(get_db)):
@@ -522,6 +526,29 @@ async def delete_lore_entry(entry_id: int, db: Session = Depends(get_db)):
 
 # Import/Export functionality
 
+class ImportedLoreEntry(BaseModel):
+    """A lorebook file entry in CoolChat or SillyTavern (comment/key/keysecondary) shape."""
+    # Accept what hand-edited files contain: numeric titles and bare keyword strings
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+    title: Optional[str] = Field("", validation_alias=AliasChoices("title", "comment"))
+    content: str
+    keywords: list = Field(default_factory=list, validation_alias=AliasChoices("keywords", "key"))
+    secondary_keywords: list = Field(default_factory=list, validation_alias=AliasChoices("secondary_keywords", "keysecondary"))
+    # SillyTavern writes explicit nulls for unset probability/depth
+    trigger: Optional[float] = Field(100, validation_alias=AliasChoices("trigger", "probability"))
+    order: Optional[float] = Field(4, validation_alias=AliasChoices("order", "depth"))
+
+    @field_validator("keywords", "secondary_keywords", mode="before")
+    @classmethod
+    def _wrap_bare_keyword(cls, value):
+        return [value] if isinstance(value, str) else value
+
+
+# Validates a whole entries list in one pydantic-core call
+_IMPORTED_ENTRIES = TypeAdapter(List[ImportedLoreEntry])
+
+
 @router.post("/import")
 async def import_lorebook(file: UploadFile = File(...), db: Session = Depends(get_db)):
     """Import a lorebook from JSON file"""
@@ -530,12 +557,22 @@ async def import_lorebook(file: UploadFile = File(...), db: Session = Depends(ge
 
     try:
         content = await file.read()
-        lorebook_data = json.loads(content.decode('utf-8'))
+        lorebook_data = orjson.loads(content)
 
         # Validate structure
         if not isinstance(lorebook_data, dict) or "entries" not in lorebook_data:
             raise HTTPException(status_code=400, detail="Invalid lorebook format")
 
+        # Process entries - handle both array and object formats
+        entries = lorebook_data["entries"]
+        if isinstance(entries, dict):
+            # Convert object format like {"0": {...}, "1": {...}} to list format
+            entries = list(entries.values())
+        try:
+            entries = _IMPORTED_ENTRIES.validate_python(entries)
+        except ValidationError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid lorebook entries: {e.errors(include_url=False)}")
+
         # Create lorebook - use filename if available
         filename = file.filename
         default_name = filename.replace('.json', '') if filename else "Imported Lorebook"
@@ -549,44 +586,27 @@ async def import_lorebook(file: UploadFile = File(...), db: Session = Depends(ge
         db.commit()
         db.refresh(lorebook)
 
-        # Process entries - handle both array and object formats
-        entries = lorebook_data["entries"]
-        if isinstance(entries, dict):
-            # Convert object format like {"0": {...}, "1": {...}} to list format
-            entries = list(entries.values())
-
-        # Add entries
-        for entry_data in entries:
-            # Handle SillyTavern format conversion
-            title = entry_data.get("title", entry_data.get("comment", ""))
-            content = entry_data["content"]
-            keywords = entry_data.get("keywords", entry_data.get("key", []))
-            secondary_keywords = entry_data.get("secondary_keywords", entry_data.get("keysecondary", []))
-            logic = "AND ANY"  # Default logic
-            if entry_data.get("selective", True):
-                logic = "AND ANY"
-            elif "logic" in entry_data:
-                # Could map selectiveLogic numeric values here if needed
-                logic = "AND ANY"
-            trigger = entry_data.get("trigger", entry_data.get("probability", 100))
-            order = entry_data.get("order", entry_data.get("depth", 4))
-
-            entry = LoreEntry(
+        # Add entries; SillyTavern selective/logic settings all map to the default logic
+        db.add_all(
+            LoreEntry(
                 lorebook_id=lorebook.id,
-                title=title,
-                content=content,
-                keywords=keywords,
-                secondary_keywords=secondary_keywords,
-                logic=logic,
-                trigger=trigger,
-                order=order
+                title=entry.title,
+                content=entry.content,
+                keywords=entry.keywords,
+                secondary_keywords=entry.secondary_keywords,
+                logic="AND ANY",
+                trigger=100 if entry.trigger is None else entry.trigger,
+                order=4 if entry.order is None else entry.order
             )
-            db.add(entry)
+            for entry in entries
+        )
 
         db.commit()
         return {"message": "Lorebook imported successfully", "id": lorebook.id}
 
-    except json.JSONDecodeError:
+    except HTTPException:
+        raise
+    except orjson.JSONDecodeError:
         raise HTTPException(status_code=400, detail="Invalid JSON format")
     except Exception as e:
         db.rollback()
@@ -656,17 +676,17 @@ async def get_character_lorebooks(character_id: int, db: Session = Depends(get_d
 # Legacy lore routes (for compatibility)
 
 @router.get("/legacy/lore")
-async def list_lore_entries(db: Session = Depends(get_db)) -> List[dict]:
+async def list_lore_entries(db: Session = Depends(get_db)) -> ORJSONResponse:
     """Legacy endpoint for backward compatibility with tests"""
     entries = db.query(LoreEntry).options(joinedload(LoreEntry.lorebook)).all()
-    return [
+    return ORJSONResponse([
         {
             "id": entry.id,
             "keyword": entry.keywords[0] if entry.keywords else "",
             "content": entry.content
         }
         for entry in entries
-    ]
+    ])
 
 @router.post("/legacy/lore")
 async def create_lore_entry_legacy(entry_data: dict, db: Session = Depends(get_db)):
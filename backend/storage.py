@@ -2,9 +2,10 @@ from __future__ import annotations
 
 from pathlib import Path
 from typing import Dict, Any
-import json
 import os
 
+import orjson
+
 
 def public_dir() -> Path:
     here = Path(__file__).resolve().parent
@@ -22,7 +23,7 @@ def load_json(name: str, default: Any) -> Any:
     if not p.exists():
         return default
     try:
-        return json.loads(p.read_text(encoding="utf-8"))
+        return orjson.loads(p.read_bytes())
     except Exception:
         return default
 
@@ -30,6 +31,8 @@ def load_json(name: str, default: Any) -> Any:
 def save_json(name: str, data: Any) -> None:
     p = _path(name)
     tmp = p.with_suffix(p.suffix + ".tmp")
-    tmp.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+    # orjson always writes UTF-8 without escaping, like ensure_ascii=False;
+    # OPT_NON_STR_KEYS keeps json's coercion of int keys to strings.
+    tmp.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
     os.replace(tmp, p)
 
@@ -0,0 +1,159 @@
+import base64
+import json
+import struct
+import zlib
+
+import httpx
+import pytest
+
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.main import _PngCardReader, _parse_png_card, app
+
+client = TestClient(app)
+
+SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def _chunk(ctype: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + ctype + data + struct.pack(">I", zlib.crc32(ctype + data))
+
+
+def _png(*chunks: bytes) -> bytes:
+    return SIGNATURE + _chunk(b"IHDR", b"\x00" * 13) + b"".join(chunks) + _chunk(b"IEND", b"")
+
+
+def test_parse_png_card_reads_base64_chara_text():
+    card = {"name": "Ann", "description": "Keeper of the inn"}
+    raw = _png(
+        _chunk(b"tEXt", b"chara\x00" + base64.b64encode(json.dumps(card).encode())),
+        _chunk(b"IDAT", b"\x00" * 4096),
+    )
+    assert _parse_png_card(raw) == card
+
+
+def test_parse_png_card_prefers_v2_itxt():
+    v1 = {"name": "Old"}
+    v2 = {"name": "Ann", "tags": ["inn"]}
+    itxt = b"chara_card_v2\x00\x00\x00\x00\x00" + json.dumps(v2).encode()
+    raw = _png(
+        _chunk(b"tEXt", b"chara\x00" + base64.b64encode(json.dumps(v1).encode())),
+        _chunk(b"iTXt", itxt),
+    )
+    assert _parse_png_card(raw) == v2
+
+
+def test_parse_png_card_without_metadata():
+    with pytest.raises(ValueError, match="No character JSON"):
+        _parse_png_card(_png(_chunk(b"IDAT", b"\x00" * 16)))
+
+
+def test_parse_png_card_reads_text_after_image_data():
+    card = {"name": "Ann"}
+    raw = _png(
+        _chunk(b"IDAT", b"\x00" * 4096),
+        _chunk(b"tEXt", b"chara_card_v2\x00" + json.dumps(card).encode()),
+        _chunk(b"tEXt", b"chara\x00not base64 json"),
+    )
+    assert _parse_png_card(raw) == card
+
+
+def test_png_card_reader_accepts_arbitrary_splits():
+    card = {"name": "Ann"}
+    raw = _png(
+        _chunk(b"IDAT", b"\x00" * 300),
+        _chunk(b"tEXt", b"chara\x00" + base64.b64encode(json.dumps(card).encode())),
+    )
+    for step in (1, 7, 64):
+        reader = _PngCardReader()
+        for i in range(8, len(raw), step):
+            reader.feed(raw[i:i + step])
+        assert reader.card() == card
+        assert len(reader._pending) < 12
+
+
+def test_import_png_card_streams_upload_to_disk(monkeypatch):
+    monkeypatch.setattr(main, "_UPLOAD_CHUNK", 256)
+    card = {"name": "Streamed Ann"}
+    raw = _png(
+        _chunk(b"IDAT", b"\x00" * 2000),
+        _chunk(b"tEXt", b"chara\x00" + base64.b64encode(json.dumps(card).encode())),
+    )
+    resp = client.post("/characters/import", files={"file": ("ann.png", raw, "image/png")})
+    assert resp.status_code == 201
+    data = resp.json()
+    assert data["name"] == "Streamed Ann"
+
+    saved = main.public_dir() / data["avatar_url"].removeprefix("/public/")
+    assert saved.read_bytes() == raw
+    client.delete(f"/characters/{data['id']}")
+
+
+def test_import_json_card_bytes():
+    card = {"name": "Jörg", "first_mes": "Grüß dich", "tags": ["inn"]}
+    resp = client.post("/characters/import", files={"file": ("jorg.json", json.dumps(card, ensure_ascii=False).encode(), "application/json")})
+    assert resp.status_code == 201
+    data = resp.json()
+    assert (data["name"], data["first_message"], data["tags"]) == ("Jörg", "Grüß dich", ["inn"])
+    client.delete(f"/characters/{data['id']}")
+
+    resp = client.post("/characters/import", files={"file": ("bad.json", b"{not json", "application/json")})
+    assert resp.status_code == 400
+
+
+def test_upload_avatar_copies_file(monkeypatch):
+    monkeypatch.setattr(main, "_UPLOAD_CHUNK", 64)
+    raw = _png(_chunk(b"IDAT", b"\x01" * 500))
+    resp = client.post("/characters/upload_avatar", files={"file": ("face.png", raw, "image/png")})
+    assert resp.status_code == 200
+    avatar_url = resp.json()["avatar_url"]
+    assert avatar_url.endswith(".png")
+    assert (main.public_dir() / avatar_url.removeprefix("/public/")).read_bytes() == raw
+
+
+def test_generate_avatar_streams_image_to_disk(monkeypatch):
+    monkeypatch.setattr(main, "_UPLOAD_CHUNK", 64)
+    raw = _png(_chunk(b"IDAT", b"\x02" * 500))
+
+    async def fake_reply(prompt, cfg, **kwargs):
+        return '"a calm portrait"'
+
+    def handler(request):
+        assert request.url.host == "image.pollinations.ai"
+        return httpx.Response(200, content=raw)
+
+    monkeypatch.setattr(main, "_llm_reply", fake_reply)
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(main, "_http_client", lambda: http_client)
+
+    resp = client.post("/characters/generate_avatar", json={"character": {"name": "Ann"}})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["prompt"] == "a calm portrait"
+    assert (main.public_dir() / body["avatar_url"].removeprefix("/public/")).read_bytes() == raw
+
+
+def test_parse_png_card_checks_signature():
+    with pytest.raises(ValueError, match="not a PNG"):
+        _parse_png_card(b"GIF89a" + b"\x00" * 32)
+
+
+def test_parse_png_card_ignores_other_text_chunks():
+    card = {"name": "Ann"}
+    raw = _png(
+        _chunk(b"tEXt", b"Software\x00paint"),
+        _chunk(b"iTXt", b"Comment\x00\x01\x00\x00\x00not zlib data"),
+        _chunk(b"tEXt", b"no separator"),
+        _chunk(b"tEXt", b"chara\x00" + base64.b64encode(json.dumps(card).encode())),
+    )
+    reader = _PngCardReader()
+    reader.feed(raw[8:])
+    assert reader.found.keys() == {"chara"}
+    assert reader.card() == card
+
+
+def test_parse_png_card_inflates_compressed_itxt():
+    card = {"name": "Ann", "description": "x" * 500}
+    itxt = b"chara_card_v2\x00\x01\x00en\x00\x00" + zlib.compress(json.dumps(card).encode())
+    assert _parse_png_card(_png(_chunk(b"iTXt", itxt))) == card
@@ -33,3 +33,32 @@ def test_character_crud_cycle():
     # ensure gone
     resp = client.get(f"/characters/{char_id}")
     assert resp.status_code == 404
+
+
+def test_character_list_cache_follows_writes():
+    before = client.get("/characters").json()
+    assert client.get("/characters").json() == before
+
+    char_id = client.post("/characters", json={"name": "Bob"}).json()["id"]
+    listed = {c["id"]: c for c in client.get("/characters").json()}
+    assert listed[char_id]["name"] == "Bob"
+
+    assert client.get(f"/characters/{char_id}").json() == listed[char_id]
+
+    assert client.put(f"/characters/{char_id}", json={"name": "Robert"}).status_code == 200
+    assert client.get(f"/characters/{char_id}").json()["name"] == "Robert"
+    listed = {c["id"]: c for c in client.get("/characters").json()}
+    assert listed[char_id]["name"] == "Robert"
+
+    lorebook_id = client.post("/lorebooks/", json={"name": "Cache test"}).json()["id"]
+    client.post(f"/lorebooks/characters/{char_id}/lorebooks/{lorebook_id}")
+    listed = {c["id"]: c for c in client.get("/characters").json()}
+    assert listed[char_id]["lorebook_ids"] == [lorebook_id]
+
+    client.delete(f"/lorebooks/{lorebook_id}")
+    listed = {c["id"]: c for c in client.get("/characters").json()}
+    assert listed[char_id]["lorebook_ids"] == []
+
+    client.delete(f"/characters/{char_id}")
+    assert client.get(f"/characters/{char_id}").status_code == 404
+    assert client.get("/characters").json() == before
@@ -8,3 +8,13 @@ def test_chat_echo():
     response = client.post("/chat", json={"message": "Hello"})
     assert response.status_code == 200
     assert response.json() == {"reply": "Echo: Hello"}
+
+
+def test_chat_stream_echo():
+    response = client.post("/chat/stream", json={"message": "Hello", "session_id": "stream-test", "reset": True})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert response.text == (
+        'data: {"delta":"Echo: Hello"}\n\n'
+        'event: done\ndata: {"reply":"Echo: Hello"}\n\n'
+    )
@@ -10,3 +10,35 @@ def test_chat_flow():
         resp = client.post("/chat", json={"message": msg})
         assert resp.status_code == 200
         assert resp.json()["reply"] == f"Echo: {msg}"
+
+
+def test_trim_history_drops_oldest_messages_over_budget():
+    from backend import main
+    from backend.config import AppConfig
+
+    session_id = "trim-test"
+    client.post("/chat", json={"message": "start", "session_id": session_id, "reset": True})
+    for i in range(28):
+        main._save_chat_message(session_id, "user", f"{i:02d}" + "x" * 400)
+
+    main._trim_history(session_id, AppConfig(max_context_tokens=512))
+    history = main._load_chat_session(session_id)
+    assert len(history) == 20
+    assert history[0]["content"].startswith("08")
+
+    client.post("/chat", json={"message": "done", "session_id": session_id, "reset": True})
+
+
+def test_chat_history_endpoints():
+    session_id = "history-test"
+    client.post("/chat", json={"message": "Hello", "session_id": session_id, "reset": True})
+
+    assert session_id in client.get("/chats").json()["sessions"]
+    messages = client.get(f"/chats/{session_id}").json()["messages"]
+    assert messages == [
+        {"role": "user", "content": "Hello", "image_url": None},
+        {"role": "assistant", "content": "Echo: Hello", "image_url": None},
+    ]
+    assert client.get("/chats/no-such-session").json() == {"messages": []}
+
+    client.post(f"/chats/{session_id}/reset")
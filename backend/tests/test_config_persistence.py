@@ -1,3 +1,4 @@
+from backend.config import current_config, load_config
 from backend.main import app
 from fastapi.testclient import TestClient
 
@@ -20,4 +21,31 @@ def test_update_config_preserves_blank_api_key():
     assert r.status_code == 200
     data = r.json()
     assert data["providers"]["gemini"]["api_key_masked"] is not None
+    assert client.get("/config").json() == data
 
+
+
+def test_load_config_returns_independent_copies():
+    cfg = load_config()
+    cfg.max_context_tokens = -1
+    cfg.providers.clear()
+
+    fresh = load_config()
+    assert fresh.max_context_tokens != -1
+    assert fresh.providers
+
+
+def test_current_config_is_shared_until_saved():
+    shared = current_config()
+    assert current_config() is shared
+    assert load_config() is not shared
+    assert load_config().model_dump() == shared.model_dump()
+
+
+def test_get_config_body_follows_saves():
+    first = client.get("/config").json()
+    assert client.get("/config").json() == first
+
+    client.put("/config", json={"max_context_tokens": first["max_context_tokens"] + 128})
+    assert client.get("/config").json()["max_context_tokens"] == first["max_context_tokens"] + 128
+    client.put("/config", json={"max_context_tokens": first["max_context_tokens"]})
@@ -0,0 +1,59 @@
+from sqlalchemy import event, text
+from sqlalchemy.orm import Session
+
+from backend.database import create_tables, engine
+
+
+def test_lore_entry_lookups_use_lorebook_index():
+    create_tables()
+    with engine.connect() as conn:
+        plan = conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM lore_entries WHERE lorebook_id = 1 LIMIT 3"
+        )).fetchall()
+
+    assert any("ix_lore_entries_lorebook" in row[-1] for row in plan)
+
+
+def test_blank_lore_entry_cleanup_uses_partial_index():
+    from backend.fix_database import clean_invalid_lore_entries
+
+    create_tables()
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    with engine.connect() as conn:
+        outer = conn.begin()
+        db = Session(bind=conn, join_transaction_mode="create_savepoint")
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            clean_invalid_lore_entries(db)
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+            db.close()
+            outer.rollback()
+
+        statement, parameters = statements[0]
+        plan = conn.exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+
+    assert any("ix_lore_entries_lorebook_content_blank" in row[-1] for row in plan)
+
+
+def test_engine_connections_use_wal():
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+        assert conn.execute(text("PRAGMA synchronous")).scalar() == 1  # NORMAL
+
+
+def test_chat_session_lookups_use_chat_index():
+    create_tables()
+    with engine.connect() as conn:
+        plan = conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT role, content FROM chat_messages "
+            "WHERE chat_id = 'default' ORDER BY created_at"
+        )).fetchall()
+
+    assert any("ix_chat_messages_chat_id_created_at" in row[-1] for row in plan)
+    assert not any("TEMP B-TREE" in row[-1] for row in plan)
@@ -0,0 +1,430 @@
+import asyncio
+import base64
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.orm import sessionmaker
+
+from backend.database import _ensure_lore_fts
+from backend import hybrid_search, rag_service
+from backend.hybrid_search import HybridSearch, SearchResult, _decode_unit_matrix, _keyword_score_expr
+from backend.models import Base, Lorebook, LoreEntry, entry_search_text
+from backend.rag_service import EmbeddingBatcher, EmbeddingService
+
+
+def _b64(vec):
+    return base64.b64encode(np.asarray(vec, dtype=np.float32).tobytes()).decode("utf-8")
+
+
+class StubEmbeddingService:
+    decode_embedding = EmbeddingService.decode_embedding
+    cosine_similarity = staticmethod(EmbeddingService.cosine_similarity)
+
+    def __init__(self):
+        self.config = SimpleNamespace(
+            provider="stub", keyword_weight=0.6, semantic_weight=0.4, top_k_candidates=10, dimensions=3
+        )
+
+
+def _reference_keyword_score(entry, query_terms):
+    """Plain-Python statement of the scoring rules that _keyword_score_expr runs in SQL"""
+    primary, secondary, content = entry_search_text(entry)
+    points = sum(
+        20 if term in primary else 10 if term in secondary else 5 if term in content else 0
+        for term in query_terms
+    )
+    return points * (entry.trigger / 100.0 if entry.trigger else 1.0)
+
+
+def _entry(entry_id, vec, dims=3):
+    entry = LoreEntry(
+        id=entry_id,
+        content="content",
+        keywords=[],
+        secondary_keywords=[],
+        trigger=100.0,
+        embedding=_b64(vec) if vec is not None else None,
+        embedding_dimensions=dims,
+    )
+    entry.keyword_score = 0.0
+    return entry
+
+
+@pytest.mark.asyncio
+async def test_semantic_scores_match_pairwise_cosine():
+    service = StubEmbeddingService()
+    searcher = HybridSearch(embedding_service=service)
+    query = np.array([1.0, 2.0, 0.5], dtype=np.float32)
+    candidates = [
+        _entry(1, [1.0, 2.0, 0.5]),
+        _entry(2, [0.3, -1.0, 4.0]),
+        _entry(3, [-1.0, -2.0, -0.5]),  # negative similarity clamps to zero
+        _entry(4, [0.0, 0.0, 0.0]),
+        _entry(5, None),
+        _entry(6, [1.0, 1.0], dims=2),  # dimension mismatch is skipped
+    ]
+
+    results = await searcher._calculate_hybrid_scores(candidates, _b64(query), service.config)
+    scores = {r.entry.id: r.semantic_score for r in results}
+
+    for entry in candidates[:2]:
+        vec = np.frombuffer(base64.b64decode(entry.embedding), dtype=np.float32)
+        expected = max(0.0, float(EmbeddingService.cosine_similarity(query, vec)))
+        assert scores[entry.id] == pytest.approx(expected, rel=1e-5)
+    assert scores[3] == 0.0
+    assert scores[4] == 0.0
+    assert scores[5] == 0.0
+    assert scores[6] == 0.0
+
+
+@pytest.mark.asyncio
+async def test_quantized_scores_approximate_float_scores():
+    service = StubEmbeddingService()
+    searcher = HybridSearch(embedding_service=service)
+    rng = np.random.default_rng(0)
+    query = rng.standard_normal(64).astype(np.float32)
+    service.config.dimensions = 64
+
+    candidates = []
+    for entry_id in range(1, 9):
+        vec = (query + rng.standard_normal(64)).astype(np.float32)
+        entry = _entry(entry_id, vec, dims=64)
+        entry.embedding_int8, entry.embedding_scale = EmbeddingService.quantize_embedding(vec)
+        candidates.append(entry)
+
+    results = await searcher._calculate_hybrid_scores(candidates, _b64(query), service.config)
+
+    for result in results:
+        vec = np.frombuffer(base64.b64decode(result.entry.embedding), dtype=np.float32)
+        expected = max(0.0, float(EmbeddingService.cosine_similarity(query, vec)))
+        assert result.semantic_score == pytest.approx(expected, abs=2e-2)
+
+
+@pytest.mark.asyncio
+async def test_keyword_candidates_use_fts_index(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'fts.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        _ensure_lore_fts(conn)
+    db = sessionmaker(bind=engine)()
+    try:
+        book = Lorebook(name="Book")
+        db.add(book)
+        db.flush()
+        db.add_all([
+            LoreEntry(lorebook_id=book.id, content="Dragons hoard gold", keywords=["Dragon"], secondary_keywords=[]),
+            LoreEntry(lorebook_id=book.id, content="Elves sing", keywords=["elf"], secondary_keywords=["forest"]),
+            LoreEntry(lorebook_id=book.id, content="Nothing here", keywords=[], secondary_keywords=[]),
+        ])
+        db.commit()
+
+        searcher = HybridSearch(embedding_service=StubEmbeddingService())
+
+        found = await searcher._get_keyword_candidates("dragon FOREST", db, 10)
+        # Candidates carry only ranking columns until the final rows are loaded
+        assert all("content" in inspect(entry).unloaded for entry in found)
+        found = searcher._load_full_entries(found, db)
+        assert sorted(entry.content for entry in found) == ["Dragons hoard gold", "Elves sing"]
+        scores = {entry.content: entry.keyword_score for entry in found}
+        assert scores["Dragons hoard gold"] == 20
+        assert scores["Elves sing"] == 10
+        assert [entry.keyword_score for entry in found] == [
+            _reference_keyword_score(entry, ["dragon", "forest"]) for entry in found
+        ]
+
+        # Short terms take the LIKE path and are scored the same way
+        found = await searcher._get_keyword_candidates("el", db, 10)
+        assert [entry.keyword_score for entry in found] == [20.0]
+
+        # Edits flow through the sync triggers
+        elf = searcher._load_full_entries(found, db)[0]
+        elf.secondary_keywords = []
+        db.commit()
+        found = await searcher._get_keyword_candidates("forest", db, 10)
+        assert found == []
+    finally:
+        db.close()
+        engine.dispose()
+
+
+def test_sql_keyword_scores_follow_per_term_precedence(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'scores.db'}")
+    Base.metadata.create_all(bind=engine)
+    db = sessionmaker(bind=engine)()
+    terms = ["wizard", "tower", "stone"]
+    try:
+        book = Lorebook(name="Book")
+        db.add(book)
+        db.flush()
+        entries = [
+            LoreEntry(lorebook_id=book.id, content="The wizard tower", keywords=["Wizard"],
+                      secondary_keywords=["Tower"], trigger=50.0),
+            LoreEntry(lorebook_id=book.id, content="A tower of stone", keywords=[],
+                      secondary_keywords=["stone"], trigger=None),
+            LoreEntry(lorebook_id=book.id, content="Nothing", keywords=[], secondary_keywords=[], trigger=100.0),
+        ]
+        db.add_all(entries)
+        db.commit()
+
+        scores = [
+            score for _, score in db.query(LoreEntry.id, _keyword_score_expr(terms)).order_by(LoreEntry.id)
+        ]
+
+        assert scores == [(20 + 10) * 0.5, 5 + 10, 0.0]
+        assert scores == [_reference_keyword_score(entry, terms) for entry in entries]
+    finally:
+        db.close()
+        engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_search_falls_back_to_keyword_results_when_embedding_fails():
+    class FailingEmbeddingService(StubEmbeddingService):
+        async def _ensure_initialized(self):
+            return
+
+        async def generate_embedding(self, text):
+            raise RuntimeError("embedding provider down")
+
+    searcher = HybridSearch(embedding_service=FailingEmbeddingService())
+    entry = LoreEntry(id=7, lorebook=Lorebook(id=1, name="Book"), content="Runes", keywords=["rune"],
+                      secondary_keywords=[], trigger=100.0, order=0.0)
+    calls = []
+
+    async def fake_get_keyword_candidates(query, db_session, limit):
+        calls.append(limit)
+        entry.keyword_score = 20.0
+        return [entry]
+
+    searcher._get_keyword_candidates = fake_get_keyword_candidates
+
+    results = await searcher.search("rune", limit=5)
+
+    assert calls == [10]  # candidates fetched once, alongside the failed embedding
+    assert [r["id"] for r in results] == [7]
+    assert results[0]["semantic_score"] == 0.0
+
+
+@pytest.mark.asyncio
+async def test_search_reuses_keyword_candidates_when_scoring_fails():
+    class Service(StubEmbeddingService):
+        async def _ensure_initialized(self):
+            return
+
+        async def generate_embedding(self, text):
+            return _b64([1.0, 0.0, 0.0])
+
+    searcher = HybridSearch(embedding_service=Service())
+    entry = LoreEntry(id=8, lorebook=Lorebook(id=1, name="Book"), content="Runes", keywords=["rune"],
+                      secondary_keywords=[], trigger=100.0, order=0.0)
+    calls = []
+
+    async def fake_get_keyword_candidates(query, db_session, limit):
+        calls.append(limit)
+        entry.keyword_score = 20.0
+        return [entry]
+
+    def failing_semantic_candidates(query_embedding, db_session, config):
+        raise RuntimeError("index unavailable")
+
+    searcher._get_keyword_candidates = fake_get_keyword_candidates
+    searcher._semantic_candidates = failing_semantic_candidates
+
+    results = await searcher.search("Rune missing rune", limit=5)
+
+    assert calls == [10]  # the fallback formats the fetched candidates instead of re-querying
+    assert [r["id"] for r in results] == [8]
+    assert results[0]["matched_terms"] == ["rune"]
+
+
+@pytest.mark.asyncio
+async def test_query_embeddings_are_cached_per_normalized_query():
+    class CountingEmbeddingService(StubEmbeddingService):
+        def __init__(self):
+            super().__init__()
+            self.config.provider = "counting"
+            self.calls = []
+
+        async def generate_embedding(self, text):
+            self.calls.append(text)
+            return _b64([1.0, 0.0, 0.0])
+
+    service = CountingEmbeddingService()
+    searcher = HybridSearch(embedding_service=service)
+
+    first = await searcher._cached_query_embedding("Dragon  Lore")
+    second = await HybridSearch(embedding_service=service)._cached_query_embedding("dragon lore")
+
+    assert first == second
+    assert service.calls == ["dragon lore"]
+
+
+class AnnEmbeddingService(StubEmbeddingService):
+    _db = None
+
+    def __init__(self):
+        super().__init__()
+        self.config.provider = "ann"
+        self.config.similarity_threshold = 0.5
+
+    async def _ensure_initialized(self):
+        return
+
+    async def generate_embedding(self, text):
+        return _b64([1.0, 0.0, 0.0])
+
+
+@pytest.fixture
+def ann_db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'ann.db'}")
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        _ensure_lore_fts(conn)
+    db = sessionmaker(bind=engine)()
+
+    book = Lorebook(name="Book")
+    db.add(book)
+    db.flush()
+    entries = {
+        "keyword": LoreEntry(lorebook_id=book.id, content="The comet returns", keywords=["comet"],
+                             secondary_keywords=[], embedding=_b64([0.0, 1.0, 0.0]), embedding_dimensions=3),
+        "semantic": LoreEntry(lorebook_id=book.id, content="A falling star", keywords=["star"],
+                              secondary_keywords=[], embedding=_b64([0.9, 0.1, 0.0]), embedding_dimensions=3),
+        "unrelated": LoreEntry(lorebook_id=book.id, content="Bread recipes", keywords=["bread"],
+                               secondary_keywords=[], embedding=_b64([0.0, 0.0, 1.0]), embedding_dimensions=3),
+    }
+    db.add_all(entries.values())
+    db.commit()
+    try:
+        yield db, entries
+    finally:
+        db.close()
+        engine.dispose()
+
+
+@pytest.mark.skipif(hybrid_search.hnswlib is None, reason="hnswlib not installed")
+@pytest.mark.asyncio
+async def test_search_unions_ann_semantic_recall_with_keyword_recall(ann_db):
+    db, entries = ann_db
+    keyword_hit, semantic_hit, unrelated = entries["keyword"], entries["semantic"], entries["unrelated"]
+
+    results = await HybridSearch(embedding_service=AnnEmbeddingService()).search("comet", db, limit=5)
+
+    by_id = {r["id"]: r for r in results}
+    assert set(by_id) == {keyword_hit.id, semantic_hit.id}
+    assert by_id[keyword_hit.id]["keyword_score"] == 20
+    assert by_id[semantic_hit.id]["keyword_score"] == 0.0
+    assert by_id[semantic_hit.id]["semantic_score"] == pytest.approx(0.9 / np.hypot(0.9, 0.1), rel=1e-5)
+    assert by_id[semantic_hit.id]["lorebook_name"] == "Book"
+
+    # Writing an embedding invalidates the index without any polling query
+    unrelated.embedding = _b64([1.0, 0.0, 0.0])
+    db.commit()
+    results = await HybridSearch(embedding_service=AnnEmbeddingService()).search("comet", db, limit=5)
+    assert unrelated.id in {r["id"] for r in results}
+
+
+@pytest.mark.asyncio
+async def test_search_without_hnswlib_ranks_keyword_candidates_only(ann_db, monkeypatch):
+    monkeypatch.setattr(hybrid_search, "hnswlib", None)
+    db, entries = ann_db
+
+    results = await HybridSearch(embedding_service=AnnEmbeddingService()).search("comet", db, limit=5)
+
+    assert [r["id"] for r in results] == [entries["keyword"].id]
+    assert results[0]["semantic_score"] == 0.0
+
+
+def test_top_results_matches_full_sort():
+    rng = np.random.default_rng(1)
+    results = [SearchResult(entry=None, keyword_score=0.0, semantic_score=0.0, hybrid_score=float(score),
+                            matched_terms=[]) for score in rng.random(50)]
+
+    expected = sorted(results, key=lambda r: r.hybrid_score, reverse=True)
+    assert HybridSearch._top_results(results, 5) == expected[:5]
+    assert HybridSearch._top_results(results, 80) == expected
+    assert HybridSearch._top_results(results, 0) == []
+
+
+def test_decode_unit_matrix_matches_per_row_decode():
+    vecs = [[1.0, 2.0, 0.5], [0.3, -1.0, 4.0], [0.0, 0.0, 0.0]]
+    rows = [_b64(v) for v in vecs] + [np.asarray([3.0, 4.0, 0.0], dtype=np.float32).tobytes()]
+    rows += [_b64([1.0, 1.0]), "!!!!" * 4]  # wrong size, then corrupt base64
+
+    for embeddings in (rows[:3], rows):
+        matrix, keep = _decode_unit_matrix(embeddings, 3)
+        kept = [e for e, ok in zip(embeddings, keep) if ok]
+        assert matrix.shape == (len(kept), 3)
+        for row, embedding in zip(matrix, kept):
+            raw = base64.b64decode(embedding) if isinstance(embedding, str) else embedding
+            vec = np.frombuffer(raw, dtype=np.float32)
+            norm = np.linalg.norm(vec)
+            np.testing.assert_allclose(row, vec / norm if norm else vec, rtol=1e-6)
+
+    assert keep == [True, True, True, True, False, False]
+
+
+def test_apply_embedding_stores_unit_vectors():
+    service = EmbeddingService.__new__(EmbeddingService)
+    entry = LoreEntry(id=9, content="content")
+
+    service._apply_embedding(entry, _b64([3.0, 4.0, 0.0]))
+
+    stored = service.decode_embedding(entry.embedding)
+    np.testing.assert_allclose(stored, [0.6, 0.8, 0.0], rtol=1e-6)
+    assert entry.embedding_blob == stored.tobytes()
+    assert entry.embedding_normalized is True
+    assert EmbeddingService.cosine_similarity(stored, stored, normalized=True) == pytest.approx(1.0)
+
+
+@pytest.mark.asyncio
+async def test_embedding_batcher_coalesces_concurrent_requests():
+    batches = []
+
+    class BatchService:
+        async def generate_embeddings_batch(self, texts):
+            batches.append(list(texts))
+            return [_b64([float(len(text)), 0.0, 0.0]) for text in texts]
+
+    batcher = EmbeddingBatcher(BatchService(), max_batch=8, max_wait_ms=5)
+
+    results = await asyncio.gather(batcher.embed("rune"), batcher.embed("dragon"), batcher.embed("rune"))
+
+    assert batches == [["rune", "dragon"]]
+    assert results == [_b64([4.0, 0.0, 0.0]), _b64([6.0, 0.0, 0.0]), _b64([4.0, 0.0, 0.0])]
+
+
+@pytest.mark.asyncio
+async def test_request_sessions_share_one_embedding_batcher(tmp_path, monkeypatch):
+    monkeypatch.setattr(rag_service, "_rag_service", None)
+    monkeypatch.setattr(rag_service, "_batchers", {})
+    engine = create_engine(f"sqlite:///{tmp_path / 'rag.db'}")
+    Base.metadata.create_all(bind=engine)
+    Sessions = sessionmaker(bind=engine)
+    batches = []
+
+    class BatchProvider:
+        provider_name = "batch"
+
+        async def generate_embeddings_batch(self, texts):
+            batches.append(list(texts))
+            return [np.asarray([float(len(text)), 0.0, 0.0], dtype=np.float32) for text in texts]
+
+    with Sessions() as first_db, Sessions() as second_db:
+        services = [rag_service.get_rag_service(first_db), rag_service.get_rag_service(second_db)]
+        assert services[0] is not services[1]
+        for service in services:
+            await service._ensure_initialized()
+            service._provider = BatchProvider()
+
+        results = await asyncio.gather(
+            HybridSearch(services[0])._cached_query_embedding("shared batch rune"),
+            HybridSearch(services[1])._cached_query_embedding("shared batch dragon"),
+        )
+
+    engine.dispose()
+    assert services[0].batched is services[1].batched
+    assert batches == [["shared batch rune", "shared batch dragon"]]
+    assert results == [_b64([17.0, 0.0, 0.0]), _b64([19.0, 0.0, 0.0])]
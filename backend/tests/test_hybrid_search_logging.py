@@ -53,7 +53,7 @@ async def test_debug_logging_does_not_affect_search(caplog):
         embedding=dummy_service._embedding_b64,
         embedding_dimensions=3,
     )
-    entry.keyword_score = searcher._calculate_keyword_score(entry, ["magic"])
+    entry.keyword_score = 20.0  # primary keyword hit
 
     async def fake_get_keyword_candidates(self, query, db_session, limit):
         return [entry]
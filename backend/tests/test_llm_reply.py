@@ -0,0 +1,142 @@
+import asyncio
+
+import httpx
+import orjson
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.config import AppConfig, Provider, ProviderConfig
+
+
+def _reply(monkeypatch, cfg, handler):
+    monkeypatch.setenv("COOLCHAT_ALLOW_EXTERNAL", "1")
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(main, "_http_client", lambda: http_client)
+    return asyncio.run(main._llm_reply("hi {{user}}", cfg, disable_system=True))
+
+
+def test_llm_reply_uses_provider_spec(monkeypatch):
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(200, json={"choices": [{"message": {"content": " hello "}}]})
+
+    monkeypatch.setenv("COOLCHAT_X_TITLE", "CoolChat")
+    cfg = AppConfig(
+        active_provider=Provider.OPENROUTER,
+        providers={"openrouter": ProviderConfig(api_key="k", api_base="https://ignored.example", model="m")},
+    )
+    assert _reply(monkeypatch, cfg, handler) == "hello"
+
+    request = seen[0]
+    assert str(request.url) == "https://openrouter.ai/api/v1/chat/completions"
+    assert request.headers["Authorization"] == "Bearer k"
+    assert request.headers["X-Title"] == "CoolChat"
+    body = orjson.loads(request.content)
+    assert body["model"] == "m"
+    assert body["messages"] == [{"role": "user", "content": "hi User"}]
+
+
+def test_llm_reply_defaults_and_errors(monkeypatch):
+    seen = []
+
+    def handler(request):
+        seen.append(request)
+        return httpx.Response(429, json={"error": "slow down"})
+
+    cfg = AppConfig(active_provider=Provider.POLLINATIONS, providers={"pollinations": ProviderConfig()})
+    with pytest.raises(HTTPException) as exc:
+        _reply(monkeypatch, cfg, handler)
+    assert exc.value.status_code == 502
+    assert exc.value.detail == {"provider_error": {"error": "slow down"}}
+    assert str(seen[0].url) == "https://text.pollinations.ai/openai/chat/completions"
+    assert "Authorization" not in seen[0].headers
+    assert orjson.loads(seen[0].content)["model"] == "openai-large"
+
+    cfg = AppConfig(active_provider=Provider.GEMINI, providers={"gemini": ProviderConfig()})
+    with pytest.raises(HTTPException) as exc:
+        _reply(monkeypatch, cfg, handler)
+    assert exc.value.status_code == 400
+    assert exc.value.detail == "Missing API key for provider 'gemini'"
+
+
+def test_stream_deltas_reads_sse_chunks(monkeypatch):
+    sse = (
+        b'data: {"choices": [{"delta": {"role": "assistant"}}]}\n\n'
+        b'data: {"choices": [{"delta": {"content": "Hel"}}]}\n\n'
+        b": keep-alive\n\n"
+        b'data: {"choices": [{"delta": {"content": "lo"}}]}\n\n'
+        b"data: [DONE]\n\n"
+    )
+    bodies = []
+
+    def handler(request):
+        bodies.append(orjson.loads(request.content))
+        return httpx.Response(200, content=sse, headers={"content-type": "text/event-stream"})
+
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(main, "_http_client", lambda: http_client)
+    call = main._ChatCall(main.PROVIDER_SPEC[Provider.OPENAI], "https://api.example/v1/chat/completions", {}, {"model": "m"})
+
+    async def collect():
+        return [delta async for delta in main._stream_deltas(await main._open_chat_stream(call))]
+
+    assert asyncio.run(collect()) == ["Hel", "lo"]
+    assert bodies == [{"model": "m", "stream": True}]
+
+
+def test_chat_stream_reports_provider_failures(monkeypatch):
+    async def broken_stream():
+        yield b'data: {"choices": [{"delta": {"content": "Hel"}}]}\n\n'
+        raise httpx.ReadError("connection reset")
+
+    def handler(request):
+        if request.headers["Authorization"] == "Bearer down":
+            raise httpx.ConnectError("provider unreachable")
+        return httpx.Response(200, content=broken_stream(), headers={"content-type": "text/event-stream"})
+
+    monkeypatch.setenv("COOLCHAT_ALLOW_EXTERNAL", "1")
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(main, "_http_client", lambda: http_client)
+    client = TestClient(main.app)
+    payload = {"message": "Hello", "session_id": "stream-failure-test", "reset": True}
+
+    def use_key(key):
+        cfg = AppConfig(active_provider=Provider.OPENAI, providers={"openai": ProviderConfig(api_key=key, model="m")})
+        monkeypatch.setattr(main, "current_config", lambda: cfg)
+
+    use_key("up")
+    response = client.post("/chat/stream", json=payload)
+    assert response.status_code == 200
+    assert response.text == (
+        'data: {"delta":"Hel"}\n\n'
+        'event: error\ndata: {"detail":"connection reset"}\n\n'
+    )
+
+    use_key("down")
+    response = client.post("/chat/stream", json=payload)
+    assert response.status_code == 500
+    assert response.json() == {"detail": "provider unreachable"}
+
+
+def test_llm_reply_substitutes_tokens_in_one_pass(monkeypatch):
+    from backend import storage
+
+    seen = []
+
+    def handler(request):
+        seen.append(orjson.loads(request.content))
+        return httpx.Response(200, json={"choices": [{"message": {"content": "ok"}}]})
+
+    monkeypatch.setattr(storage, "load_json", lambda name, default: {"variables": {"place": "the {{user}} inn", "user": "ignored"}})
+    cfg = AppConfig(active_provider=Provider.OPENAI, providers={"openai": ProviderConfig(api_key="k")})
+    monkeypatch.setenv("COOLCHAT_ALLOW_EXTERNAL", "1")
+    http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(main, "_http_client", lambda: http_client)
+
+    message = "{{user}} meets {{char}} at {{place}}, {{unknown}} stays"
+    assert asyncio.run(main._llm_reply(message, cfg, disable_system=True)) == "ok"
+    assert seen[0]["messages"][0]["content"] == "User meets Character at the {{user}} inn, {{unknown}} stays"
@@ -1,6 +1,10 @@
+import json
+
 from fastapi.testclient import TestClient
 
+from backend.database import SessionLocal
 from backend.main import app
+from backend.models import LoreEntry
 
 client = TestClient(app)
 
@@ -28,3 +32,86 @@ def test_lore_crud_cycle():
 
     resp = client.get(f"/lore/{entry_id}")
     assert resp.status_code == 404
+
+
+def test_lorebook_import_maps_sillytavern_entries():
+    book = {
+        "name": "Imported Inn",
+        "entries": {
+            "0": {"comment": "Inn", "content": "The inn by the road", "key": ["inn"], "keysecondary": ["road"], "probability": 50, "depth": 2},
+            "1": {"title": "Keeper", "content": "Ann keeps the inn", "keywords": ["ann"]},
+        },
+    }
+    resp = client.post("/lorebooks/import", files={"file": ("inn.json", json.dumps(book), "application/json")})
+    assert resp.status_code == 200
+    lorebook_id = resp.json()["id"]
+
+    entries = sorted(client.get(f"/lorebooks/{lorebook_id}").json()["entries"], key=lambda e: e["title"])
+    assert [(e["title"], e["keywords"], e["secondary_keywords"], e["trigger"], e["order"], e["logic"]) for e in entries] == [
+        ("Inn", ["inn"], ["road"], 50.0, 2.0, "AND ANY"),
+        ("Keeper", ["ann"], [], 100.0, 4.0, "AND ANY"),
+    ]
+    client.delete(f"/lorebooks/{lorebook_id}")
+
+
+def test_lorebook_import_defaults_null_probability_and_depth():
+    book = {
+        "name": "Null Fields",
+        "entries": {
+            "0": {"comment": "Well", "content": "An old well", "key": ["well"], "keysecondary": [],
+                  "probability": None, "depth": None, "selective": True, "constant": False},
+        },
+    }
+    resp = client.post("/lorebooks/import", files={"file": ("nulls.json", json.dumps(book), "application/json")})
+    assert resp.status_code == 200
+    lorebook_id = resp.json()["id"]
+
+    entries = client.get(f"/lorebooks/{lorebook_id}").json()["entries"]
+    assert [(e["title"], e["trigger"], e["order"]) for e in entries] == [("Well", 100.0, 4.0)]
+    client.delete(f"/lorebooks/{lorebook_id}")
+
+
+def test_lorebook_import_accepts_numeric_titles_and_bare_keyword_strings():
+    book = {
+        "name": "Loose",
+        "entries": [
+            {"comment": 7, "content": "Lucky number", "key": "a,b"},
+            {"title": 8, "content": "Octopus", "keywords": "arms", "secondary_keywords": "sea"},
+        ],
+    }
+    resp = client.post("/lorebooks/import", files={"file": ("loose.json", json.dumps(book), "application/json")})
+    assert resp.status_code == 200
+    lorebook_id = resp.json()["id"]
+
+    entries = sorted(client.get(f"/lorebooks/{lorebook_id}").json()["entries"], key=lambda e: e["title"])
+    assert [(e["title"], e["keywords"], e["secondary_keywords"]) for e in entries] == [
+        ("7", ["a,b"], []),
+        ("8", ["arms"], ["sea"]),
+    ]
+    client.delete(f"/lorebooks/{lorebook_id}")
+
+
+def test_lore_entries_accept_mixed_type_keyword_lists():
+    book = {"name": "Mixed", "entries": [{"comment": "x", "content": "c", "key": ["A", None]}]}
+    resp = client.post("/lorebooks/import", files={"file": ("mixed.json", json.dumps(book), "application/json")})
+    assert resp.status_code == 200
+    lorebook_id = resp.json()["id"]
+
+    resp = client.post("/lorebooks/entries", json={
+        "lorebook_id": lorebook_id, "content": "Seven seas", "keywords": ["Sea", None, 7],
+    })
+    assert resp.status_code == 200
+    assert resp.json()["keywords"] == ["Sea", None, 7]
+
+    with SessionLocal() as db:
+        stored = db.query(LoreEntry.keywords_lower).filter(LoreEntry.lorebook_id == lorebook_id).order_by(LoreEntry.id)
+        assert [row[0] for row in stored] == ["a", "sea\n7"]
+    client.delete(f"/lorebooks/{lorebook_id}")
+
+
+def test_lorebook_import_rejects_entries_without_content():
+    before = len(client.get("/lorebooks/").json()["lorebooks"])
+    book = {"name": "Broken", "entries": [{"title": "No content"}]}
+    resp = client.post("/lorebooks/import", files={"file": ("broken.json", json.dumps(book), "application/json")})
+    assert resp.status_code == 400
+    assert len(client.get("/lorebooks/").json()["lorebooks"]) == before
@@ -1,6 +1,11 @@
 from fastapi.testclient import TestClient
-from backend.main import app
+import textwrap
 
+from backend import main
+from backend.database import create_tables
+from backend.main import MemoryEntry, _summarize, app
+
+create_tables()
 client = TestClient(app)
 
 
@@ -21,7 +26,10 @@ def test_memory_crud_cycle():
     # retrieve
     resp = client.get(f"/memory/{mem_id}")
     assert resp.status_code == 200
-    assert resp.json()["id"] == mem_id
+    assert resp.json() == data
+
+    resp = client.get("/memory")
+    assert resp.json() == [data]
 
     # delete
     resp = client.delete(f"/memory/{mem_id}")
@@ -30,3 +38,54 @@ def test_memory_crud_cycle():
     resp = client.get("/memory")
     assert resp.status_code == 200
     assert resp.json() == []
+
+
+def test_memory_survives_reload():
+    resp = client.post("/memory", json={"content": "kept across restarts"})
+    data = resp.json()
+
+    main._memory_json.clear()
+    main._load_memory()
+    assert client.get(f"/memory/{data['id']}").json() == data
+    following = client.post("/memory", json={"content": "next one"}).json()
+    assert following["id"] == data["id"] + 1
+
+    for entry in (data, following):
+        assert client.delete(f"/memory/{entry['id']}").status_code == 204
+    main._load_memory()
+    assert client.get(f"/memory/{data['id']}").status_code == 404
+
+
+def test_memory_ids_are_not_reused_after_restart():
+    first = client.post("/memory", json={"content": "older"}).json()
+    newest = client.post("/memory", json={"content": "newest"}).json()
+    assert client.delete(f"/memory/{newest['id']}").status_code == 204
+
+    main._load_memory()
+    following = client.post("/memory", json={"content": "after restart"}).json()
+    assert following["id"] == newest["id"] + 1
+
+    for entry in (first, following):
+        assert client.delete(f"/memory/{entry['id']}").status_code == 204
+
+
+def test_constructed_memory_entry_matches_validated_entry():
+    data = {"id": 3, "content": "remember this", "summary": "remember this"}
+    constructed = MemoryEntry.model_construct(**data)
+
+    assert constructed.model_dump() == MemoryEntry(**data).model_dump() == data
+    assert constructed.model_fields_set == set(MemoryEntry.model_fields)
+
+
+def test_summarize_matches_textwrap_shorten():
+    samples = [
+        "",
+        "short note",
+        "  spaced\n  out\ttext  ",
+        "This is a fairly long message that should be summarized into a shorter snippet for storage.",
+        "word " * 11 + "ending",
+        "a" * 50 + " tail end",
+    ]
+    for text in samples:
+        assert _summarize(text) == textwrap.shorten(text, width=60, placeholder="...")
+    assert _summarize("x" * 80) == "x" * 57 + "..."
@@ -0,0 +1,58 @@
+import httpx
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.main import app
+
+client = TestClient(app)
+
+
+def test_models_listing_is_cached_per_provider(monkeypatch):
+    calls = []
+
+    async def fake_fetch(http_client, pc):
+        calls.append(pc.api_base)
+        return ["free-model", "paid-model"]
+
+    monkeypatch.setitem(main._MODEL_FETCHERS, main.Provider.OPENROUTER, fake_fetch)
+    monkeypatch.setattr(main, "_models_cache", {})
+
+    for _ in range(2):
+        resp = client.get("/models", params={"provider": "openrouter"})
+        assert resp.status_code == 200
+        assert resp.json() == {"models": ["free-model", "paid-model"]}
+
+    assert len(calls) == 1
+
+
+def test_models_all_skips_failing_providers(monkeypatch):
+    async def ok(http_client, pc):
+        return ["shared", "a"]
+
+    async def also_ok(http_client, pc):
+        return ["shared", "b"]
+
+    async def failing(http_client, pc):
+        raise RuntimeError("upstream down")
+
+    monkeypatch.setattr(main, "_MODEL_FETCHERS", {
+        main.Provider.OPENAI: ok,
+        main.Provider.OPENROUTER: failing,
+        main.Provider.GEMINI: also_ok,
+    })
+    monkeypatch.setattr(main, "_models_cache", {})
+
+    resp = client.get("/models", params={"provider": "all"})
+    assert resp.status_code == 200
+    assert resp.json() == {"models": ["shared", "a", "b"]}
+
+
+def test_provider_json_turns_malformed_bodies_into_bad_gateway():
+    assert main._provider_json(httpx.Response(200, content=b'{"data": [{"id": "m"}]}')) == {"data": [{"id": "m"}]}
+
+    with pytest.raises(HTTPException) as exc:
+        main._provider_json(httpx.Response(200, content=b"<html>oops</html>"))
+    assert exc.value.status_code == 502
+    assert exc.value.detail == {"provider_error": "<html>oops</html>"}
@@ -0,0 +1,32 @@
+from collections import deque
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.profiling import ProfilerMiddleware, metrics_csv
+
+
+def test_profiler_records_route_templates():
+    samples = deque(maxlen=2)
+    app = FastAPI()
+    app.add_middleware(ProfilerMiddleware, samples=samples)
+
+    @app.get("/items/{item_id}")
+    async def get_item(item_id: int):
+        return {"id": item_id}
+
+    client = TestClient(app)
+    assert client.get("/items/1").status_code == 200
+    assert client.get("/missing").status_code == 404
+
+    first, second = samples
+    assert (first.method, first.route, first.status) == ("GET", "/items/{item_id}", 200)
+    assert (second.route, second.status) == ("/missing", 404)
+    assert first.wall_ns > 0
+
+    lines = list(metrics_csv(samples))
+    assert lines[0] == "method,route,wall_ns,cpu_ns,status\n"
+    assert lines[1].startswith("GET,/items/{item_id},")
+
+    client.get("/items/2")
+    assert len(samples) == 2
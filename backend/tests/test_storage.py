@@ -0,0 +1,21 @@
+from backend import storage
+
+
+def test_save_and_load_json_round_trip(monkeypatch, tmp_path):
+    monkeypatch.setattr(storage, "public_dir", lambda: tmp_path)
+    data = {"name": "Zoë", "per_character": {1: True}, "items": [1, 2.5, None]}
+
+    storage.save_json("state.json", data)
+    text = (tmp_path / "state.json").read_text(encoding="utf-8")
+    assert '"name": "Zoë"' in text
+    assert not (tmp_path / "state.json.tmp").exists()
+
+    assert storage.load_json("state.json", None) == {"name": "Zoë", "per_character": {"1": True}, "items": [1, 2.5, None]}
+
+
+def test_load_json_falls_back_to_default(monkeypatch, tmp_path):
+    monkeypatch.setattr(storage, "public_dir", lambda: tmp_path)
+    assert storage.load_json("missing.json", {"items": []}) == {"items": []}
+
+    (tmp_path / "broken.json").write_bytes(b"{not json")
+    assert storage.load_json("broken.json", []) == []
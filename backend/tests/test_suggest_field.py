@@ -0,0 +1,28 @@
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.config import AppConfig
+from backend.main import app
+
+client = TestClient(app)
+
+
+def test_suggest_field_fills_tokens_and_unwraps_json(monkeypatch):
+    prompts = []
+
+    async def fake_reply(prompt, cfg, **kwargs):
+        prompts.append(prompt)
+        return '```json\n"A quiet inn by the road"```'
+
+    monkeypatch.setattr(main, "_llm_reply", fake_reply)
+    monkeypatch.setattr(main, "load_config", AppConfig)
+    draft = {"name": "Ann", "description": "{{char}} greets {{user}}", "scenario": None, "personality": ""}
+    resp = client.post("/characters/suggest_field", json={"field": "personality", "character": draft})
+    assert resp.status_code == 200
+    assert resp.json() == {"value": "A quiet inn by the road"}
+
+    prompt = prompts[0]
+    assert "named Ann" in prompt
+    assert "- description: Ann greets User" in prompt
+    assert "scenario" not in prompt
+    assert "- personality" not in prompt
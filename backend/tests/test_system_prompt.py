@@ -0,0 +1,106 @@
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
+
+from backend import main, models
+
+engine = create_engine(
+    "sqlite:///:memory:", connect_args={"check_same_thread": False}, poolclass=StaticPool
+)
+TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+models.Base.metadata.create_all(bind=engine)
+
+
+def test_character_prompt_parts_are_dropped_on_update():
+    db = TestingSessionLocal()
+    try:
+        char = models.Character(name="Ada", personality="curious", scenario="a lab")
+        db.add(char)
+        db.commit()
+
+        assert main._character_prompt_parts(char) == ["Personality: curious", "Scenario: a lab"]
+        assert char.id in main._character_prompt_cache
+
+        char.personality = "bold"
+        db.commit()
+        assert char.id not in main._character_prompt_cache
+        assert main._character_prompt_parts(char) == ["Personality: bold", "Scenario: a lab"]
+
+        db.delete(char)
+        db.commit()
+        assert char.id not in main._character_prompt_cache
+    finally:
+        db.close()
+
+
+def test_lorebook_prompt_entries_track_lore_writes():
+    db = TestingSessionLocal()
+    try:
+        first = models.Lorebook(name="First")
+        second = models.Lorebook(name="Second")
+        db.add_all([first, second])
+        db.flush()
+        entry = models.LoreEntry(lorebook_id=first.id, title="Runes", content="Old magic",
+                                 keywords=["Rune", ""], secondary_keywords=["Glyph"], logic="and all")
+        db.add(entry)
+        db.commit()
+
+        (cached,) = main._lorebook_prompt_entries(db, [first.id])
+        assert cached == main._PromptLoreEntry(["rune"], ["glyph"], "AND ALL", "[Rune] Old magic")
+        assert main._lorebook_prompt_entries(db, [second.id]) == []
+
+        entry.content = "New magic"
+        db.commit()
+        assert [e.text for e in main._lorebook_prompt_entries(db, [first.id])] == ["[Rune] New magic"]
+
+        entry.lorebook_id = second.id
+        db.commit()
+        assert main._lorebook_prompt_entries(db, [first.id]) == []
+        assert [e.text for e in main._lorebook_prompt_entries(db, [second.id])] == ["[Rune] New magic"]
+    finally:
+        db.close()
+
+
+def test_keyword_hits_match_substring_scan(monkeypatch):
+    keywords = {"he", "she", "hers", "rune", "ünïcode"}
+    hay = "ushers carve a rune in ünïcode"
+    expected = {k for k in keywords if k in hay}
+    assert expected == {"he", "she", "hers", "rune", "ünïcode"}
+
+    matcher = main._keyword_matcher(keywords)
+    assert main._keyword_hits(hay, matcher) == expected
+    assert main._keyword_hits("nothing here", matcher) == {"he"}
+
+    monkeypatch.setattr(main, "ahocorasick", None)
+    fallback = main._keyword_matcher(keywords)
+    assert isinstance(fallback, frozenset)
+    assert main._keyword_hits(hay, fallback) == expected
+    assert main._keyword_hits(hay, main._keyword_matcher(set())) == set()
+
+
+def test_linked_lore_is_flattened_and_dropped_on_lore_writes():
+    db = TestingSessionLocal()
+    try:
+        first = models.Lorebook(name="Beasts")
+        second = models.Lorebook(name="Peoples")
+        db.add_all([first, second])
+        db.flush()
+        db.add_all([
+            models.LoreEntry(lorebook_id=first.id, title="Dragon", content="big", keywords=["Dragon"]),
+            models.LoreEntry(lorebook_id=second.id, title="Elf", content="pointy", keywords=["elf"],
+                             secondary_keywords=["Forest"]),
+        ])
+        db.commit()
+
+        linked = main._linked_lore(db, [first.id, second.id])
+        assert [e.text for e in linked.entries] == ["[Dragon] big", "[elf] pointy"]
+        assert main._keyword_hits("a dragon in the forest", linked.matcher) == {"dragon", "forest"}
+        assert main._linked_lore(db, [first.id, second.id]) is linked
+
+        db.add(models.LoreEntry(lorebook_id=second.id, title="Orc", content="loud", keywords=["orc"]))
+        db.commit()
+        linked = main._linked_lore(db, [first.id, second.id])
+        assert [e.text for e in linked.entries] == ["[Dragon] big", "[elf] pointy", "[orc] loud"]
+        assert "orc" in main._keyword_hits("an orc", linked.matcher)
+    finally:
+        db.close()
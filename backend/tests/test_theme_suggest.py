@@ -0,0 +1,30 @@
+from fastapi.testclient import TestClient
+
+from backend import main
+from backend.main import app
+
+client = TestClient(app)
+
+
+def _suggest(monkeypatch, reply):
+    async def fake_reply(prompt, cfg, **kwargs):
+        return reply
+
+    monkeypatch.setattr(main, "_llm_reply", fake_reply)
+    resp = client.post("/theme/suggest", json={"primary": "#2563eb"})
+    assert resp.status_code == 200
+    return resp.json()["colors"]
+
+
+def test_theme_suggest_extracts_hex_codes(monkeypatch):
+    reply = '```json\n["#1E293B", "#f8fafc", "#cbd5e1", "#93c5fdff", "#0f1"]\n```'
+    assert _suggest(monkeypatch, reply) == ["#1E293B", "#f8fafc", "#cbd5e1", "#93c5fdff", "#0f1"]
+    assert _suggest(monkeypatch, "#111111, #222222,#333333 , #444444, #555555, #666666") == [
+        "#111111", "#222222", "#333333", "#444444", "#555555",
+    ]
+
+
+def test_theme_suggest_falls_back_without_five_colors(monkeypatch):
+    assert _suggest(monkeypatch, "navy, white, #1234567, #abc") == [
+        "#163b8d", "#e5e7eb", "#cbd5e1", "#f7ebd0", "#111827",
+    ]